@@ -0,0 +1,304 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+import traceback
+from collections import deque
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from typing import Dict, List, Optional, Set
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_TIMEOUT = "timeout"
+STATUS_OOM = "oom"
+STATUS_CRASHED = "crashed"  # 子进程被信号杀死等, 没有汇报结果
+
+
+def list_pdfs(manifest: Optional[str], directory: Optional[str]) -> List[str]:
+    """从清单文件 (每行一个路径, # 开头为注释) 或目录中收集要处理的 PDF."""
+    pdfs = []
+    if manifest:
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    pdfs.append(os.path.normpath(line))
+    if directory:
+        for dirpath, _, filenames in os.walk(directory):
+            for name in filenames:
+                if name.lower().endswith(".pdf"):
+                    pdfs.append(os.path.normpath(os.path.join(dirpath, name)))
+    return sorted(set(pdfs))
+
+
+def output_name(pdf: str, root: str) -> str:
+    """
+    结果文件的名称 (不含扩展名): PDF 相对于输入根目录的路径, 保留子目录,
+    因此不同目录下的同名文件不会互相覆盖.
+
+    不在根目录之下的文件, 使用文件名加上完整路径的哈希.
+    """
+    stem = os.path.splitext(pdf)[0]
+    try:
+        rel = os.path.relpath(os.path.abspath(stem), os.path.abspath(root))
+    except ValueError:  # Windows 上不在同一个盘
+        rel = os.pardir
+    if rel != os.pardir and not rel.startswith(os.pardir + os.sep):
+        return rel
+    digest = hashlib.sha1(os.path.abspath(pdf).encode("utf-8")).hexdigest()[:8]
+    return f"{os.path.basename(stem)}-{digest}"
+
+
+class Journal:
+    """
+    每个文件的处理状态日志 (JSON Lines, 只追加).
+
+    同一个文件出现多次时以最后一条为准, 中断后重新运行时据此跳过已处理的文件.
+    """
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.status: Dict[str, str] = {}
+        if os.path.exists(filename):
+            with open(filename, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # 中断时写了一半的行
+                    self.status[entry["pdf"]] = entry["status"]
+
+    def done(self, retry_failed: bool) -> Set[str]:
+        if retry_failed:
+            return {pdf for pdf, status in self.status.items() if status == STATUS_OK}
+        return set(self.status)
+
+    def record(self, pdf: str, status: str, elapsed: float, error: str = "") -> None:
+        entry = {"pdf": pdf, "status": status, "elapsed": round(elapsed, 3)}
+        if error:
+            entry["error"] = error
+        with open(self.filename, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.status[pdf] = status
+
+
+def process_one(
+    pdf: str,
+    out_path: str,
+    config: str,
+    cache_dir: str,
+    metrics_stem: Optional[str] = None,
+) -> None:
+    """
+    对一个文件执行 提取 -> 目录树 -> 目标匹配, 结果写入 out_path.
+
+    metrics_stem 不为 None 时, 各阶段的耗时和计数写入 <metrics_stem>.json 和 .prom.
+    """
+    from extract_cache import ExtractCache
+    from instrument import NULL, Instrument
+    from target_tree import TargetTree
+    from toc_outline import outline_for_pdf
+
+    inst = Instrument(pdf) if metrics_stem is not None else NULL
+    outlines = outline_for_pdf(pdf, cache=ExtractCache(cache_dir), inst=inst)
+
+    target = TargetTree(config)
+    with inst.span("match"):
+        found = target.match_outline(outlines)
+    matches = []
+    for match in found:
+        cr = match.content_range
+        matches.append(
+            {
+                "title": match.node.text,
+                "page_no": match.node.page_no,
+                "target": list(match.target),
+                "range": [cr.start_page, cr.start_y, cr.end_page, cr.end_y],
+            }
+        )
+
+    result = {
+        "pdf": pdf,
+        "outline": outlines.str_dump(with_range=True),
+        "matches": matches,
+    }
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, out_path)
+
+    if metrics_stem is not None:
+        os.makedirs(os.path.dirname(metrics_stem) or ".", exist_ok=True)
+        inst.write_json(metrics_stem + ".json")
+        inst.write_prometheus(metrics_stem + ".prom")
+
+
+def _worker(
+    conn: Connection,
+    pdf: str,
+    out_path: str,
+    config: str,
+    cache_dir: str,
+    max_memory: int,
+    metrics_stem: Optional[str] = None,
+) -> None:
+    """
+    子进程入口: 设置内存上限, 处理文件, 通过管道汇报结果.
+
+    resource 模块只在 Unix 上存在, Windows 上不限制内存.
+    """
+    if max_memory > 0:
+        try:
+            import resource
+        except ImportError:
+            pass
+        else:
+            resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+    try:
+        process_one(pdf, out_path, config, cache_dir, metrics_stem)
+        conn.send((STATUS_OK, ""))
+    except MemoryError:
+        conn.send((STATUS_OOM, "MemoryError"))
+    except Exception:
+        conn.send((STATUS_ERROR, traceback.format_exc(limit=5)))
+    finally:
+        conn.close()
+
+
+def run_batch(
+    pdfs: List[str],
+    out_dir: str,
+    workers: int = 4,
+    timeout: float = 300.0,
+    max_memory: int = 4 << 30,
+    config: str = "./config.yaml",
+    cache_dir: str = ".cache/extract",
+    retry_failed: bool = False,
+    metrics_dir: Optional[str] = None,
+    root: str = ".",
+) -> Dict[str, int]:
+    """
+    批量处理, 同时最多运行 workers 个子进程, 每个文件一个子进程.
+
+    超过 timeout 秒的子进程会被杀死, 子进程的地址空间上限为 max_memory 字节
+    (<= 0 表示不限制). metrics_dir 不为 None 时记录每个文件的耗时和计数.
+    结果按 PDF 相对于 root 的路径保存 (见 `output_name`). 返回各状态的文件数.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    journal = Journal(os.path.join(out_dir, "journal.jsonl"))
+    done = journal.done(retry_failed)
+    pending = deque(pdf for pdf in pdfs if pdf not in done)
+    print(
+        f"{len(pdfs)} files, {len(pdfs) - len(pending)} already done, {len(pending)} to go."
+    )
+
+    summary: Dict[str, int] = {}
+    running: Dict[str, tuple] = {}  # pdf -> (进程, 管道, 开始时间)
+
+    def finish(pdf: str, status: str, error: str = "") -> None:
+        proc, conn, start = running.pop(pdf)
+        conn.close()
+        proc.join()
+        elapsed = time.time() - start
+        journal.record(pdf, status, elapsed, error)
+        summary[status] = summary.get(status, 0) + 1
+        print(f"[{status}] {pdf} ({elapsed:.1f}s)")
+
+    while pending or running:
+        while pending and len(running) < workers:
+            pdf = pending.popleft()
+            name = output_name(pdf, root)
+            out_path = os.path.join(out_dir, name + ".json")
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            metrics_stem = (
+                os.path.join(metrics_dir, name) if metrics_dir is not None else None
+            )
+            parent_conn, child_conn = Pipe(duplex=False)
+            proc = Process(
+                target=_worker,
+                args=(
+                    child_conn,
+                    pdf,
+                    out_path,
+                    config,
+                    cache_dir,
+                    max_memory,
+                    metrics_stem,
+                ),
+                daemon=True,
+            )
+            proc.start()
+            child_conn.close()
+            running[pdf] = (proc, parent_conn, time.time())
+
+        time.sleep(0.05)
+        for pdf, (proc, conn, start) in list(running.items()):
+            if conn.poll():
+                try:
+                    status, error = conn.recv()
+                except EOFError:
+                    status, error = STATUS_CRASHED, f"exit code {proc.exitcode}"
+                finish(pdf, status, error)
+            elif not proc.is_alive():
+                finish(pdf, STATUS_CRASHED, f"exit code {proc.exitcode}")
+            elif time.time() - start > timeout:
+                proc.kill()
+                finish(pdf, STATUS_TIMEOUT, f"exceeded {timeout}s")
+
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="批量处理年报: 提取 -> 目录树 -> 目标匹配"
+    )
+    parser.add_argument("--manifest", help="清单文件, 每行一个 PDF 路径")
+    parser.add_argument("--dir", help="包含 PDF 的目录 (递归查找)")
+    parser.add_argument(
+        "--out",
+        default="batch_out",
+        help="结果和状态日志的输出目录, 结果按 PDF 相对于 --dir (或当前目录) 的路径保存",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--timeout", type=float, default=300.0, help="每个文件的最长处理时间 (秒)"
+    )
+    parser.add_argument(
+        "--max-memory-mb", type=int, default=4096, help="每个子进程的内存上限 (仅 Unix), 0 为不限"
+    )
+    parser.add_argument("--config", default="./config.yaml")
+    parser.add_argument("--cache-dir", default=".cache/extract")
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="重新处理之前失败的文件"
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        help="为每个文件写入耗时和计数 (JSON 及 Prometheus textfile) 的目录",
+    )
+    args = parser.parse_args()
+
+    if not args.manifest and not args.dir:
+        parser.error("one of --manifest or --dir is required")
+
+    pdfs = list_pdfs(args.manifest, args.dir)
+    summary = run_batch(
+        pdfs,
+        args.out,
+        workers=args.workers,
+        timeout=args.timeout,
+        max_memory=args.max_memory_mb << 20,
+        config=args.config,
+        cache_dir=args.cache_dir,
+        retry_failed=args.retry_failed,
+        metrics_dir=args.metrics_dir,
+        root=args.dir or ".",
+    )
+    print(", ".join(f"{status}: {count}" for status, count in sorted(summary.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pymupdf
+
+# 各阶段的名称, 也是结果 JSON 中的键
+STAGES = ["extract", "outline", "match", "tables"]
+DEFAULT_TOLERANCE = 0.2  # 比基准慢 (或内存多) 超过该比例, 认为是性能回退
+
+
+def git_commit() -> str:
+    """当前的 git 提交, 工作区有改动时加上 "-dirty"."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def _maxrss_mb() -> Optional[float]:
+    """
+    进程的峰值常驻内存 (MB). Linux 上单位为 KB, macOS 上为字节.
+
+    resource 模块只在 Unix 上存在, Windows 上返回 None.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Tuple[Any, Dict[str, float]]:
+    """
+    测量一个阶段: 运行 repeat 次取最短的时间, 再在 tracemalloc 下运行一次得到 Python 分配的峰值.
+
+    tracemalloc 本身会拖慢运行, 因此计时和测内存分开进行.
+    ru_maxrss 是进程级的单调值, 记录的是该阶段使峰值增加了多少 (包括 C 扩展的分配),
+    无法取得时 (Windows) 记为 None.
+    """
+    rss_before = _maxrss_mb()
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    rss_after = _maxrss_mb()
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {
+        "wall_s": best,
+        "py_peak_mb": peak / (1024 * 1024),
+        "maxrss_delta_mb": None if rss_after is None else rss_after - rss_before,
+        "maxrss_mb": rss_after,
+    }
+
+
+def _count_nodes(node) -> int:
+    return 1 + sum(_count_nodes(child) for child in node.children)
+
+
+def bench_pdf(pdf_path: str, config: str, repeat: int) -> Dict[str, Dict]:
+    """
+    对一个 PDF 依次测量各阶段, 每个阶段使用上一阶段的结果.
+
+    测量的是 omain 和 batch 实际运行的代码 (不显示进度条):
+        extract  `tmain.extract`, 即缓存未命中时的提取
+        outline  `toc_outline.outline_for_pdf`, 提取结果已在缓存中 (书签, 目录页,
+                 或用整个文档的标题字号逐页分析)
+    提取结果写入一个临时的缓存目录, 写入不计入时间.
+    """
+    from extract_cache import ExtractCache
+    from table_extractor import TableExtractor
+    from target_tree import TargetTree
+    from tmain import extract, extractor_settings
+    from toc_outline import outline_for_pdf
+
+    with pymupdf.open(pdf_path) as doc:
+        page_count = len(doc)
+    pages, extract_stats = measure(lambda: extract(pdf_path, progress=False), repeat)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ExtractCache(cache_dir)
+        cache.put(cache.key(pdf_path, extractor_settings()), pages).close()
+        outlines, outline_stats = measure(
+            lambda: outline_for_pdf(pdf_path, cache=cache), repeat
+        )
+    target = TargetTree(config)
+    matches, match_stats = measure(lambda: target.match_outline(outlines), repeat)
+
+    ranges = [m.content_range for m in matches]
+
+    def run_tables() -> List[List[Dict]]:
+        with TableExtractor(pdf_path, cache_dir=None) as te:
+            return te.extract_many(ranges)
+
+    tables, table_stats = measure(run_tables, repeat)
+
+    stats = {
+        "extract": extract_stats,
+        "outline": outline_stats,
+        "match": match_stats,
+        "tables": table_stats,
+    }
+    counts = {
+        "extract": page_count,
+        "outline": _count_nodes(outlines.root) - 1,
+        "match": len(matches),
+        "tables": sum(len(t) for t in tables),
+    }
+    for name in STAGES:
+        wall = stats[name]["wall_s"]
+        stats[name]["pages"] = page_count
+        stats[name]["pages_per_s"] = page_count / wall if wall > 0 else float("inf")
+        stats[name]["items"] = counts[name]
+    return stats
+
+
+def compare(
+    current: Dict, baseline: Dict, tolerance: float
+) -> List[Tuple[str, str, str, float, float]]:
+    """
+    与基准结果对比, 返回所有回退: (PDF, 阶段, 指标, 基准值, 当前值).
+
+    只对比两边都有的 PDF 和阶段; 时间看 wall_s, 内存看 py_peak_mb.
+    """
+    regressions = []
+    for pdf, stages in current["results"].items():
+        base_stages = baseline["results"].get(pdf)
+        if not base_stages:
+            continue
+        for stage, stats in stages.items():
+            base = base_stages.get(stage)
+            if not base:
+                continue
+            for metric in ("wall_s", "py_peak_mb"):
+                if 0 < base[metric] * (1 + tolerance) < stats[metric]:
+                    regressions.append(
+                        (pdf, stage, metric, base[metric], stats[metric])
+                    )
+    return regressions
+
+
+def print_table(results: Dict[str, Dict[str, Dict]]) -> None:
+    print(
+        f"{'pdf':<28} {'stage':<8} {'wall(s)':>9} {'pages/s':>10} "
+        f"{'py peak(MB)':>12} {'rss +MB':>8} {'items':>6}"
+    )
+    for pdf, stages in results.items():
+        name = os.path.basename(pdf)[:28]
+        for stage in STAGES:
+            s = stages[stage]
+            rss = s["maxrss_delta_mb"]
+            rss_text = "-" if rss is None else f"{rss:.1f}"
+            print(
+                f"{name:<28} {stage:<8} {s['wall_s']:>9.4f} {s['pages_per_s']:>10.1f} "
+                f"{s['py_peak_mb']:>12.2f} {rss_text:>8} {s['items']:>6}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="各阶段 (提取, 建立目录树, 匹配, 表格) 的基准测试"
+    )
+    parser.add_argument("pdfs", nargs="+", help="要测试的 PDF 文件")
+    parser.add_argument("--config", default="./config.yaml", help="目标树配置")
+    parser.add_argument("--repeat", type=int, default=3, help="每个阶段的计时次数")
+    parser.add_argument(
+        "--out", default=None, help="结果 JSON, 默认为 bench_out/<commit>.json"
+    )
+    parser.add_argument("--compare", default=None, help="作为基准的结果 JSON")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="超过基准的这一比例即认为回退",
+    )
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = {pdf: bench_pdf(pdf, args.config, args.repeat) for pdf in args.pdfs}
+    report = {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pymupdf": pymupdf.VersionBind,
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    print_table(results)
+
+    out = args.out or os.path.join("bench_out", f"{commit}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Results saved to {out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        print(f"Compared with {baseline.get('commit', args.compare)}:")
+        for pdf, stage, metric, before, after in regressions:
+            print(
+                f"  REGRESSION {os.path.basename(pdf)} {stage} {metric}: "
+                f"{before:.4f} -> {after:.4f} ({after / before - 1:+.0%})"
+            )
+        if regressions:
+            sys.exit(1)
+        print("  No regressions.")
+
+
+if __name__ == "__main__":
+    main()
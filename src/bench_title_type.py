@@ -0,0 +1,82 @@
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from title_type import TitleType
+
+# 年报中常见的标题前缀和正文, 用于拼出候选标题
+PREFIXES = [
+    "第一节 ",
+    "第三节 ",
+    "第十二节 ",
+    "一、",
+    "二、",
+    "十三、",
+    "（一）",
+    "（二）",
+    "(三)",
+    "1、",
+    "2.",
+    "12、",
+    "1)",
+    "",
+    "",
+]
+BODIES = [
+    "管理层讨论与分析",
+    "重要事项",
+    "公司信息",
+    "主要控股参股公司分析",
+    "承诺事项履行情况",
+    "报告期内公司从事的主要业务",
+    "2024年年度报告",
+    "单位：元 币种：人民币",
+    "合计",
+]
+
+
+def make_candidates(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [rng.choice(PREFIXES) + rng.choice(BODIES) for _ in range(n)]
+
+
+def legacy(title: str) -> TitleType:
+    """原始实现: 每次调用都逐条执行正则."""
+    ttype = TitleType.__new__(TitleType)
+    ttype._id = ttype._calc_title_id(ttype._find_title_prefix(title))
+    return ttype
+
+
+def bench(
+    name: str, func: Callable[[List[str]], List[TitleType]], titles: List[str]
+) -> float:
+    start = time.perf_counter()
+    func(titles)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {elapsed * 1e9 / len(titles):8.0f} ns/call")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TitleType 分类的基准测试")
+    parser.add_argument("-n", type=int, default=200000, help="候选标题数量")
+    args = parser.parse_args()
+
+    titles = make_candidates(args.n)
+
+    # 先确认结果完全一致
+    for title in titles:
+        a, b = legacy(title), TitleType(title)
+        assert a == b and a.prefix_length == b.prefix_length, title
+
+    TitleType._classify.cache_clear()
+    before = bench("legacy", lambda ts: [legacy(t) for t in ts], titles)
+    after = bench("cached", lambda ts: [TitleType(t) for t in ts], titles)
+    batch = bench("batch", TitleType.classify_batch, titles)
+    print(f"speedup: {before / after:.1f}x (per call), {before / batch:.1f}x (batch)")
+    print(TitleType._classify.cache_info())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import json
+import os
+import struct
+from typing import Dict, List, Optional, Set
+
+from extract_cache import file_sha256, settings_digest
+
+
+class PageCheckpoint:
+    """
+    逐页提取的检查点, 中断后重新运行时只提取缺少的页.
+
+    检查点是一个目录:
+        meta.json    PDF 的内容哈希, 提取设置的摘要和总页数, 任何一项不同时丢弃整个检查点
+        pages.jsonl  段文件, 每完成一页追加一行 JSON (crop_page 的结果), 只追加不修改
+        index.bin    已完成页的索引, 每页一条定长记录 (页码索引, 在段文件中的偏移, 长度)
+
+    每页先写段文件, 再写索引; 打开时丢弃不完整的索引记录, 并将段文件截断到
+    最后一条索引记录的末尾, 因此在任何时刻被杀死, 已经写入索引的页都是完整的.
+    页面可以按任意顺序完成 (多进程), `merge` 按页码合并.
+
+    检查点只删除和覆盖它自己的文件 (`FILES`): 目录中有其他文件而没有
+    meta.json 时 (例如误传了输出目录) 抛出 ValueError, 不会动其中的内容.
+    """
+
+    FILES = ("meta.json", "pages.jsonl", "index.bin")
+    _ENTRY = struct.Struct("<iQI")  # 页码索引, 偏移, 长度
+
+    def __init__(
+        self, directory: str, pdf_path: str, settings: Dict, page_count: int
+    ) -> None:
+        self.directory = directory
+        self.page_count = page_count
+        self._segment_path = os.path.join(directory, "pages.jsonl")
+        self._index_path = os.path.join(directory, "index.bin")
+        meta = {
+            "pdf": file_sha256(pdf_path),
+            "settings": settings_digest(settings),
+            "page_count": page_count,
+        }
+        if self._read_meta() != meta:
+            # 新的检查点, 或不同的文件或设置留下的检查点, 不能复用
+            os.makedirs(directory, exist_ok=True)
+            names = set(os.listdir(directory))
+            others = names - set(PageCheckpoint.FILES)
+            if others and "meta.json" not in names:
+                raise ValueError(
+                    f"{directory} is not a checkpoint directory "
+                    f"(contains {sorted(others)[0]}), refusing to overwrite it"
+                )
+            # 先清空段文件和索引, 最后写 meta.json, 中途中断时下次仍会重建
+            open(self._segment_path, "wb").close()
+            open(self._index_path, "wb").close()
+            with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+        self.entries: Dict[int, tuple] = {}  # 页码索引 -> (偏移, 长度)
+        self._recover()
+        self._segment = open(self._segment_path, "ab")
+        self._index = open(self._index_path, "ab")
+
+    def _read_meta(self) -> Optional[Dict]:
+        try:
+            with open(os.path.join(self.directory, "meta.json"), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _recover(self) -> None:
+        """读取索引, 丢弃中断时写了一半的记录和未进入索引的段文件内容."""
+        with open(self._index_path, "rb") as f:
+            raw = f.read()
+        segment_size = os.path.getsize(self._segment_path)
+        end = 0
+        valid = 0
+        size = PageCheckpoint._ENTRY.size
+        for pos in range(0, len(raw) - size + 1, size):
+            pn, offset, length = PageCheckpoint._ENTRY.unpack_from(raw, pos)
+            if offset + length > segment_size:
+                break
+            self.entries[pn] = (offset, length)
+            end = max(end, offset + length)
+            valid = pos + size
+        if valid < len(raw):
+            with open(self._index_path, "r+b") as f:
+                f.truncate(valid)
+        if end < segment_size:
+            with open(self._segment_path, "r+b") as f:
+                f.truncate(end)
+
+    def __enter__(self) -> "PageCheckpoint":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._segment.close()
+        self._index.close()
+
+    def done(self) -> Set[int]:
+        """已完成的页码索引."""
+        return set(self.entries)
+
+    def missing(self) -> List[int]:
+        """尚未完成的页码索引, 升序."""
+        return [pn for pn in range(self.page_count) if pn not in self.entries]
+
+    def append(self, page: Dict) -> None:
+        """记录一页 (crop_page 的结果), 返回时该页已经落盘."""
+        pn = page["page_no"] - 1
+        data = json.dumps(page, ensure_ascii=False).encode("utf-8") + b"\n"
+        offset = self._segment.tell()
+        self._segment.write(data)
+        self._segment.flush()
+        os.fsync(self._segment.fileno())
+        self._index.write(PageCheckpoint._ENTRY.pack(pn, offset, len(data)))
+        self._index.flush()
+        self.entries[pn] = (offset, len(data))
+
+    def merge(self) -> List[Dict]:
+        """按页码读出所有页, 缺页时抛出 ValueError."""
+        missing = self.missing()
+        if missing:
+            raise ValueError(
+                f"{len(missing)} pages missing, first is page {missing[0] + 1}"
+            )
+        self._segment.flush()
+        pages = []
+        with open(self._segment_path, "rb") as f:
+            for pn in range(self.page_count):
+                offset, length = self.entries[pn]
+                f.seek(offset)
+                pages.append(json.loads(f.read(length)))
+        return pages
+
+
+def remove_checkpoint(directory: str) -> None:
+    """合并结果保存后删除检查点的文件; 目录为空时一并删除, 否则保留其他文件."""
+    for name in PageCheckpoint.FILES:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+    try:
+        os.rmdir(directory)
+    except OSError:
+        pass
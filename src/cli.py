@@ -0,0 +1,171 @@
+import argparse
+import os
+import sys
+import time
+
+# 本模块只导入标准库: pymupdf, yaml, pdf2docx 等依赖由各子命令在运行时导入,
+# 只看目录树的命令不必为表格提取的依赖付出启动时间 (见 import_budget.py).
+
+DEFAULT_PDF = "input_pdf/002500_山西证券_2024.pdf"
+
+
+def cmd_extract(args: argparse.Namespace) -> None:
+    """提取每一页的文本块信息 (pymupdf)."""
+    from extract_cache import ExtractCache
+    from page_cache import PageCache, save_pages
+    from tmain import extract, extract_cached, extract_checkpointed
+
+    strip_bands = not args.keep_header_footer
+    workers = args.workers or os.cpu_count() or 1
+    start_time = time.time()
+    if args.checkpoint:
+        all_pages = extract_checkpointed(
+            args.pdf, args.checkpoint, workers, strip_bands
+        )
+    elif args.no_cache:
+        all_pages = extract(args.pdf, workers, strip_bands)
+    else:
+        all_pages = extract_cached(
+            args.pdf, workers, ExtractCache(args.cache_dir), strip_bands
+        )
+    try:
+        print(f"Processed {len(all_pages)} pages in {time.time() - start_time:.2f}s.")
+        save_pages(args.out, all_pages)
+    finally:
+        if isinstance(all_pages, PageCache):
+            all_pages.close()
+    if args.checkpoint:
+        from checkpoint import remove_checkpoint
+
+        remove_checkpoint(args.checkpoint)
+
+
+def _outline(args: argparse.Namespace):
+    from extract_cache import ExtractCache
+    from toc_outline import outline_for_pdf
+
+    profiles = None
+    if args.profiles:
+        from layout_profile import ProfileStore
+
+        profiles = ProfileStore(args.profiles)
+    return outline_for_pdf(
+        args.pdf,
+        use_bookmarks=not args.no_bookmarks,
+        use_toc_page=not args.no_toc_page,
+        cache=ExtractCache(args.cache_dir),
+        profiles=profiles,
+    )
+
+
+def cmd_outline(args: argparse.Namespace) -> None:
+    """建立目录树 (pymupdf, 逐页分析时还有 numpy)."""
+    dump = _outline(args).str_dump(with_range=args.with_range)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(dump)
+    else:
+        print(dump, end="")
+
+
+def _matches(args: argparse.Namespace):
+    from target_tree import TargetTree
+
+    return TargetTree(args.config, args.fuzzy).match_outline(_outline(args))
+
+
+def cmd_match(args: argparse.Namespace) -> None:
+    """建立目录树并与目标树匹配 (另外需要 yaml)."""
+    for match in _matches(args):
+        node, cr = match.node, match.content_range
+        print(
+            f"Matched: {node.text} (Page {node.page_no}) -> "
+            f"Range: Page {cr.start_page} y={cr.start_y} to Page {cr.end_page} y={cr.end_y}"
+        )
+
+
+def cmd_tables(args: argparse.Namespace) -> None:
+    """提取匹配到的范围中的表格 (pdf2docx 只在需要时才导入)."""
+    import logging
+
+    from table_extractor import TableExtractor, print_tab_table
+
+    logging.disable(logging.CRITICAL)
+    matches = _matches(args)
+    if args.count is not None:
+        matches = matches[: args.count]
+    with TableExtractor(args.pdf, args.engine, args.table_cache_dir) as te:
+        results = te.extract_many([m.content_range for m in matches])
+    for match, tables in zip(matches, results):
+        print(f"==== {'/'.join(match.target)}: {match.node.text}")
+        page_no = None
+        for table in tables:
+            if table["page_no"] != page_no:
+                page_no = table["page_no"]
+                print(f"--- Page {page_no} ---")
+            print_tab_table(table["rows"])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="report-extractor", description="年报信息提取工具"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    extract = sub.add_parser("extract", help="提取每一页的文本块信息")
+    extract.add_argument("--pdf", default=DEFAULT_PDF)
+    extract.add_argument(
+        "--out",
+        default="src/dfcf.pgc",
+        help="输出文件, .pgc 为二进制缓存格式, 其他扩展名按 JSON 保存",
+    )
+    extract.add_argument(
+        "--workers", type=int, default=1, help="进程数, 0 表示使用全部 CPU 核心"
+    )
+    extract.add_argument("--cache-dir", default=".cache/extract")
+    extract.add_argument("--no-cache", action="store_true", help="不读写提取结果缓存")
+    extract.add_argument(
+        "--keep-header-footer", action="store_true", help="不检测页眉页脚"
+    )
+    extract.add_argument("--checkpoint", help="检查点目录, 中断后从第一个缺少的页继续")
+    extract.set_defaults(func=cmd_extract)
+
+    def _outline_args(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--pdf", default=DEFAULT_PDF)
+        p.add_argument("--cache-dir", default=".cache/extract")
+        p.add_argument("--no-bookmarks", action="store_true", help="不使用书签")
+        p.add_argument("--no-toc-page", action="store_true", help="不使用目录页")
+        p.add_argument("--profiles", help="发行人版式档案目录, 逐页分析时优先使用")
+
+    outline = sub.add_parser("outline", help="建立目录树")
+    _outline_args(outline)
+    outline.add_argument("--out", help="输出文件, 默认打印")
+    outline.add_argument("--with-range", action="store_true", help="同时输出位置")
+    outline.set_defaults(func=cmd_outline)
+
+    match = sub.add_parser("match", help="建立目录树并匹配目标")
+    _outline_args(match)
+    match.add_argument("--config", default="./config.yaml")
+    match.add_argument(
+        "--fuzzy", type=float, help="近似匹配的相似度下限 (如 0.8), 默认只精确匹配"
+    )
+    match.set_defaults(func=cmd_match)
+
+    tables = sub.add_parser("tables", help="提取匹配范围中的表格")
+    _outline_args(tables)
+    tables.add_argument("--config", default="./config.yaml")
+    tables.add_argument("--fuzzy", type=float, help="近似匹配的相似度下限")
+    tables.add_argument("--engine", default="pymupdf", help="pymupdf 或 pdf2docx")
+    tables.add_argument("--table-cache-dir", default=".cache/pdf2docx")
+    tables.add_argument("--count", type=int, help="只处理前若干个范围")
+    tables.set_defaults(func=cmd_tables)
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+import argparse
+import gc
+import tracemalloc
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+from outline_tree import OutlineTree
+from title_node import TitleNode
+from title_type import TitleType
+
+NO_NODE = -1  # first_child, next_sibling 和 parent 中表示 "没有"
+
+
+class TextPool:
+    """
+    标题文本的字符串池, 相同的文本只保存一份, 以编号引用.
+
+    不同报告中的 "重要事项", "财务报告" 等标题大多相同,
+    多棵目录树共用一个池时, 这些文本只占一份内存.
+    """
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self._texts: List[str] = []
+
+    def intern(self, text: str) -> int:
+        text_id = self._ids.get(text)
+        if text_id is None:
+            text_id = self._ids[text] = len(self._texts)
+            self._texts.append(text)
+        return text_id
+
+    def __getitem__(self, text_id: int) -> str:
+        return self._texts[text_id]
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+
+class CompactNode:
+    """
+    `CompactOutline` 中一个节点的只读视图, 属性和方法与 TitleNode 相同.
+
+    视图只保存 (树, 编号), 按需创建, 用完即弃; 同一节点的两个视图相等.
+    """
+
+    __slots__ = ("tree", "index")
+
+    def __init__(self, tree: "CompactOutline", index: int) -> None:
+        self.tree = tree
+        self.index = index
+
+    def __eq__(self, other: object) -> bool:
+        return (
+            isinstance(other, CompactNode)
+            and self.tree is other.tree
+            and self.index == other.index
+        )
+
+    def __hash__(self) -> int:
+        return hash((id(self.tree), self.index))
+
+    def __repr__(self) -> str:
+        return f"CompactNode({self.index}, {self.text!r})"
+
+    @property
+    def text(self) -> str:
+        return self.tree.pool[self.tree.text_id[self.index]]
+
+    @property
+    def size(self) -> float:
+        return self.tree.size[self.index]
+
+    @property
+    def y0(self) -> float:
+        return self.tree.y0[self.index]
+
+    @property
+    def y1(self) -> float:
+        return self.tree.y1[self.index]
+
+    @property
+    def page_no(self) -> int:
+        return self.tree.page_no[self.index]
+
+    @property
+    def level(self) -> int:
+        return self.tree.level[self.index]
+
+    @property
+    def pos(self) -> int:
+        return self.tree.pos[self.index]
+
+    @property
+    def parent(self) -> Optional["CompactNode"]:
+        parent = self.tree.parent[self.index]
+        return None if parent == NO_NODE else CompactNode(self.tree, parent)
+
+    @property
+    def children(self) -> List["CompactNode"]:
+        tree = self.tree
+        children = []
+        child = tree.first_child[self.index]
+        while child != NO_NODE:
+            children.append(CompactNode(tree, child))
+            child = tree.next_sibling[child]
+        return children
+
+    @property
+    def ttype(self) -> TitleType:
+        ttype = TitleType.__new__(TitleType)
+        ttype._id = self.tree.type_id[self.index]
+        ttype.prefix_length = self.tree.prefix_length[self.index]
+        return ttype
+
+    def get_main_text(self) -> str:
+        """获取标题文本."""
+        return self.text[self.tree.prefix_length[self.index] :]
+
+
+class CompactOutline:
+    """
+    数组存储的只读目录树, 用于在一个进程中同时保存大量报告的目录树.
+
+    节点按先序编号, 根节点为 0. 每个字段一个 `array.array`, 树结构由
+    parent, first_child, next_sibling 三个下标数组表示, 标题文本保存在
+    `TextPool` 中, 节点只记录文本编号. 多棵树可以共用一个池.
+
+    每个节点的数组占 51 字节 (5 个 int32 下标/页码, 3 个 double, 3 个 int8),
+    加上文本池的份额, 在合成的报告上测得约 77 字节; 同样的节点用 TitleNode
+    约 230 字节, TitleNode 不用 __slots__ 时约 320 字节 (64 位 CPython 3.11,
+    连同 TitleType, 均不含标题文本本身; 由 `python src/compact_outline.py` 测得).
+    共用文本池的报告越多, 池的份额越小.
+
+    `root` 和 `CompactNode` 提供与 OutlineTree/TitleNode 相同的遍历接口
+    (parent, children, pos, get_main_text 等), `TargetTree.match_outline`
+    等可以直接使用. 树建立后不能再添加节点.
+    """
+
+    def __init__(self, pool: Optional[TextPool] = None) -> None:
+        self.pool = pool if pool is not None else TextPool()
+        self.parent = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.pos = array("i")
+        self.page_no = array("i")
+        self.text_id = array("i")
+        self.size = array("d")
+        self.y0 = array("d")
+        self.y1 = array("d")
+        self.level = array("b")
+        self.type_id = array("b")
+        self.prefix_length = array("b")
+
+    @classmethod
+    def from_tree(
+        cls, outlines: OutlineTree, pool: Optional[TextPool] = None
+    ) -> "CompactOutline":
+        """
+        由 OutlineTree 建立, 不修改原来的树.
+
+        pos 照抄节点的 pos, 与原来的树一致 (content_range 依赖 pos); 兄弟链接按遍历的顺序.
+        """
+        tree = cls(pool)
+        last_child: List[int] = []  # 节点编号 -> 目前最后一个子节点的编号
+        stack = [(outlines.root, NO_NODE, 0)]  # (节点, 父节点编号, 在兄弟中的位置)
+        while stack:
+            node, parent, pos = stack.pop()
+            index = len(tree.parent)
+            if parent != NO_NODE:
+                if pos == 0:
+                    tree.first_child[parent] = index
+                else:
+                    tree.next_sibling[last_child[parent]] = index
+                last_child[parent] = index
+            tree.parent.append(parent)
+            tree.first_child.append(NO_NODE)
+            tree.next_sibling.append(NO_NODE)
+            tree.pos.append(node.pos)
+            tree.page_no.append(node.page_no)
+            tree.text_id.append(tree.pool.intern(node.text))
+            tree.size.append(node.size)
+            tree.y0.append(node.y0)
+            tree.y1.append(node.y1)
+            tree.level.append(node.level)
+            tree.type_id.append(node.ttype.type_id)
+            tree.prefix_length.append(node.ttype.prefix_length)
+            last_child.append(NO_NODE)
+            for child_pos in range(len(node.children) - 1, -1, -1):
+                stack.append((node.children[child_pos], index, child_pos))
+        return tree
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    @property
+    def root(self) -> CompactNode:
+        return CompactNode(self, 0)
+
+    def node(self, index: int) -> CompactNode:
+        return CompactNode(self, index)
+
+    def iter_nodes(self) -> Iterator[CompactNode]:
+        """先序遍历所有节点 (即按编号顺序), 包括根节点."""
+        for index in range(len(self)):
+            yield CompactNode(self, index)
+
+    def nbytes(self) -> int:
+        """各数组占用的字节数, 不含文本池."""
+        return sum(
+            a.itemsize * len(a)
+            for a in (
+                self.parent,
+                self.first_child,
+                self.next_sibling,
+                self.pos,
+                self.page_no,
+                self.text_id,
+                self.size,
+                self.y0,
+                self.y1,
+                self.level,
+                self.type_id,
+                self.prefix_length,
+            )
+        )
+
+    def print_dump(self, with_range: bool = False) -> None:
+        """打印目录树, 用于调试."""
+        print(self.str_dump(with_range), end="")
+
+    def str_dump(self, with_range: bool = False) -> str:
+        """与 `OutlineTree.str_dump` 的输出相同. 先序编号的父节点总在子节点之前."""
+        depth = [0] * len(self)
+        lines = []
+        for index in range(len(self)):
+            parent = self.parent[index]
+            if parent != NO_NODE:
+                depth[index] = depth[parent] + 2
+            line = (
+                " " * depth[index]
+                + f"[L{self.level[index]}] {self.pool[self.text_id[index]]}"
+            )
+            if with_range:
+                line += (
+                    f" (P{self.page_no[index]} Y[{self.y0[index]}, {self.y1[index]}])"
+                )
+            lines.append(line + "\n")
+        return "".join(lines)
+
+
+def _copy_tree(outlines: OutlineTree) -> OutlineTree:
+    """复制目录树的节点 (文本对象共用), 用于测量节点本身的内存."""
+    copy = OutlineTree(outlines.root.text)
+    stack = [(outlines.root, copy.root)]
+    while stack:
+        node, new = stack.pop()
+        for child in node.children:
+            ttype = TitleType.__new__(TitleType)
+            ttype._id = child.ttype.type_id
+            ttype.prefix_length = child.ttype.prefix_length
+            new_child = TitleNode(
+                title_type=ttype,
+                size=child.size,
+                y0=child.y0,
+                y1=child.y1,
+                page_no=child.page_no,
+                text=child.text,
+                level=child.level,
+                parent=new,
+                pos=child.pos,
+            )
+            new.children.append(new_child)
+            stack.append((child, new_child))
+    return copy
+
+
+def _count(outlines: OutlineTree) -> int:
+    count = 0
+    stack = [outlines.root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def _allocated(build) -> tuple:
+    """运行 build(), 返回 (结果, 期间新分配且仍存活的字节数)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="测量目录树每个节点的内存, 并检查紧凑目录树的输出与原来一致"
+    )
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--config", help="同时对照目标匹配的结果")
+    parser.add_argument("--cache-dir", default=".cache/extract")
+    args = parser.parse_args()
+
+    from extract_cache import ExtractCache
+    from toc_outline import outline_for_pdf
+
+    target = None
+    if args.config:
+        from target_tree import TargetTree
+
+        target = TargetTree(args.config)
+
+    cache = ExtractCache(args.cache_dir)
+    outlines = [outline_for_pdf(pdf, cache=cache) for pdf in args.pdfs]
+    nodes = sum(_count(o) for o in outlines)
+
+    _, node_bytes = _allocated(lambda: [_copy_tree(o) for o in outlines])
+    pool = TextPool()
+    compact, compact_bytes = _allocated(
+        lambda: [CompactOutline.from_tree(o, pool) for o in outlines]
+    )
+    array_bytes = sum(c.nbytes() for c in compact)
+    print(f"{nodes} nodes, {len(pool)} distinct titles")
+    print(f"  TitleNode:      {node_bytes / nodes:7.1f} bytes/node")
+    print(
+        f"  CompactOutline: {compact_bytes / nodes:7.1f} bytes/node "
+        f"(arrays {array_bytes / nodes:.1f}, text pool {len(pool)} entries)"
+    )
+
+    for pdf, tree, small in zip(args.pdfs, outlines, compact):
+        same = all(
+            tree.str_dump(with_range) == small.str_dump(with_range)
+            for with_range in (False, True)
+        )
+        line = f"{pdf}: dump identical: {same}"
+        if target is not None:
+            expected = [
+                (m.target, m.node.text, m.node.page_no, vars(m.content_range))
+                for m in target.match_outline(tree)
+            ]
+            actual = [
+                (m.target, m.node.text, m.node.page_no, vars(m.content_range))
+                for m in target.match_outline(small)
+            ]
+            line += f", matches identical: {expected == actual} ({len(expected)})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+from bisect import bisect_left
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import pymupdf
+
+from content_range import ContentRange
+from header_footer import detect_bands
+from instrument import NULL, Instrument
+
+TEXT = "text"
+TABLE = "table"
+
+
+class ContentItem(NamedTuple):
+    """
+    范围中的一项内容: 文本块或表格.
+
+    text 为文本块的文本 (表格为空串), rows 为表格的单元格 (文本块为 None).
+    """
+
+    page_no: int  # 从 1 开始
+    bbox: Tuple[float, float, float, float]
+    kind: str  # TEXT 或 TABLE
+    text: str
+    rows: Optional[List[List[Optional[str]]]]
+
+
+class _PageIndex:
+    """一页的内容, 按中心的 y 坐标排序; keys[i] 是 items[i] 的中心 y 坐标."""
+
+    __slots__ = ("keys", "items")
+
+    def __init__(self, items: List[ContentItem]) -> None:
+        items.sort(key=lambda item: ((item.bbox[1] + item.bbox[3]) / 2, item.bbox[0]))
+        self.items = items
+        self.keys = [(item.bbox[1] + item.bbox[3]) / 2 for item in items]
+
+    def slice(self, y0: float, y1: float) -> List[ContentItem]:
+        """中心落在 [y0, y1) 中的内容."""
+        return self.items[bisect_left(self.keys, y0) : bisect_left(self.keys, y1)]
+
+
+class ContentIndex:
+    """
+    按 ContentRange 取出范围中的内容 (文本块和表格), 按页码和 y 坐标排序.
+
+    每页在第一次被查询时建立索引: 提取正文区域 (去掉页眉页脚) 中的文本块和表格,
+    落在表格中的文本块并入表格, 其余按中心的 y 坐标排序. 之后任意多个范围的查询
+    都共用这些索引, 每个范围在首末页上各做两次二分查找, 中间的页整页取出.
+
+    内容以中心 y 坐标归属, 范围在末页上左闭右开: 相邻的两个范围共用一条边界时,
+    中心恰好在边界上的一项只属于后一个范围, 不会同时属于两个;
+    位于 end_y 和下一个范围 start_y 之间的标题本身不属于任何一个范围.
+    """
+
+    def __init__(
+        self,
+        pdf_path: str,
+        tables: bool = True,
+        strip_bands: bool = True,
+        inst: Instrument = NULL,
+    ) -> None:
+        self.doc = pymupdf.open(pdf_path)
+        self.tables = tables
+        self.bands = detect_bands(self.doc) if strip_bands else None
+        self.inst = inst
+        self._pages: Dict[int, _PageIndex] = {}  # 页码索引 -> 该页的索引
+
+    def __enter__(self) -> "ContentIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.doc.close()
+
+    def page(self, pn: int) -> _PageIndex:
+        """第 pn 页 (从 0 开始) 的索引, 需要时才建立."""
+        index = self._pages.get(pn)
+        if index is None:
+            with self.inst.span("content_index"):
+                index = self._pages[pn] = self._build(pn)
+        return index
+
+    def _build(self, pn: int) -> _PageIndex:
+        page = self.doc[pn]
+        clip = self.bands.clip(page.rect) if self.bands else None
+        clip = clip or page.rect
+
+        items: List[ContentItem] = []
+        table_boxes: List[Tuple[float, float, float, float]] = []
+        if self.tables:
+            for t in page.find_tables(clip=clip).tables:
+                bbox = tuple(t.bbox)
+                table_boxes.append(bbox)
+                items.append(ContentItem(pn + 1, bbox, TABLE, "", t.extract()))
+
+        for x0, y0, x1, y1, text, _, kind in page.get_text("blocks", clip=clip):
+            if kind != 0 or not text.strip():
+                continue
+            cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+            if any(
+                tx0 <= cx <= tx1 and ty0 <= cy <= ty1
+                for tx0, ty0, tx1, ty1 in table_boxes
+            ):
+                continue  # 表格中的文字, 已经包含在表格里
+            items.append(
+                ContentItem(pn + 1, (x0, y0, x1, y1), TEXT, text.strip(), None)
+            )
+        return _PageIndex(items)
+
+    def query(self, cr: ContentRange) -> List[ContentItem]:
+        """范围中的所有内容."""
+        last_page = min(cr.end_page, len(self.doc))
+        result: List[ContentItem] = []
+        for page_no in range(cr.start_page, last_page + 1):
+            y0 = cr.start_y if page_no == cr.start_page else float("-inf")
+            y1 = cr.end_y if page_no == cr.end_page else float("inf")
+            result.extend(self.page(page_no - 1).slice(y0, y1))
+        return result
+
+    def query_many(self, ranges: Iterable[ContentRange]) -> List[List[ContentItem]]:
+        return [self.query(cr) for cr in ranges]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="按目标匹配的范围提取正文和表格")
+    parser.add_argument("--pdf", default="input_pdf/002500_山西证券_2024.pdf")
+    parser.add_argument("--config", default="./config.yaml")
+    parser.add_argument("--no-tables", action="store_true", help="不识别表格")
+    args = parser.parse_args()
+
+    from table_extractor import print_tab_table
+    from target_tree import TargetTree
+    from toc_outline import outline_for_pdf
+
+    matches = TargetTree(args.config).match_outline(outline_for_pdf(args.pdf))
+    with ContentIndex(args.pdf, tables=not args.no_tables) as index:
+        results = index.query_many(m.content_range for m in matches)
+        for match, items in zip(matches, results):
+            print(f"==== {'/'.join(match.target)}: {match.node.text}")
+            for item in items:
+                if item.kind == TABLE:
+                    print_tab_table(item.rows)
+                else:
+                    print(item.text)
+
+
+if __name__ == "__main__":
+    main()
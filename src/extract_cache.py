@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, Optional
+
+from page_cache import PageCache, write_page_cache
+
+
+def file_sha256(filename: str, chunk_size: int = 1 << 20) -> str:
+    """计算文件内容的 sha256."""
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def settings_digest(settings: Dict) -> str:
+    """计算提取设置 (提取器版本, 裁剪规则等) 的摘要."""
+    raw = json.dumps(settings, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class ExtractCache:
+    """
+    以内容寻址的提取结果缓存.
+
+    每个条目以 (PDF 内容的 sha256, 提取设置的摘要) 为键, 保存为一个 .pgc 文件:
+        <cache_dir>/<pdf_hash[:2]>/<pdf_hash>-<settings_digest>.pgc
+
+    - PDF 内容变化时, 只有该 PDF 的条目失效
+    - 裁剪规则变化时, 只有用旧设置生成的条目失效
+    - 失效的条目不会被读取, 之后按 LRU 被淘汰
+
+    LRU 依据文件的 mtime, 命中时会刷新 mtime; 总大小超过 max_bytes 时
+    从最久未使用的条目开始删除.
+    """
+
+    SUFFIX = ".pgc"
+
+    def __init__(
+        self, cache_dir: str = ".cache/extract", max_bytes: int = 2 << 30
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._hashes: Dict[tuple, str] = {}  # (路径, 大小, mtime) -> sha256
+
+    def pdf_hash(self, pdf_path: str) -> str:
+        """PDF 文件的内容哈希, 同一进程中对未修改的文件只计算一次."""
+        st = os.stat(pdf_path)
+        stamp = (os.path.abspath(pdf_path), st.st_size, st.st_mtime_ns)
+        digest = self._hashes.get(stamp)
+        if digest is None:
+            digest = file_sha256(pdf_path)
+            self._hashes[stamp] = digest
+        return digest
+
+    def key(self, pdf_path: str, settings: Dict) -> str:
+        return f"{self.pdf_hash(pdf_path)}-{settings_digest(settings)}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + ExtractCache.SUFFIX)
+
+    def get(self, key: str) -> Optional[PageCache]:
+        """读取缓存条目, 不存在或已损坏时返回 None."""
+        path = self._path(key)
+        try:
+            pages = PageCache(path)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)  # 刷新 LRU 时间
+        except OSError:
+            pass  # 被并发运行的其他进程淘汰了, 已经打开的 pages 仍然可读
+        return pages
+
+    def put(self, key: str, all_pages: Iterable[Dict]) -> PageCache:
+        """
+        写入缓存条目 (先写临时文件再替换, 避免读到写了一半的文件), 然后按需淘汰.
+        all_pages 可以是逐页产出的迭代器, 写入时只累积列式的数组.
+
+        返回打开的新条目: 在淘汰之前打开, 即使条目随后被淘汰 (单个条目超过
+        max_bytes, 或被并发运行的其他进程删除), 返回的 PageCache 仍然可读.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.close(fd)
+        try:
+            write_page_cache(tmp_path, all_pages)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        pages = PageCache(path)
+        self.evict()
+        return pages
+
+    def evict(self) -> None:
+        """删除最久未使用的条目, 直到缓存总大小不超过 max_bytes."""
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for name in filenames:
+                if not name.endswith(ExtractCache.SUFFIX):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue  # 被并发运行的其他进程删除了
+                entries.append((st.st_mtime_ns, st.st_size, path))
+                total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # 被并发运行的其他进程删除了
+            except OSError:
+                continue  # 正在使用 (Windows 上不能删除打开的文件), 下次再淘汰
+            total -= size
@@ -1,9 +1,15 @@
-from typing import Dict
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import pymupdf
 
 
 class HeaderFooter:
     """
     用于获取一篇文档的页眉, 页脚 (主要是页码) 的 y 坐标.
+
+    只根据一页判断; 整个文档的页眉页脚范围见 `detect_bands`.
     """
 
     HEADER_FEATURE_STRS = ["年度报告"]
@@ -53,3 +59,117 @@ class HeaderFooter:
                 init_footer = True
         if not init_footer:
             self.footer_y = float("inf")  # 没有找到页码, 认为没有页脚
+
+
+# 文档级的页眉页脚检测
+SAMPLE_PAGES = 20  # 最多抽样的页数
+MIN_SAMPLE_PAGES = 3  # 页数太少时无法判断是否"重复"
+MAX_BAND_RATIO = 0.12  # 页眉/页脚只可能出现在页面顶部/底部的这一比例内
+MIN_REPEAT_RATIO = 0.6  # 在超过这一比例的抽样页中重复出现的文本才认为是页眉/页脚
+Y_BIN = 2.0  # 聚类 y 坐标时的分箱宽度
+RE_DIGITS = re.compile(r"\d+")
+
+# 页边区域中的一行: (聚类键, 到页边的距离)
+_EdgeLine = Tuple[Tuple[str, int], float]
+
+
+class PageBands(NamedTuple):
+    """
+    整个文档的页眉页脚范围.
+
+    header_y 为页眉底部到页面顶部的距离, footer_margin 为页脚顶部到页面底部的距离,
+    以到页边的距离表示, 对尺寸不同的页面也适用. 0 表示没有页眉/页脚.
+    """
+
+    header_y: float
+    footer_margin: float
+
+    def clip(self, rect: "pymupdf.Rect") -> Optional["pymupdf.Rect"]:
+        """正文区域; 没有页眉页脚时返回 None (即不裁剪)."""
+        if self.header_y <= 0 and self.footer_margin <= 0:
+            return None
+        return pymupdf.Rect(
+            rect.x0, rect.y0 + self.header_y, rect.x1, rect.y1 - self.footer_margin
+        )
+
+
+def _sample_pages(page_count: int) -> List[int]:
+    """均匀抽样页码索引, 跳过封面."""
+    first = 1 if page_count > MIN_SAMPLE_PAGES else 0
+    n = page_count - first
+    if n <= SAMPLE_PAGES:
+        return list(range(first, page_count))
+    return [first + i * n // SAMPLE_PAGES for i in range(SAMPLE_PAGES)]
+
+
+def _edge_lines(page: "pymupdf.Page") -> Tuple[List[_EdgeLine], List[_EdgeLine]]:
+    """
+    一页顶部和底部区域中的行, 各自按离页边由近到远排序.
+
+    文本去掉空白, 数字统一替换为 "#", 与分箱后的到页边距离一起作为聚类键.
+    """
+    height = page.rect.height
+    band = height * MAX_BAND_RATIO
+    top, bottom = [], []
+    for block in page.get_text("dict")["blocks"]:
+        if block["type"] != 0:
+            continue
+        for line in block["lines"]:
+            text = "".join(span["text"] for span in line["spans"])
+            text = RE_DIGITS.sub("#", "".join(text.split()))
+            if not text:
+                continue
+            y0 = line["bbox"][1] - page.rect.y0
+            y1 = line["bbox"][3] - page.rect.y0
+            if y1 <= band:
+                top.append(((text, int(y1 // Y_BIN)), y1))
+            elif y0 >= height - band:
+                bottom.append(((text, int((height - y0) // Y_BIN)), height - y0))
+    top.sort(key=lambda item: item[1])
+    bottom.sort(key=lambda item: item[1])
+    return top, bottom
+
+
+def _band_extent(pages: List[List[_EdgeLine]]) -> float:
+    """
+    由各页同一侧的行推断页眉 (或页脚) 到页边的距离.
+
+    先找出在多数页中出现的聚类; 每页从页边开始, 连续的重复行构成该页的页眉,
+    取各页页眉范围的中位数, 避免个别页面上紧挨页眉的正文被算进去.
+    """
+    counts: Counter = Counter()
+    for lines in pages:
+        counts.update({key for key, _ in lines})
+    repeated = {key for key, n in counts.items() if n >= MIN_REPEAT_RATIO * len(pages)}
+
+    extents = []
+    for lines in pages:
+        extent = 0.0
+        for key, dist in lines:
+            if key not in repeated:
+                break
+            extent = dist
+        extents.append(extent)
+    extents.sort()
+    return extents[len(extents) // 2]
+
+
+def detect_bands(doc: "pymupdf.Document") -> Optional[PageBands]:
+    """
+    抽样若干页, 找出在多数页中以相同位置重复出现的文本, 即页眉和页脚.
+
+    文本中的数字统一替换后再比较, 因此页码 ("12", "第 12 页 共 80 页") 也能聚到一起.
+    找不到页眉页脚时返回 None.
+    """
+    pns = _sample_pages(len(doc))
+    if len(pns) < MIN_SAMPLE_PAGES:
+        return None
+
+    tops, bottoms = [], []
+    for pn in pns:
+        top, bottom = _edge_lines(doc[pn])
+        tops.append(top)
+        bottoms.append(bottom)
+
+    bands = PageBands(_band_extent(tops), _band_extent(bottoms))
+    return bands if bands.clip(doc[0].rect) else None
@@ -0,0 +1,112 @@
+import argparse
+import importlib.util
+import os
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+
+class Budget(NamedTuple):
+    command: str  # cli.py 的子命令
+    extra_args: Tuple[str, ...]  # 额外的命令行参数
+    seconds: float  # 导入时间上限
+    forbidden: Tuple[str, ...] = ()  # 不允许导入的模块
+    required: Tuple[str, ...] = ()  # 必须导入的模块, 确认走的是预期的路径
+
+
+# 名称 -> 预算. 上限留有余量, 用于发现"某个重依赖被移到了模块顶层"这类回退,
+# 而不是测量微小的波动. "tables-pdf2docx" 强制使用 pdf2docx 引擎, 作为对照:
+# 它必须导入 pdf2docx, 其余路径都不应导入.
+BUDGETS: Dict[str, Budget] = {
+    "outline": Budget(
+        "outline", (), 0.4, ("pdf2docx", "docx", "cv2", "pdfplumber", "yaml")
+    ),
+    "match": Budget("match", (), 0.45, ("pdf2docx", "docx", "cv2", "pdfplumber")),
+    "tables": Budget("tables", (), 0.5, ("pdf2docx", "docx", "cv2", "pdfplumber")),
+    "tables-pdf2docx": Budget(
+        "tables", ("--engine", "pdf2docx"), 1.5, ("pdfplumber",), ("pdf2docx",)
+    ),
+}
+
+CLI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Set[str]]:
+    """
+    解析 `python -X importtime` 的输出, 返回 (导入总时间 (秒), 导入的顶层包).
+
+    每行为 "import time: self [us] | cumulative | name", name 的缩进表示嵌套深度,
+    没有缩进的行的 cumulative 之和就是全部导入时间.
+    """
+    total = 0
+    packages = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not name.startswith("  "):
+            total += int(cumulative)
+        packages.add(name.strip().split(".")[0])
+    return total / 1e6, packages
+
+
+def measure(command: str, cli_args: List[str], repeat: int) -> Tuple[float, Set[str]]:
+    """在新的解释器中运行子命令 repeat 次, 返回最短的导入时间和导入的包."""
+    best = float("inf")
+    packages: Set[str] = set()
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", CLI, command, *cli_args],
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"{command} failed:\n{proc.stderr[-2000:]}")
+        elapsed, packages = parse_importtime(proc.stderr)
+        best = min(best, elapsed)
+    return best, packages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="检查各子命令冷启动时的导入时间和导入的依赖"
+    )
+    parser.add_argument("--pdf", default="test/test.pdf", help="运行子命令用的 PDF")
+    parser.add_argument("--config", default="./config.yaml")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'command':<16} {'import(s)':>9} {'budget':>7}  heavy modules")
+    for name, budget in BUDGETS.items():
+        missing = [m for m in budget.required if importlib.util.find_spec(m) is None]
+        if missing:
+            print(f"{name:<16} skipped ({', '.join(missing)} not installed)")
+            continue
+        cli_args = ["--pdf", args.pdf, "--no-bookmarks", "--no-toc-page"]
+        if budget.command != "outline":
+            cli_args += ["--config", args.config]
+        cli_args += budget.extra_args
+        elapsed, packages = measure(budget.command, cli_args, args.repeat)
+        loaded = sorted(p for p in budget.forbidden if p in packages)
+        print(
+            f"{name:<16} {elapsed:>9.3f} {budget.seconds:>7.2f}  "
+            f"{', '.join(loaded) or '-'}"
+        )
+        if elapsed > budget.seconds:
+            failures.append(f"{name}: {elapsed:.3f}s > {budget.seconds:.2f}s")
+        if loaded:
+            failures.append(f"{name}: imported {', '.join(loaded)}")
+        not_loaded = [m for m in budget.required if m not in packages]
+        if not_loaded:
+            failures.append(f"{name}: did not import {', '.join(not_loaded)}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+    print("All commands within budget.")
+
+
+if __name__ == "__main__":
+    main()
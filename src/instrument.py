@@ -0,0 +1,166 @@
+import json
+import os
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Prometheus 指标名的前缀
+METRIC_PREFIX = "report_extractor"
+
+
+class _Span:
+    """一次计时, 用作上下文管理器."""
+
+    __slots__ = ("inst", "name", "start")
+
+    def __init__(self, inst: "Instrument", name: str) -> None:
+        self.inst = inst
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        total = self.inst.spans.setdefault(self.name, [0.0, 0])
+        total[0] += time.perf_counter() - self.start
+        total[1] += 1
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Instrument:
+    """
+    一篇文档处理过程中的计时和计数.
+
+    - 计时: `with inst.span("extract"): ...`, 同名的计时累加, 并记录次数
+    - 计数: `inst.counters` 是一个 Counter, 键为 "分组.种类", 如 "candidate.too_long".
+      热点循环中直接使用 `stats[key] += 1`, 并用 `stats is not None` 判断是否开启,
+      未开启时 (见 `NULL`) 只多一次比较.
+
+    结果可以导出为 JSON, 或 Prometheus 的 textfile 格式 (供 node_exporter 收集).
+    """
+
+    enabled = True
+
+    def __init__(self, document: str = "") -> None:
+        self.document = document
+        self.spans: Dict[str, List] = {}  # 名称 -> [总秒数, 次数]
+        self.counters: Optional[Counter] = Counter()
+
+    def span(self, name: str):
+        return _Span(self, name)
+
+    def count(self, key: str, n: int = 1) -> None:
+        self.counters[key] += n
+
+    def merge(self, other: "Instrument") -> None:
+        """将另一次运行的计时和计数累加到这里, 用于汇总多篇文档."""
+        for name, (seconds, calls) in other.spans.items():
+            total = self.spans.setdefault(name, [0.0, 0])
+            total[0] += seconds
+            total[1] += calls
+        if other.counters:
+            self.counters.update(other.counters)
+
+    def to_dict(self) -> Dict:
+        return {
+            "document": self.document,
+            "spans": {
+                name: {"seconds": seconds, "calls": calls}
+                for name, (seconds, calls) in self.spans.items()
+            },
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Prometheus 文本格式:
+            report_extractor_stage_seconds_total{document="...",stage="extract"} 1.23
+            report_extractor_stage_calls_total{document="...",stage="extract"} 1
+            report_extractor_events_total{document="...",group="candidate",kind="too_long"} 5
+        """
+        doc = f'document="{_escape(self.document)}"'
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_seconds_total Time spent in each stage.",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds_total counter",
+        ]
+        for name, (seconds, _) in sorted(self.spans.items()):
+            lines.append(
+                f'{METRIC_PREFIX}_stage_seconds_total{{{doc},stage="{_escape(name)}"}} {seconds:.6f}'
+            )
+        lines += [
+            f"# HELP {METRIC_PREFIX}_stage_calls_total Number of times each stage ran.",
+            f"# TYPE {METRIC_PREFIX}_stage_calls_total counter",
+        ]
+        for name, (_, calls) in sorted(self.spans.items()):
+            lines.append(
+                f'{METRIC_PREFIX}_stage_calls_total{{{doc},stage="{_escape(name)}"}} {calls}'
+            )
+        lines += [
+            f"# HELP {METRIC_PREFIX}_events_total Candidate filter and outline builder decisions.",
+            f"# TYPE {METRIC_PREFIX}_events_total counter",
+        ]
+        for key, value in sorted(self.counters.items()):
+            group, _, kind = key.rpartition(".")
+            lines.append(
+                f'{METRIC_PREFIX}_events_total{{{doc},group="{_escape(group)}",'
+                f'kind="{_escape(kind)}"}} {value}'
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, filename: str) -> None:
+        _write_atomic(
+            filename, json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        )
+
+    def write_prometheus(self, filename: str) -> None:
+        """写入 .prom 文件; 先写临时文件再替换, 避免收集到写了一半的文件."""
+        _write_atomic(filename, self.to_prometheus())
+
+
+class _NullInstrument(Instrument):
+    """关闭时使用的空实现, 所有操作都不做任何事."""
+
+    enabled = False
+
+    def __init__(self) -> None:
+        self.document = ""
+        self.spans = {}
+        self.counters = None
+
+    def span(self, name: str):
+        return _NULL_SPAN
+
+    def count(self, key: str, n: int = 1) -> None:
+        pass
+
+    def merge(self, other: Instrument) -> None:
+        pass
+
+
+# 默认的空实例
+NULL = _NullInstrument()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomic(filename: str, text: str) -> None:
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    with open(filename + ".tmp", "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(filename + ".tmp", filename)
@@ -0,0 +1,312 @@
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import pymupdf
+
+from extract_cache import ExtractCache
+from header_footer import PageBands, detect_bands
+from instrument import NULL, Instrument
+from outline_builder import MAX_X_TOLERANCE, iter_title_candidates
+from outline_tree import OutlineTree
+from page_cache import PageCache
+from title_node import TitleNode
+
+PROFILE_VERSION = 2  # 档案格式或学习规则变化时加一, 旧档案不再使用
+MIN_PROFILE_NODES = 10  # 目录树至少有这么多节点, 才认为分析成功并记录档案
+MIN_NODE_RATIO = 0.8  # 使用档案得到的节点数不少于档案中的这一比例
+MIN_LEVEL_RATIO = 0.5  # 档案中的每一级, 使用档案得到的该级节点数不少于这一比例
+MIN_LEVEL_AGREEMENT = 0.9  # 标题类型对应的层级与档案一致的节点比例下限
+MIN_X_AGREEMENT = 0.8  # 非居中标题的横坐标与档案中同级标题一致的比例下限
+
+RE_STOCK_CODE = re.compile(r"^(\d{6})_")
+
+# (节点, 横坐标 x0, 是否居中)
+Placement = Tuple[TitleNode, float, bool]
+
+
+def stock_code(pdf_path: str) -> Optional[str]:
+    """文件名中的股票代码, 如 "002500_山西证券_2024.pdf" -> "002500"."""
+    m = RE_STOCK_CODE.match(os.path.basename(pdf_path))
+    return m.group(1) if m else None
+
+
+class LayoutProfile(NamedTuple):
+    """
+    一个发行人的版式档案, 由一次成功的逐页分析得到.
+
+    同一发行人每年的年报大多使用同一个模板, 之后的报告可以直接使用这些结果,
+    而不必先提取全文来统计字号和检测页眉页脚.
+    """
+
+    code: str
+    heading_sizes: List[float]  # 标题字号 (`SizeModel.allowed_sizes`)
+    type_levels: Dict[str, int]  # 标题类型 ID -> 层级 (只记录有特征的类型)
+    bands: Optional[Tuple[float, float]]  # 页眉页脚 (header_y, footer_margin)
+    x_positions: Dict[str, List[float]]  # 层级 -> 非居中标题的横坐标
+    node_count: int
+    level_counts: Dict[str, int]  # 层级 -> 节点数
+    source: str  # 学习时使用的文件名
+    version: int = PROFILE_VERSION
+
+    def page_bands(self) -> Optional[PageBands]:
+        return PageBands(*self.bands) if self.bands else None
+
+
+class ProfileStore:
+    """
+    版式档案的存储, 每个股票代码一个 JSON 文件:
+        <directory>/<股票代码>.json
+    """
+
+    def __init__(self, directory: str = ".cache/profiles") -> None:
+        self.directory = directory
+
+    def _path(self, code: str) -> str:
+        return os.path.join(self.directory, f"{code}.json")
+
+    def load(self, code: str) -> Optional[LayoutProfile]:
+        """读取档案, 不存在, 已损坏或版本不同时返回 None."""
+        try:
+            with open(self._path(code), "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            profile = LayoutProfile(**raw)
+        except (OSError, ValueError, TypeError):
+            return None
+        return profile if profile.version == PROFILE_VERSION else None
+
+    def save(self, profile: LayoutProfile) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(profile.code)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(profile._asdict(), f, ensure_ascii=False, indent=2)
+        os.replace(path + ".tmp", path)
+
+
+def build_with_placements(
+    pages: Iterable[Dict], allowed_sizes, inst: Instrument = NULL
+) -> Tuple[OutlineTree, List[Placement]]:
+    """
+    与 `outline_builder.stream_outline` 相同地建立目录树, 同时记录每个节点的横坐标.
+
+    TitleNode 只保存纵坐标, 横坐标只在筛选候选时可见, 因此在这里一并收集.
+    """
+    outlines = OutlineTree("Report")
+    outlines.stats = inst.counters
+    placements: List[Placement] = []
+    for page in islice(pages, 1, None):  # 封面页特殊处理
+        with inst.span("filter"):
+            candidates = list(iter_title_candidates(page, allowed_sizes, inst.counters))
+        with inst.span("build"):
+            for size, bbox, page_no, text, ttype, centered in candidates:
+                node = outlines.add_node(
+                    size, bbox[1], bbox[3], page_no, text, ttype, centered
+                )
+                if node:
+                    placements.append((node, bbox[0], centered))
+    return outlines, placements
+
+
+def learn_profile(
+    code: str,
+    source: str,
+    placements: List[Placement],
+    heading_sizes: Iterable[float],
+    bands: Optional[PageBands],
+) -> LayoutProfile:
+    """由一次成功的分析结果得到档案. 每种标题类型取出现最多的层级."""
+    votes: Dict[int, Counter] = {}
+    x_positions: Dict[str, List[float]] = {}
+    level_counts: Counter = Counter()
+    for node, x0, centered in placements:
+        level_counts[str(node.level)] += 1
+        if not node.ttype.empty():
+            votes.setdefault(node.ttype.type_id, Counter())[node.level] += 1
+        if not centered:
+            xs = x_positions.setdefault(str(node.level), [])
+            if all(abs(x0 - x) > MAX_X_TOLERANCE for x in xs):
+                xs.append(round(x0, 2))
+    return LayoutProfile(
+        code=code,
+        heading_sizes=sorted(heading_sizes),
+        type_levels={
+            str(type_id): levels.most_common(1)[0][0]
+            for type_id, levels in sorted(votes.items())
+        },
+        bands=tuple(bands) if bands else None,
+        x_positions={level: sorted(xs) for level, xs in sorted(x_positions.items())},
+        node_count=len(placements),
+        level_counts=dict(sorted(level_counts.items())),
+        source=os.path.basename(source),
+    )
+
+
+def profile_misfit(profile: LayoutProfile, placements: List[Placement]) -> str:
+    """
+    检查使用档案得到的目录树是否与档案相符, 相符时返回空串, 否则返回原因.
+
+    - 节点数不能比档案少太多 (字号变了, 标题大多会被当作正文)
+    - 档案中的每一级都要有足够的节点 (只有某一级的字号变了时, 总数可能
+      相差不多, 但这一级的标题都会丢失)
+    - 标题类型对应的层级大多与档案一致 (层级结构变了)
+    - 非居中标题的横坐标大多出现在档案中同级标题的位置 (缩进变了)
+    """
+    if len(placements) < max(MIN_PROFILE_NODES, MIN_NODE_RATIO * profile.node_count):
+        return f"too few nodes ({len(placements)} < {profile.node_count})"
+    level_counts = Counter(str(node.level) for node, _, _ in placements)
+    for level, count in profile.level_counts.items():
+        if level_counts[level] < MIN_LEVEL_RATIO * count:
+            return f"too few level {level} nodes ({level_counts[level]} < {count})"
+
+    known = agree = 0
+    placed = aligned = 0
+    for node, x0, centered in placements:
+        level = profile.type_levels.get(str(node.ttype.type_id))
+        if level is not None:
+            known += 1
+            agree += level == node.level
+        xs = profile.x_positions.get(str(node.level))
+        if not centered and xs:
+            placed += 1
+            aligned += any(abs(x0 - x) <= MAX_X_TOLERANCE for x in xs)
+    if known and agree < MIN_LEVEL_AGREEMENT * known:
+        return f"levels differ ({agree}/{known} agree)"
+    if placed and aligned < MIN_X_AGREEMENT * placed:
+        return f"x positions differ ({aligned}/{placed} aligned)"
+    return ""
+
+
+def _profile_key(cache: ExtractCache, pdf_path: str, profile: LayoutProfile) -> str:
+    """
+    使用档案的页眉页脚提取的结果在提取缓存中的键.
+
+    档案没有页眉页脚时, 提取时照常检测, 结果与完整分析的提取相同, 键也相同.
+    """
+    from tmain import extractor_settings
+
+    settings = extractor_settings()
+    if profile.bands is not None:
+        settings = dict(settings, profile_bands=list(profile.bands))
+    return cache.key(pdf_path, settings)
+
+
+def outline_with_profile(
+    pdf_path: str,
+    store: ProfileStore,
+    cache: Optional[ExtractCache] = None,
+    inst: Instrument = NULL,
+) -> OutlineTree:
+    """
+    逐页分析建立目录树, 优先使用发行人的版式档案.
+
+    有档案时走快速路径: 用档案中的标题字号建立目录树, 不需要统计字号. 页面取自
+    提取缓存 (cache 为 None 时使用默认的缓存): 已有完整分析的提取结果时直接使用,
+    否则用档案中的页眉页脚逐页提取 (不检测页眉页脚), 结果写入缓存, 再次处理同一份
+    报告时不必重新提取.
+
+    结果与档案不符 (见 `profile_misfit`) 时退回完整的分析: 统计字号, 检测页眉页脚.
+    快速路径的页面与完整分析的提取结果相同 (页眉页脚与档案一致) 时直接复用,
+    否则提取全文 (使用缓存). 完整分析得到的目录树足够大时, 更新该发行人的档案.
+
+    inst 的计数 "profile.<hit|misfit|learned>" 记录走了哪条路径.
+    """
+    from size_model import SizeModel
+    from tmain import extract_cached, extractor_settings, iter_pages
+
+    cache = cache or ExtractCache()
+    # 完整分析的提取结果, 没有缓存时为 None
+    pages: Optional[PageCache] = cache.get(cache.key(pdf_path, extractor_settings()))
+    full = pages is not None
+    bands: Optional[PageBands] = None  # 检测到的页眉页脚
+    detected = False
+
+    code = stock_code(pdf_path)
+    profile = store.load(code) if code else None
+    if profile is not None:
+        if pages is None:
+            key = _profile_key(cache, pdf_path, profile)
+            pages = cache.get(key)
+            if pages is None:
+                with inst.span("extract"):
+                    pages = cache.put(
+                        key, iter_pages(pdf_path, bands=profile.page_bands())
+                    )
+        try:
+            with inst.span("profile"):
+                outlines, placements = build_with_placements(
+                    pages, frozenset(profile.heading_sizes), inst
+                )
+                reason = profile_misfit(profile, placements)
+        except BaseException:
+            pages.close()
+            raise
+        if not reason:
+            pages.close()
+            inst.count("profile.hit")
+            return outlines
+        inst.count("profile.misfit")
+        if not full and profile.bands is not None:
+            with pymupdf.open(pdf_path) as doc:
+                bands = detect_bands(doc)
+            detected = True
+            if bands != profile.page_bands():
+                # 页眉页脚变了, 快速路径的页面与完整分析的不同
+                pages.close()
+                pages = None
+
+    if pages is None:
+        with inst.span("extract"):
+            pages = extract_cached(pdf_path, cache=cache)
+    with pages:
+        with inst.span("size_model"):
+            allowed_sizes = SizeModel.from_pages(pages).allowed_sizes
+        outlines, placements = build_with_placements(pages, allowed_sizes, inst)
+    if code and len(placements) >= MIN_PROFILE_NODES:
+        if not detected:
+            with pymupdf.open(pdf_path) as doc:
+                bands = detect_bands(doc)
+        store.save(learn_profile(code, pdf_path, placements, allowed_sizes, bands))
+        inst.count("profile.learned")
+    return outlines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="使用发行人的版式档案建立目录树, 并与完整分析对照"
+    )
+    parser.add_argument("pdfs", nargs="+", help="同一发行人的报告, 依次处理")
+    parser.add_argument("--profiles", default=".cache/profiles", help="档案目录")
+    parser.add_argument("--cache-dir", default=".cache/extract")
+    parser.add_argument(
+        "--compare", action="store_true", help="同时运行完整分析并对照目录树"
+    )
+    args = parser.parse_args()
+
+    from toc_outline import outline_for_pdf
+
+    store = ProfileStore(args.profiles)
+    cache = ExtractCache(args.cache_dir)
+    for pdf in args.pdfs:
+        inst = Instrument(pdf)
+        start_time = time.time()
+        outlines = outline_with_profile(pdf, store, cache, inst)
+        elapsed = time.time() - start_time
+        paths = ", ".join(k for k in sorted(inst.counters) if k.startswith("profile."))
+        print(f"{pdf}: {elapsed:.2f}s ({paths or 'no profile'})")
+        if args.compare:
+            reference = outline_for_pdf(
+                pdf, use_bookmarks=False, use_toc_page=False, cache=cache
+            )
+            same = reference.str_dump(with_range=True) == outlines.str_dump(
+                with_range=True
+            )
+            print(f"  Identical to full analysis: {same}")
+
+
+if __name__ == "__main__":
+    main()
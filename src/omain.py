@@ -1,145 +1,62 @@
-import json
-
-import pdf2docx
-from title_type import TitleType
-from outline_tree import OutlineTree
-from target_tree import TargetTree
-from title_node import TitleNode
-import os
+import logging
+import sys
 
 # outline main
+# 子命令形式的入口见 cli.py, 各依赖只在需要时才导入
 
-# 最大标题级别, 一般为 3
-# <XX 公司 XX 年年度报告> 为 0 级标题, 以此类推
-MAX_TITLE_LVL = 4
-MIN_TITLE_SIZE = 10.0  # 标题的字号最小值, 防止有些低频率的小字号被误判为标题
-MAX_TITLE_LENGTH = 50  # 标题的最大长度, 防止某些长段落被误判为标题
-MIN_TOTAL_LENGTH = 30  # 标题的字号所对应的文本总长度下限 (防止"稀有"字号)
-# MAX_TOTAL_LENGTH = 500  # 标题的字号所对应的文本总长度上限
-MAX_PERCENT = 0.3  # 超过该比例的, 认为是正文
-MAX_X_TOLERANCE = 5.0  # 标题两个元素横坐标的最大容忍差距
-MAX_BODY_OCCUR_PERCENT = 0.1  # 超过页数一定比例的, 认为不是标题
-MAX_HEADER_HEIGHT = 80  # 页眉的最大高度
-
-all_pages = []
-
-with open("src/sxzq.json", "r", encoding="utf-8") as f:
-    all_pages = json.load(f)
-
-
-def is_centered(width: float, x0: float, x1: float) -> bool:
-    """判断文本块是否居中."""
-    margin = (width - (x1 - x0)) / 2
-    return abs(x0 - margin) < 5 and abs(x1 - (width - margin)) < 5
-
-
-outlines = OutlineTree("Report")
-for page in all_pages[1:]:  # 封面页特殊处理
-    total_length = page["total_length"]
-    page_no = page["page_no"]
-    width = page["width"]
-    sizes_count = page["sizes_count"]
-    for block in page["blocks"]:
-        bbox = block["bbox"]
-        lines = block["lines"]
-        first_size = lines[0]["size"]
-        if (
-            first_size < MIN_TITLE_SIZE
-            or (sizes_count[str(first_size)] / total_length) > MAX_PERCENT
-        ):
-            continue  # 字号过小或该字号占比过大, 认为是正文
-        is_whole = True
-        for i, line in enumerate(lines[1:], start=1):
-            if (line["x0"] - lines[i - 1]["x1"]) > MAX_X_TOLERANCE:
-                is_whole = False
-                break
-        if not is_whole:
-            continue  # 两个部分间距太远
-
-        # 仅当"第X节"出现时, 才插入空格
-        text = lines[0]["text"]
-        if len(lines) > 1 and TitleType.is_root(text):
-            text += " "
-        text += "".join(line["text"] for line in lines[1:])
-
-        if text.find("管理层讨论与分析") != -1:
-            pass  # for debugging
-        if text.isdigit():
-            continue  # 纯数字, 认为是页码
-        if len(text) > MAX_TITLE_LENGTH:
-            continue  # 标题过长
-        ttype = TitleType(text)
-        centered = is_centered(width, block["bbox"][0], block["bbox"][2])
-        if ttype.empty() and not centered:
-            continue  # 无样式且不居中, 认为是正文
-
-        # 认为该行是标题, 添加到大纲树中
-        outlines.add_node(first_size, bbox[1], bbox[3], page_no, text, ttype, centered)
-
-# outlines.print_dump()
-
-with open("src/outline2.txt", "w", encoding="utf-8") as f:
-    f.write(outlines.str_dump(with_range=False))
-
-
-cr_list = []  # 存储所有匹配到的内容范围
-
-
-def traverse_and_match(node: TitleNode):
-    if cr := target.match_subtree(node):
-        # print(f"Matched: {node.text} (Page {node.page_no})")
-        print(
-            f"Matched: {node.text} (Page {node.page_no}) -> "
-            f"Range: Page {cr.start_page} y={cr.start_y} to Page {cr.end_page} y={cr.end_y}"
-        )
-        cr_list.append(cr)
-    for child in node.children:
-        traverse_and_match(child)
+pdf_file = "input_pdf/002500_山西证券_2024.pdf"
 
 
-target = TargetTree()
+def main() -> None:
+    from table_extractor import TableExtractor, print_tab_table
+    from target_tree import TargetTree
+    from toc_outline import outline_for_pdf
 
-for nd in outlines.root.children:
-    traverse_and_match(nd)
+    # 优先使用 PDF 自带的书签, 书签不可用时才逐页分析
+    # 逐页分析的提取结果按 PDF 内容和提取设置缓存, 重复运行时不再提取
+    outlines = outline_for_pdf(pdf_file)
 
-print()
-print("---------- Extraction Results ----------")
-print()
+    # outlines.print_dump()
 
+    with open("src/outline2.txt", "w", encoding="utf-8") as f:
+        f.write(outlines.str_dump(with_range=False))
 
-def print_tab_table(t: list) -> None:
-    for row in t:
-        for cell in row:
-            print(cell.strip() if cell else "", end="\t")
-        print()
-    print()
+    target = TargetTree()
+
+    cr_list = []  # 存储所有匹配到的内容范围
 
+    # 一次遍历目录树即可找到所有匹配
+    for match in target.match_outline(outlines):
+        node, cr = match.node, match.content_range
+        print(
+            f"Matched: {node.text} (Page {node.page_no}) -> "
+            f"Range: Page {cr.start_page} y={cr.start_y} to Page {cr.end_page} y={cr.end_y}"
+        )
+        cr_list.append(cr)
 
-# print("Current working directory:", os.getcwd())
+    print()
+    print("---------- Extraction Results ----------")
+    print()
 
-import logging
+    # print("Current working directory:", os.getcwd())
 
-__import__("sys").stdout = open("out.txt", "w", encoding="utf-8")
+    sys.stdout = open("out.txt", "w", encoding="utf-8")
 
+    logging.disable(logging.CRITICAL)
 
-logging.disable(logging.CRITICAL)
+    count = 5
+
+    # 只分析每个范围覆盖的区域, 而不是让 pdf2docx 解析范围内的所有整页
+    # 需要 pdf2docx 的页面只解析一次, 结果按 PDF 哈希和页码缓存在磁盘上
+    with TableExtractor(pdf_file) as te:
+        for tables in te.extract_many(cr_list[:count]):
+            page_no = None
+            for table in tables:
+                if table["page_no"] != page_no:
+                    page_no = table["page_no"]
+                    print(f"--- Page {page_no} ---")
+                print_tab_table(table["rows"])
 
-pdf_file = "input_pdf/002500_山西证券_2024.pdf"
 
-cv = pdf2docx.Converter(pdf_file)
-
-count = 5
-
-for cr in cr_list[:count]:
-    cv.extract_tables(start=cr.start_page, end=cr.end_page, filename=None)
-    for i in range(cr.start_page, cr.end_page + 1):
-        print(f"--- Page {i} ---")
-        page = cv.pages[i]
-        secs = page.sections
-        for sec in secs:
-            for col in sec:
-                for blk in col.blocks:
-                    if isinstance(blk, pdf2docx.table.TableBlock.TableBlock):
-                        print_tab_table(blk.text)
-                    elif isinstance(blk, pdf2docx.text.TextBlock.TextBlock):
-                        print(blk.raw_text)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import argparse
+import time
+from collections import Counter
+from itertools import islice
+from typing import AbstractSet, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from instrument import NULL, Instrument
+from outline_tree import OutlineTree
+from title_node import TitleNode
+from title_type import TitleType
+
+# 最大标题级别, 一般为 3
+# <XX 公司 XX 年年度报告> 为 0 级标题, 以此类推
+MAX_TITLE_LVL = 4
+MIN_TITLE_SIZE = 10.0  # 标题的字号最小值, 防止有些低频率的小字号被误判为标题
+MAX_TITLE_LENGTH = 50  # 标题的最大长度, 防止某些长段落被误判为标题
+MIN_TOTAL_LENGTH = 30  # 标题的字号所对应的文本总长度下限 (防止"稀有"字号)
+# MAX_TOTAL_LENGTH = 500  # 标题的字号所对应的文本总长度上限
+MAX_PERCENT = 0.3  # 超过该比例的, 认为是正文
+MAX_X_TOLERANCE = 5.0  # 标题两个元素横坐标的最大容忍差距
+MAX_BODY_OCCUR_PERCENT = 0.1  # 超过页数一定比例的, 认为不是标题
+MAX_HEADER_HEIGHT = 80  # 页眉的最大高度
+
+# 标题候选: (字号, bbox, 页码, 文本, 标题类型, 是否居中)
+Candidate = Tuple[float, List[float], int, str, TitleType, bool]
+
+
+def is_centered(width: float, x0: float, x1: float) -> bool:
+    """判断文本块是否居中."""
+    margin = (width - (x1 - x0)) / 2
+    return abs(x0 - margin) < 5 and abs(x1 - (width - margin)) < 5
+
+
+def iter_title_candidates(
+    page: Dict,
+    allowed_sizes: Optional[AbstractSet[float]] = None,
+    stats: Optional[Counter] = None,
+) -> Iterator[Candidate]:
+    """
+    筛选一页中可能是标题的文本块.
+
+    allowed_sizes 为整个文档的标题字号集合 (见 `size_model.SizeModel`), 给出时只需查询集合;
+    为 None 时按本页的字号占比判断.
+    stats 为 Counter 时, 统计每条规则排除的文本块数, 键为 "candidate.<规则>".
+    """
+    total_length = page["total_length"]
+    page_no = page["page_no"]
+    width = page["width"]
+    sizes_count = page["sizes_count"]
+    for block in page["blocks"]:
+        bbox = block["bbox"]
+        lines = block["lines"]
+        first_size = lines[0]["size"]
+        if allowed_sizes is not None:
+            if first_size not in allowed_sizes:
+                if stats is not None:
+                    stats["candidate.not_heading_size"] += 1
+                continue  # 不是文档中的标题字号
+        elif first_size < MIN_TITLE_SIZE:
+            if stats is not None:
+                stats["candidate.small_size"] += 1
+            continue  # 字号过小, 认为是正文
+        elif (sizes_count[str(first_size)] / total_length) > MAX_PERCENT:
+            if stats is not None:
+                stats["candidate.common_size"] += 1
+            continue  # 该字号占比过大, 认为是正文
+        is_whole = True
+        for i, line in enumerate(lines[1:], start=1):
+            if (line["x0"] - lines[i - 1]["x1"]) > MAX_X_TOLERANCE:
+                is_whole = False
+                break
+        if not is_whole:
+            if stats is not None:
+                stats["candidate.not_whole"] += 1
+            continue  # 两个部分间距太远
+
+        # 仅当"第X节"出现时, 才插入空格
+        text = lines[0]["text"]
+        if len(lines) > 1 and TitleType.is_root(text):
+            text += " "
+        text += "".join(line["text"] for line in lines[1:])
+
+        if text.isdigit():
+            if stats is not None:
+                stats["candidate.digits"] += 1
+            continue  # 纯数字, 认为是页码
+        if len(text) > MAX_TITLE_LENGTH:
+            if stats is not None:
+                stats["candidate.too_long"] += 1
+            continue  # 标题过长
+        ttype = TitleType(text)
+        centered = is_centered(width, bbox[0], bbox[2])
+        if ttype.empty() and not centered:
+            if stats is not None:
+                stats["candidate.plain_not_centered"] += 1
+            continue  # 无样式且不居中, 认为是正文
+
+        if stats is not None:
+            stats["candidate.accepted"] += 1
+        yield first_size, bbox, page_no, text, ttype, centered
+
+
+def build_outline(
+    all_pages: List[Dict], allowed_sizes: Optional[AbstractSet[float]] = None
+) -> OutlineTree:
+    """
+    基于完整页面列表建立目录树.
+
+    这是最初的实现方式, 保留作为 `stream_outline` 的对照.
+    """
+    outlines = OutlineTree("Report")
+    for page in all_pages[1:]:  # 封面页特殊处理
+        for size, bbox, page_no, text, ttype, centered in iter_title_candidates(
+            page, allowed_sizes
+        ):
+            # 认为该行是标题, 添加到大纲树中
+            outlines.add_node(size, bbox[1], bbox[3], page_no, text, ttype, centered)
+    return outlines
+
+
+def stream_outline(
+    pages: Iterable[Dict],
+    outlines: OutlineTree,
+    allowed_sizes: Optional[AbstractSet[float]] = None,
+    inst: Instrument = NULL,
+) -> Iterator[TitleNode]:
+    """
+    逐页建立目录树, 每插入一个节点就将其产出.
+
+    pages 可以是生成器 (如 `tmain.iter_pages`), 任意时刻只有一页在内存中,
+    读到后面的页之前就可以拿到前面的节点.
+    整个文档的标题字号需要先看完全部页面, 因此只有 pages 已经在缓存中时才适合传入 allowed_sizes.
+
+    inst 记录筛选 ("filter") 和建树 ("build") 的耗时, 以及各条规则和分支的计数.
+    """
+    outlines.stats = inst.counters
+    for page in islice(pages, 1, None):  # 封面页特殊处理
+        with inst.span("filter"):
+            candidates = list(iter_title_candidates(page, allowed_sizes, inst.counters))
+        if not candidates:
+            continue
+        with inst.span("build"):
+            nodes = [
+                outlines.add_node(
+                    size, bbox[1], bbox[3], page_no, text, ttype, centered
+                )
+                for size, bbox, page_no, text, ttype, centered in candidates
+            ]
+        for node in nodes:
+            if node:
+                yield node
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="逐页建立目录树, 并与列表方式的结果对照"
+    )
+    parser.add_argument("--pdf", default="input_pdf/300059_东方财富_2024.pdf")
+    parser.add_argument("--out", default="src/outline2.txt")
+    parser.add_argument(
+        "--compare", action="store_true", help="同时运行列表方式并对照结果"
+    )
+    args = parser.parse_args()
+
+    from tmain import extract, iter_pages
+
+    start_time = time.time()
+    first_node_time = None
+    outlines = OutlineTree("Report")
+    for _ in stream_outline(iter_pages(args.pdf), outlines):
+        if first_node_time is None:
+            first_node_time = time.time() - start_time
+    elapsed = time.time() - start_time
+    print(
+        f"Streaming: first node after {first_node_time or 0:.2f}s, done in {elapsed:.2f}s."
+    )
+
+    dump = outlines.str_dump(with_range=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        f.write(dump)
+
+    if args.compare:
+        start_time = time.time()
+        reference = build_outline(extract(args.pdf))
+        print(f"List-based: done in {time.time() - start_time:.2f}s.")
+        print(f"Identical outline: {reference.str_dump(with_range=True) == dump}")
+
+
+if __name__ == "__main__":
+    main()
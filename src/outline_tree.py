@@ -1,3 +1,6 @@
+from collections import Counter
+from typing import List, Optional
+
 from title_node import TitleNode
 from title_type import TitleType
 
@@ -8,6 +11,9 @@ class OutlineTree:
     OutlineTree 管理 TitleNode 节点, 形成树状结构.
 
     树包含根节点, 提供添加节点和遍历节点的方法.
+
+    stats 为 Counter 时 (如 `instrument.Instrument.counters`), add_node 会统计每个分支
+    被走到的次数, 键为 "add_node.<分支>"; 为 None 时不统计.
     """
 
     MAX_LEVEL = 3
@@ -21,6 +27,7 @@ class OutlineTree:
 
         # 跟踪最后添加的节点, 便于插入新节点
         self._last_node = self.root
+        self.stats: Optional[Counter] = None
 
     def add_node(
         self,
@@ -31,11 +38,26 @@ class OutlineTree:
         text: str,
         ttype: "TitleType",
         is_centered: bool,
-    ) -> None:
+    ) -> "TitleNode | None":
+        """
+        根据上一个插入的节点, 将标题插入到合适的位置.
+
+        返回新插入的节点, 被忽略时返回 None.
+        """
+
+        stats = self.stats
+
         # 预定义的处理函数
-        def _insert(level: int, parent: "TitleNode | None", pos: int) -> None:
+        def _insert(
+            level: int, parent: "TitleNode | None", branch: str
+        ) -> "TitleNode | None":
+            # pos 总是新节点在实际父节点的子节点中的位置
+            if stats is not None:
+                stats["add_node." + branch] += 1
             if level > OutlineTree.MAX_LEVEL:
-                return  # 超过最大层级, 忽略
+                if stats is not None:
+                    stats["add_node.too_deep"] += 1
+                return None  # 超过最大层级, 忽略
             cur_node = TitleNode(
                 title_type=ttype,
                 size=size,
@@ -45,117 +67,114 @@ class OutlineTree:
                 text=text,
                 level=level,
                 parent=parent,
-                pos=pos,
+                pos=len(parent.children) if parent else 0,
             )
             if parent:
                 parent.children.append(cur_node)
             self._last_node = cur_node
+            return cur_node
 
         last_parent = self._last_node.parent
-        children = last_parent.children if last_parent else None
-        position = len(children) if children else 0
         if ttype.empty():
             if not is_centered:
                 # 非居中, 无标题特征, 视为正文, 忽略
-                return
+                if stats is not None:
+                    stats["add_node.plain_ignored"] += 1
+                return None
             if self._last_node.ttype.empty():
                 # 上一个节点和该节点样式相同, 同级
-                _insert(
+                return _insert(
                     level=self._last_node.level,
                     parent=last_parent,
-                    pos=position,
+                    branch="plain_sibling",
                 )
-                return
             else:
                 # 上一个节点和该节点样式不同, 视为下一级
-                _insert(
+                return _insert(
                     level=self._last_node.level + 1,
                     parent=self._last_node,
-                    pos=0,
+                    branch="plain_child",
                 )
-                return
         else:  # 提取到了标题的某些特征
             if size < self._last_node.size:
                 # 字体更小, 视为下一级
-                _insert(
+                return _insert(
                     level=self._last_node.level + 1,
                     parent=self._last_node,
-                    pos=0,
+                    branch="smaller_child",
                 )
-                return
             if ttype == self._last_node.ttype:
                 # 和上一个节点样式相同, 同级
-                _insert(
+                return _insert(
                     level=self._last_node.level,
                     parent=last_parent,
-                    pos=position,
+                    branch="same_type_sibling",
                 )
-                return
             if size == self._last_node.size:
                 assert last_parent
                 # 字体相同
                 if size == last_parent.size or ttype == last_parent.ttype:
                     # 和父节点字体相同或样式相同, 视为和父节点同级
-                    _insert(
+                    return _insert(
                         level=last_parent.level,
                         parent=last_parent.parent,
-                        pos=position,
+                        branch="same_size_parent_sibling",
                     )
-                    return
                 else:
                     # 视为下一级
-                    _insert(
+                    return _insert(
                         level=self._last_node.level + 1,
                         parent=self._last_node,
-                        pos=0,
+                        branch="same_size_child",
                     )
-                    return
             # 字体更大, 向上查找同级节点
             cur_node = self._last_node.parent
             while cur_node and size > cur_node.size and ttype != cur_node.ttype:
                 cur_node = cur_node.parent
             if not cur_node:
                 # 没找到同级
-                return
+                if stats is not None:
+                    stats["add_node.larger_no_match"] += 1
+                return None
             if ttype == cur_node.ttype:
                 # 插入为同级
-                _insert(
+                return _insert(
                     level=cur_node.level,
                     parent=cur_node.parent,
-                    pos=len(cur_node.parent.children) if cur_node.parent else 0,
+                    branch="larger_sibling",
                 )
-                return
             elif size <= cur_node.size:
                 # 插入为 cur_node 的下一级
-                _insert(
+                return _insert(
                     level=cur_node.level + 1,
                     parent=cur_node,
-                    pos=0,
+                    branch="larger_child",
                 )
+            if stats is not None:
+                stats["add_node.larger_ignored"] += 1
+            return None
 
     def print_dump(self, with_range: bool = False) -> None:
         """打印目录树, 用于调试."""
-
-        def _dump(node: TitleNode, indent: int) -> None:
-            print(" " * indent + f"[L{node.level}] {node.text}", end="")
-            if with_range:
-                print(f" (P{node.page_no} Y[{node.y0}, {node.y1}])", end="")
-            print()
-            for child in node.children:
-                _dump(child, indent + 2)
-
-        _dump(self.root, 0)
+        print(self.str_dump(with_range), end="")
 
     def str_dump(self, with_range: bool = False) -> str:
-        """返回目录树的字符串表示, 用于调试."""
+        """
+        返回目录树的字符串表示, 用于调试.
 
-        def _dump(node: TitleNode, indent: int) -> str:
-            result = " " * indent + f"[L{node.level}] {node.text}"
+        各行收集到列表中最后一次拼接, 耗时与输出长度成正比
+        (逐层拼接子树的字符串时, 每一行都要随每个祖先复制一次).
+        用显式的栈先序遍历, 目录树再深也不会超过递归深度限制.
+        """
+        lines: List[str] = []
+        stack = [(self.root, "")]  # (节点, 缩进)
+        while stack:
+            node, indent = stack.pop()
+            line = f"{indent}[L{node.level}] {node.text}"
             if with_range:
-                result += f" (P{node.page_no} Y[{node.y0}, {node.y1}])"
-            result += "\n"
-            for child in node.children:
-                result += _dump(child, indent + 2)
-            return result
-
-        return _dump(self.root, 0)
+                line += f" (P{node.page_no} Y[{node.y0}, {node.y1}])"
+            lines.append(line + "\n")
+            indent += "  "
+            for child in reversed(node.children):
+                stack.append((child, indent))
+        return "".join(lines)
@@ -0,0 +1,241 @@
+import json
+import mmap
+import struct
+from array import array
+from typing import Dict, Iterable, Iterator, List, Union
+
+
+class PageCache:
+    """
+    页面数据的二进制缓存 (.pgc 文件).
+
+    tmain.py 提取出的页面数据原本以 indent=2 的 JSON 保存, 文件大, 读取慢.
+    这里改为列式存储:
+        - 数值字段 (bbox, x0, x1, size, ...) 各自存为一列连续的数组
+        - 文本存入字符串表, 相同的文本只存一次, 行中只记录字符串编号
+        - 各页/块/行之间用前缀偏移数组 (start 数组) 关联
+
+    读取时使用 mmap, 只有被访问的页才会被解码, 解码结果与 `json.load`
+    读出的格式完全相同 (sizes_count 的键为字符串, bbox 为 list).
+
+    注意: 数组以本机字节序存储, 文件只保证在小端机器之间通用.
+    """
+
+    MAGIC = b"PGC1"
+    VERSION = 1
+
+    # (列名, array 类型码), 顺序即文件中的存放顺序
+    COLUMNS = [
+        ("page_no", "i"),
+        ("page_width", "d"),
+        ("page_total", "q"),
+        ("page_block_start", "I"),  # 长度为页数 + 1
+        ("page_size_start", "I"),  # 长度为页数 + 1
+        ("block_bbox", "d"),  # 每个块 4 个元素
+        ("block_line_start", "I"),  # 长度为块数 + 1
+        ("line_x0", "d"),
+        ("line_x1", "d"),
+        ("line_size", "d"),
+        ("line_text", "I"),
+        ("size_value", "d"),
+        ("size_length", "q"),
+        ("str_offset", "I"),  # 长度为字符串数 + 1
+        ("str_blob", "B"),  # 所有字符串的 utf-8 编码拼接
+    ]
+
+    _HEADER = struct.Struct("<4sHHI")  # magic, version, 列数, 页数
+    _SECTION = struct.Struct("<QQ")  # 偏移, 字节数
+    _ALIGN = 8
+
+    def __init__(self, filename: str) -> None:
+        self._file = open(filename, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mm)
+
+        magic, version, n_cols, self._page_count = PageCache._HEADER.unpack_from(
+            self._buf, 0
+        )
+        if magic != PageCache.MAGIC or version != PageCache.VERSION:
+            self.close()
+            raise ValueError(
+                f"{filename} is not a page cache file (v{PageCache.VERSION})"
+            )
+        if n_cols != len(PageCache.COLUMNS):
+            self.close()
+            raise ValueError(
+                f"{filename} has {n_cols} columns, expected {len(PageCache.COLUMNS)}"
+            )
+
+        self._cols: Dict[str, memoryview] = {}
+        pos = PageCache._HEADER.size
+        for name, code in PageCache.COLUMNS:
+            offset, nbytes = PageCache._SECTION.unpack_from(self._buf, pos)
+            pos += PageCache._SECTION.size
+            self._cols[name] = self._buf[offset : offset + nbytes].cast(code)
+
+        self._strings: Dict[int, str] = {}  # 已解码的字符串
+
+    def __len__(self) -> int:
+        return self._page_count
+
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += self._page_count
+        if not 0 <= index < self._page_count:
+            raise IndexError("page index out of range")
+        return self._decode_page(index)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(self._page_count):
+            yield self._decode_page(i)
+
+    def __enter__(self) -> "PageCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """释放 mmap, 之后不能再读取."""
+        for col in getattr(self, "_cols", {}).values():
+            col.release()
+        self._cols = {}
+        if getattr(self, "_buf", None) is not None:
+            self._buf.release()
+            self._buf = None
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
+
+    def column(self, name: str) -> memoryview:
+        """
+        直接访问某一列 (见 COLUMNS), 不解码页面, 用于整个文档的向量化统计.
+
+        返回的 memoryview 在 close() 之后失效, 需要长期保存时应当复制.
+        """
+        return self._cols[name]
+
+    def _string(self, sid: int) -> str:
+        text = self._strings.get(sid)
+        if text is None:
+            offsets = self._cols["str_offset"]
+            text = bytes(
+                self._cols["str_blob"][offsets[sid] : offsets[sid + 1]]
+            ).decode("utf-8")
+            self._strings[sid] = text
+        return text
+
+    def _decode_page(self, i: int) -> Dict:
+        c = self._cols
+        bbox, line_start = c["block_bbox"], c["block_line_start"]
+        x0, x1, size, text = c["line_x0"], c["line_x1"], c["line_size"], c["line_text"]
+
+        blocks = []
+        for b in range(c["page_block_start"][i], c["page_block_start"][i + 1]):
+            lines = [
+                {
+                    "x0": x0[ln],
+                    "x1": x1[ln],
+                    "size": size[ln],
+                    "text": self._string(text[ln]),
+                }
+                for ln in range(line_start[b], line_start[b + 1])
+            ]
+            blocks.append({"bbox": bbox[4 * b : 4 * b + 4].tolist(), "lines": lines})
+
+        sizes_count = {
+            str(c["size_value"][s]): c["size_length"][s]
+            for s in range(c["page_size_start"][i], c["page_size_start"][i + 1])
+        }
+        return {
+            "page_no": c["page_no"][i],
+            "width": c["page_width"][i],
+            "blocks": blocks,
+            "sizes_count": sizes_count,
+            "total_length": c["page_total"][i],
+        }
+
+
+def write_page_cache(filename: str, all_pages: Iterable[Dict]) -> None:
+    """
+    将页面数据写为 .pgc 文件.
+
+    all_pages 的格式与 tmain.py 的输出相同, sizes_count 的键可以是浮点数或字符串.
+    """
+    cols = {name: array(code) for name, code in PageCache.COLUMNS}
+    string_ids: Dict[str, int] = {}
+    blob = bytearray()
+
+    def intern(text: str) -> int:
+        sid = string_ids.get(text)
+        if sid is None:
+            sid = len(string_ids)
+            string_ids[text] = sid
+            cols["str_offset"].append(len(blob))
+            blob.extend(text.encode("utf-8"))
+        return sid
+
+    cols["page_block_start"].append(0)
+    cols["page_size_start"].append(0)
+    cols["block_line_start"].append(0)
+    page_count = 0
+    for page in all_pages:
+        page_count += 1
+        cols["page_no"].append(page["page_no"])
+        cols["page_width"].append(page["width"])
+        cols["page_total"].append(page["total_length"])
+        for block in page["blocks"]:
+            cols["block_bbox"].extend(block["bbox"])
+            for line in block["lines"]:
+                cols["line_x0"].append(line["x0"])
+                cols["line_x1"].append(line["x1"])
+                cols["line_size"].append(line["size"])
+                cols["line_text"].append(intern(line["text"]))
+            cols["block_line_start"].append(len(cols["line_x0"]))
+        cols["page_block_start"].append(len(cols["block_line_start"]) - 1)
+        for size, length in page["sizes_count"].items():
+            cols["size_value"].append(float(size))
+            cols["size_length"].append(length)
+        cols["page_size_start"].append(len(cols["size_value"]))
+    cols["str_offset"].append(len(blob))
+    cols["str_blob"] = array("B", blob)
+
+    header_size = PageCache._HEADER.size + PageCache._SECTION.size * len(
+        PageCache.COLUMNS
+    )
+    sections = []
+    offset = header_size
+    for name, _ in PageCache.COLUMNS:
+        offset += -offset % PageCache._ALIGN  # 每一列按 8 字节对齐
+        nbytes = len(cols[name]) * cols[name].itemsize
+        sections.append((offset, nbytes))
+        offset += nbytes
+
+    with open(filename, "wb") as f:
+        f.write(
+            PageCache._HEADER.pack(
+                PageCache.MAGIC, PageCache.VERSION, len(PageCache.COLUMNS), page_count
+            )
+        )
+        for section in sections:
+            f.write(PageCache._SECTION.pack(*section))
+        for (name, _), (offset, _) in zip(PageCache.COLUMNS, sections):
+            f.write(b"\0" * (offset - f.tell()))
+            cols[name].tofile(f)
+
+
+def load_pages(filename: str) -> Union[PageCache, List[Dict]]:
+    """根据扩展名读取页面数据: .pgc 为二进制缓存, 其他按 JSON 读取."""
+    if filename.endswith(".pgc"):
+        return PageCache(filename)
+    with open(filename, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_pages(filename: str, all_pages: Iterable[Dict]) -> None:
+    """根据扩展名保存页面数据: .pgc 为二进制缓存, 其他按 JSON 保存."""
+    if filename.endswith(".pgc"):
+        write_page_cache(filename, all_pages)
+        return
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(list(all_pages), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,461 @@
+import argparse
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import pymupdf
+
+from content_range import ContentRange
+from extract_cache import ExtractCache
+from header_footer import PageBands, detect_bands
+from instrument import NULL, Instrument
+from outline_builder import stream_outline
+from outline_tree import OutlineTree
+from page_cache import PageCache
+from target_tree import TargetMatch, TargetTree
+from title_node import TitleNode
+
+PAGE_QUEUE_SIZE = 16  # 提取线程最多领先目录树线程的页数
+MAX_PENDING_TABLES = 8  # 已提交但尚未完成的表格任务数上限
+MAX_OPEN_EXTRACTORS = 2  # 每个表格进程中保持打开的文档数
+_END = object()  # 页面队列的结束标记
+
+
+class SectionResult(NamedTuple):
+    """一个目标的提取结果: 匹配 (节点, 目标路径, 范围) 和范围内的表格."""
+
+    match: TargetMatch
+    tables: Optional[List[Dict]]  # 不提取表格时为 None
+
+
+def range_closed(node: TitleNode) -> bool:
+    """
+    节点的内容范围是否已经确定, 之后插入的节点不会再改变 `TargetTree.content_range` 的结果.
+
+    - 节点已有后继节点: 范围到后继节点为止
+    - 节点是最后一个子节点, 而父节点已有后继节点: 新节点只会插入到父节点的后继节点
+      及其后, 不会再成为该节点的兄弟, 范围到父节点的后继节点为止
+    其余情况 (包括父节点也是最后一个) 要等到文档结束才能确定.
+    """
+    parent = node.parent
+    assert parent
+    if node.pos < len(parent.children) - 1:
+        return True
+    p_parent = parent.parent
+    return p_parent is not None and parent.pos < len(p_parent.children) - 1
+
+
+# 表格进程中打开的 TableExtractor, 同一文档的多个范围共用一个 (及其 pdf2docx 解析结果)
+_extractors: "OrderedDict[tuple, object]" = OrderedDict()
+
+
+def _extract_tables(
+    pdf_path: str,
+    cr: ContentRange,
+    engine: str,
+    cache_dir: Optional[str],
+    strip_bands: bool,
+) -> List[Dict]:
+    """
+    在表格进程中提取一个范围的表格.
+
+    打开的 TableExtractor 以文件的大小和修改时间区分: 同一路径的文件被覆盖后
+    打开新的文档, 旧的按 LRU 关闭, 不会用旧文档的表格回答新文件的请求.
+    """
+    from table_extractor import TableExtractor
+
+    st = os.stat(pdf_path)
+    key = (pdf_path, st.st_size, st.st_mtime_ns, engine, cache_dir, strip_bands)
+    te = _extractors.pop(key, None)
+    if te is None:
+        te = TableExtractor(pdf_path, engine, cache_dir, strip_bands)
+    _extractors[key] = te
+    while len(_extractors) > MAX_OPEN_EXTRACTORS:
+        _, old = _extractors.popitem(last=False)
+        old.close()
+    return te.extract(cr)
+
+
+def _warm_worker(engine: str) -> None:
+    """
+    表格进程的初始化: 预先导入表格提取用到的库, 第一个任务不必等待导入.
+
+    pdf2docx 只在使用它的引擎时导入, 默认的 pymupdf 引擎不需要它.
+    """
+    import table_extractor  # noqa: F401
+
+    if engine == "pdf2docx":
+        import pdf2docx  # noqa: F401
+
+
+def _noop() -> None:
+    pass
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """阻塞地放入队列, 消费者已经退出 (stop 被设置) 时放弃并返回 False."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class Pipeline:
+    """
+    提取 -> 目录树 -> 目标匹配 -> 表格 的并发流水线.
+
+    原来的流程是逐个阶段完成的: 先提取全部页面, 再建立目录树并匹配, 最后提取表格.
+    这里各阶段通过有界队列相连, 同时进行:
+
+        提取线程 --(页面队列)--> 目录树 / 匹配 (调用线程) --(信号量)--> 表格进程池
+
+    - 目录树的来源和标题字号的规则与 `toc_outline.outline_for_pdf` 完全相同: 书签或目录页
+      可用时一次得到完整的目录树, 所有范围立即提交; 否则用整个文档的标题字号
+      (`SizeModel`) 逐页建立目录树. 因此同一 PDF 的结果与 omain, batch 一致,
+      也与缓存是否命中无关
+    - 整个文档的标题字号要看完全部页面才能得到: 提取缓存 (cache) 命中时直接读取缓存的
+      字号列, 逐页解码缓存中的页面; 否则先做一遍只统计字号的提取 (`tmain.page_sizes`),
+      再由提取线程逐页提取 (给出 cache 时同时写入缓存)
+    - 提取线程逐页调用 pymupdf (大部分时间不持有 GIL), 领先不超过 page_queue_size 页
+    - 调用线程逐页建立目录树 (`stream_outline`), 对每个新节点调用 `TargetTree.match_node`;
+      匹配到的范围在被后面的标题关闭 (见 `range_closed`) 后立即提交表格任务,
+      不必等整篇文档处理完
+    - 表格在进程池中提取 (find_tables 和 pdf2docx 都是纯 CPU 计算),
+      同时最多有 max_pending_tables 个任务未完成
+
+    任何一个队列满了, 上游就会阻塞, 因此同时存在的页面数与文档页数无关
+    (写入缓存时只累积列式的数组, 见 `page_cache.write_page_cache`).
+    多篇文档 (`run_many`) 共用同一个进程池和信号量, 一篇文档的表格可以与
+    下一篇的提取同时进行.
+    """
+
+    def __init__(
+        self,
+        target: TargetTree,
+        table_workers: int = 2,
+        tables: bool = True,
+        engine: str = "pymupdf",
+        cache_dir: Optional[str] = ".cache/pdf2docx",
+        strip_bands: bool = True,
+        cache: Optional[ExtractCache] = None,
+        page_queue_size: int = PAGE_QUEUE_SIZE,
+        max_pending_tables: int = MAX_PENDING_TABLES,
+    ) -> None:
+        self.target = target
+        self.tables = tables
+        self.engine = engine
+        self.cache_dir = cache_dir
+        self.strip_bands = strip_bands
+        self.cache = cache
+        self.page_queue_size = page_queue_size
+        self._slots = threading.BoundedSemaphore(max_pending_tables)
+        self._executor = (
+            ProcessPoolExecutor(
+                max_workers=table_workers,
+                initializer=_warm_worker,
+                initargs=(engine,),
+            )
+            if tables
+            else None
+        )
+        self.table_workers = table_workers
+
+    def __enter__(self) -> "Pipeline":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def warm(self) -> None:
+        """启动所有表格进程并等待其完成初始化."""
+        if self._executor is not None:
+            for future in [
+                self._executor.submit(_noop) for _ in range(self.table_workers)
+            ]:
+                future.result()
+
+    def run(
+        self,
+        pdf_path: str,
+        inst: Instrument = NULL,
+        targets: Optional[Iterable[Tuple[str, ...]]] = None,
+        tables: bool = True,
+    ) -> List[SectionResult]:
+        """
+        处理一篇文档, 结果的顺序与 `TargetTree.match_outline` 相同.
+
+        targets 不为 None 时只保留这些目标路径 (或其下) 的匹配, 其他范围不提取表格.
+        tables 为 False 时本次不提取表格.
+        """
+        if targets is not None:
+            targets = [tuple(t) for t in targets]
+        submitted: List[Tuple[int, TargetMatch, Optional[Future]]] = []
+        for order, match in self.iter_matches(pdf_path, inst):
+            if targets is not None and not any(
+                match.target[: len(t)] == t for t in targets
+            ):
+                continue
+            future = self._submit(pdf_path, match) if tables else None
+            submitted.append((order, match, future))
+        submitted.sort(key=lambda item: item[0])
+        with inst.span("tables_wait"):
+            return [
+                SectionResult(match, future.result() if future else None)
+                for _, match, future in submitted
+            ]
+
+    def run_many(
+        self, pdfs: Iterable[str], documents: int = 2
+    ) -> Iterator[Tuple[str, List[SectionResult]]]:
+        """同时处理至多 documents 篇文档, 按输入的顺序产出 (文件名, 结果)."""
+        pdfs = list(pdfs)
+        with ThreadPoolExecutor(max_workers=documents) as pool:
+            yield from zip(pdfs, pool.map(self.run, pdfs))
+
+    def _submit(self, pdf_path: str, match: TargetMatch) -> Optional[Future]:
+        if self._executor is None:
+            return None
+        self._slots.acquire()  # 表格任务太多时在这里阻塞, 进而阻塞页面队列
+        future = self._executor.submit(
+            _extract_tables,
+            pdf_path,
+            match.content_range,
+            self.engine,
+            self.cache_dir,
+            self.strip_bands,
+        )
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def iter_matches(
+        self, pdf_path: str, inst: Instrument = NULL
+    ) -> Iterator[Tuple[int, TargetMatch]]:
+        """
+        按范围关闭的顺序产出 (匹配序号, 匹配), 产出时范围已经确定.
+
+        匹配序号是节点被匹配的顺序, 即目录树先序遍历的顺序.
+        """
+        from size_model import SizeModel
+        from tmain import page_sizes
+        from toc_outline import fixed_outline
+
+        with pymupdf.open(pdf_path) as doc:
+            outlines = fixed_outline(doc, inst=inst, cache=self.cache)
+        if outlines is not None:
+            yield from enumerate(self.target.match_outline(outlines))
+            return
+
+        cached = self._cached_pages(pdf_path)
+        if cached is not None:
+            with cached:
+                with inst.span("size_model"):
+                    allowed_sizes = SizeModel.from_pages(cached).allowed_sizes
+                yield from self._match_stream(cached, allowed_sizes, inst)
+            inst.count("outline.heuristic")
+            return
+
+        with pymupdf.open(pdf_path) as doc:
+            bands = detect_bands(doc) if self.strip_bands else None
+            with inst.span("size_model"):
+                allowed_sizes = SizeModel.from_pages(
+                    page_sizes(page, bands) for page in doc
+                ).allowed_sizes
+
+        page_queue: queue.Queue = queue.Queue(self.page_queue_size)
+        stop = threading.Event()
+        errors: List[BaseException] = []
+        producer = threading.Thread(
+            target=self._produce,
+            args=(pdf_path, bands, page_queue, stop, errors),
+            name="pipeline-extract",
+            daemon=True,
+        )
+        producer.start()
+
+        def _drain() -> Iterator[Dict]:
+            while True:
+                page = page_queue.get()
+                if page is _END:
+                    return
+                yield page
+
+        try:
+            yield from self._match_stream(_drain(), allowed_sizes, inst)
+        finally:
+            stop.set()
+            producer.join()
+        if errors:
+            raise errors[0]
+        inst.count("outline.heuristic")
+
+    def _cache_key(self, pdf_path: str) -> str:
+        from tmain import extractor_settings
+
+        assert self.cache is not None
+        return self.cache.key(pdf_path, extractor_settings(self.strip_bands))
+
+    def _cached_pages(self, pdf_path: str) -> Optional[PageCache]:
+        """提取缓存命中时返回缓存的页面, 否则返回 None."""
+        if self.cache is None:
+            return None
+        return self.cache.get(self._cache_key(pdf_path))
+
+    def _produce(
+        self,
+        pdf_path: str,
+        bands: Optional[PageBands],
+        page_queue: queue.Queue,
+        stop: threading.Event,
+        errors: List[BaseException],
+    ) -> None:
+        """
+        提取线程: 逐页提取放入队列, 最后放入结束标记.
+
+        给出 cache 时, 提取的页面同时写入缓存; 消费者提前退出时不写入不完整的条目.
+        """
+        from tmain import iter_pages
+
+        def _feed() -> Iterator[Dict]:
+            # 页眉页脚已经检测过 (bands), 不再检测
+            for page in iter_pages(pdf_path, strip_bands=False, bands=bands):
+                if not _put(page_queue, page, stop):
+                    raise _Abandoned()
+                yield page
+
+        try:
+            if self.cache is None:
+                for _ in _feed():
+                    pass
+            else:
+                self.cache.put(self._cache_key(pdf_path), _feed()).close()
+        except _Abandoned:
+            return
+        except BaseException as e:
+            errors.append(e)
+        _put(page_queue, _END, stop)
+
+    def _match_stream(
+        self, pages: Iterable[Dict], allowed_sizes, inst: Instrument
+    ) -> Iterator[Tuple[int, TargetMatch]]:
+        outlines = OutlineTree("Report")
+        pending: List[Tuple[int, TitleNode, Tuple[str, ...]]] = []  # 范围尚未确定的匹配
+        matched = 0
+        for node in stream_outline(pages, outlines, allowed_sizes, inst):
+            if pending:
+                still_open = []
+                for order, matched_node, path in pending:
+                    if range_closed(matched_node):
+                        yield order, _final_match(matched_node, path)
+                    else:
+                        still_open.append((order, matched_node, path))
+                pending = still_open
+            match = self.target.match_node(node)
+            if match:
+                pending.append((matched, node, match.target))
+                matched += 1
+        # 文档结束, 剩下的范围也确定了
+        for order, matched_node, path in pending:
+            yield order, _final_match(matched_node, path)
+
+
+class _Abandoned(Exception):
+    """目录树线程已经退出, 提取线程停止提取."""
+
+
+def _final_match(node: TitleNode, path: Tuple[str, ...]) -> TargetMatch:
+    return TargetMatch(node, path, TargetTree.content_range(node))
+
+
+def _serial(
+    pdf_path: str, target: TargetTree, tables: bool, engine: str
+) -> List[SectionResult]:
+    """逐个阶段的原始流程 (与 omain 相同), 用于对照."""
+    from table_extractor import TableExtractor
+    from toc_outline import outline_for_pdf
+
+    matches = target.match_outline(outline_for_pdf(pdf_path))
+    if not tables:
+        return [SectionResult(m, None) for m in matches]
+    with TableExtractor(pdf_path, engine, cache_dir=None) as te:
+        found = te.extract_many([m.content_range for m in matches])
+    return [SectionResult(m, t) for m, t in zip(matches, found)]
+
+
+def _summary(results: List[SectionResult]) -> List[tuple]:
+    return [
+        (
+            r.match.target,
+            r.match.node.text,
+            r.match.node.page_no,
+            vars(r.match.content_range),
+            r.tables,
+        )
+        for r in results
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="以流水线方式提取: 提取, 目录树, 匹配和表格同时进行"
+    )
+    parser.add_argument("pdfs", nargs="+", help="要处理的 PDF 文件")
+    parser.add_argument("--config", default="./config.yaml")
+    parser.add_argument("--table-workers", type=int, default=2, help="表格进程数")
+    parser.add_argument("--documents", type=int, default=2, help="同时处理的文档数")
+    parser.add_argument("--engine", default="pymupdf", help="表格引擎")
+    parser.add_argument("--no-tables", action="store_true", help="不提取表格")
+    parser.add_argument(
+        "--compare", action="store_true", help="同时运行逐阶段的流程并对照结果"
+    )
+    args = parser.parse_args()
+
+    target = TargetTree(args.config)
+    start_time = time.time()
+    with Pipeline(
+        target,
+        table_workers=args.table_workers,
+        tables=not args.no_tables,
+        engine=args.engine,
+    ) as pipeline:
+        results = dict(pipeline.run_many(args.pdfs, args.documents))
+    elapsed = time.time() - start_time
+
+    for pdf, sections in results.items():
+        print(f"==== {pdf}")
+        for r in sections:
+            cr = r.match.content_range
+            tables = "-" if r.tables is None else len(r.tables)
+            print(
+                f"{'/'.join(r.match.target)}: {r.match.node.text} "
+                f"(Page {cr.start_page} y={cr.start_y:.1f} to Page {cr.end_page} "
+                f"y={cr.end_y:.1f}), tables: {tables}"
+            )
+    print(f"Pipeline: {elapsed:.2f}s.")
+
+    if args.compare:
+        start_time = time.time()
+        reference = {
+            pdf: _serial(pdf, target, not args.no_tables, args.engine)
+            for pdf in args.pdfs
+        }
+        print(f"Serial: {time.time() - start_time:.2f}s.")
+        identical = all(
+            _summary(results[pdf]) == _summary(reference[pdf]) for pdf in args.pdfs
+        )
+        print(f"Identical results: {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from content_index import TEXT, ContentIndex
+from extract_cache import ExtractCache
+from instrument import METRIC_PREFIX, Instrument
+from pipeline import Pipeline, SectionResult
+from target_tree import TargetTree
+
+MAX_REQUESTS = 4  # 同时处理的请求数上限, 超过时返回 503
+MAX_BODY_BYTES = 1 << 20  # 请求体的大小上限
+
+
+class ExtractService:
+    """
+    常驻的提取服务的状态: 编译好的目标树, 预热的表格进程池, 并发限制和累计指标.
+
+    每个请求在自己的线程中运行 `Pipeline.run`, 表格任务提交到共用的进程池,
+    提取结果经过与 CLI 相同的提取缓存 (extract_cache_dir 为 None 时不使用缓存),
+    同时运行的请求数不超过 max_requests, 多出的请求直接拒绝 (而不是排队),
+    由调用方决定是否重试.
+    """
+
+    def __init__(
+        self,
+        config: str = "./config.yaml",
+        table_workers: int = 2,
+        max_requests: int = MAX_REQUESTS,
+        engine: str = "pymupdf",
+        cache_dir: Optional[str] = ".cache/pdf2docx",
+        fuzzy_threshold: Optional[float] = None,
+        extract_cache_dir: Optional[str] = ".cache/extract",
+    ) -> None:
+        self.target = TargetTree(config, fuzzy_threshold)
+        self.pipeline = Pipeline(
+            self.target,
+            table_workers=table_workers,
+            engine=engine,
+            cache_dir=cache_dir,
+            cache=ExtractCache(extract_cache_dir) if extract_cache_dir else None,
+        )
+        self.pipeline.warm()
+        self.max_requests = max_requests
+        self._slots = threading.BoundedSemaphore(max_requests)
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.in_flight = 0
+        self.requests: Dict[str, int] = {}  # 状态码 -> 次数
+        self.totals = Instrument("all")  # 所有请求的计时和计数之和
+
+    def close(self) -> None:
+        self.pipeline.close()
+
+    def try_acquire(self) -> bool:
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def record(self, status: int, inst: Optional[Instrument] = None) -> None:
+        with self._lock:
+            key = str(status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if inst is not None:
+                self.totals.merge(inst)
+
+    def extract(
+        self,
+        pdf: str,
+        targets: Optional[List[Tuple[str, ...]]],
+        tables: bool,
+        text: bool = True,
+    ) -> Tuple[List[SectionResult], Optional[List[str]], Instrument]:
+        """
+        处理一篇文档, 返回 (各范围的结果, 各范围的正文, 计时和计数).
+
+        正文由 `ContentIndex` 按范围取出 (去掉页眉页脚), 为范围中各文本块的文本,
+        以换行连接; 表格已经单独返回, 这里不识别表格, 表格中的文字也包含在正文中.
+        text 为 False 时不取正文, 返回 None.
+        """
+        inst = Instrument(pdf)
+        texts = None
+        with inst.span("request"):
+            results = self.pipeline.run(pdf, inst, targets, tables)
+            if text:
+                with ContentIndex(
+                    pdf, tables=False, strip_bands=self.pipeline.strip_bands, inst=inst
+                ) as index:
+                    ranges = (r.match.content_range for r in results)
+                    texts = [
+                        "\n".join(item.text for item in items if item.kind == TEXT)
+                        for items in index.query_many(ranges)
+                    ]
+        return results, texts, inst
+
+    def health(self) -> Dict:
+        with self._lock:
+            return {
+                "status": "ok",
+                "uptime_s": round(time.time() - self.started, 3),
+                "in_flight": self.in_flight,
+                "max_requests": self.max_requests,
+                "requests": dict(self.requests),
+            }
+
+    def metrics(self) -> str:
+        """Prometheus 文本格式: 请求计数, 当前并发数, 以及各阶段的累计耗时和计数."""
+        with self._lock:
+            lines = [
+                f"# HELP {METRIC_PREFIX}_requests_total Requests by HTTP status.",
+                f"# TYPE {METRIC_PREFIX}_requests_total counter",
+            ]
+            for status, count in sorted(self.requests.items()):
+                lines.append(
+                    f'{METRIC_PREFIX}_requests_total{{status="{status}"}} {count}'
+                )
+            lines += [
+                f"# HELP {METRIC_PREFIX}_requests_in_flight Requests being processed.",
+                f"# TYPE {METRIC_PREFIX}_requests_in_flight gauge",
+                f"{METRIC_PREFIX}_requests_in_flight {self.in_flight}",
+            ]
+            return "\n".join(lines) + "\n" + self.totals.to_prometheus()
+
+
+def _finite(value: float) -> Optional[float]:
+    """JSON 中没有 inf, 开放的范围末端用 null 表示."""
+    return value if math.isfinite(value) else None
+
+
+def section_json(result: SectionResult, text: Optional[str] = None) -> Dict:
+    match = result.match
+    cr = match.content_range
+    return {
+        "target": list(match.target),
+        "title": match.node.text,
+        "page_no": match.node.page_no,
+        "range": {
+            "start_page": cr.start_page,
+            "start_y": cr.start_y,
+            "end_page": None if cr.end_page >= TargetTree.MAX_PAGES else cr.end_page,
+            "end_y": _finite(cr.end_y),
+        },
+        "text": text,
+        "tables": result.tables,
+    }
+
+
+def parse_targets(raw) -> Optional[List[Tuple[str, ...]]]:
+    """
+    目标路径列表, 每一项为 "重要事项/重大诉讼、仲裁事项" 形式的字符串或名称列表.
+
+    raw 为 None 时表示所有目标. 格式不对时抛出 ValueError.
+    """
+    if raw is None:
+        return None
+    if not isinstance(raw, list):
+        raise ValueError("'targets' must be a list")
+    targets = []
+    for item in raw:
+        if isinstance(item, str):
+            path = tuple(p for p in item.split("/") if p)
+        elif isinstance(item, list) and all(isinstance(p, str) for p in item):
+            path = tuple(item)
+        else:
+            raise ValueError(f"invalid target: {item!r}")
+        if not path:
+            raise ValueError("empty target")
+        targets.append(path)
+    return targets
+
+
+class ExtractHandler(BaseHTTPRequestHandler):
+    """
+    HTTP 接口:
+        POST /extract  {"pdf": 本地路径, "targets": [...] (可选), "tables": true (可选),
+                        "text": true (可选)}
+        GET  /health   服务状态 (JSON)
+        GET  /metrics  Prometheus 指标
+    """
+
+    service: ExtractService  # 由 make_server 设置
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send_json(200, self.service.health())
+        elif self.path == "/metrics":
+            self._send(
+                200,
+                self.service.metrics().encode("utf-8"),
+                "text/plain; version=0.0.4; charset=utf-8",
+            )
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        if self.path != "/extract":
+            self._send_json(404, {"error": "not found"})
+            return
+        if not self.service.try_acquire():
+            self.service.record(503)
+            self.close_connection = True  # 请求体没有读取, 不能复用连接
+            self._send_json(503, {"error": "busy"}, {"Retry-After": "1"})
+            return
+        try:
+            status, body = self._extract()
+        finally:
+            self.service.release()
+        self._send_json(status, body)
+
+    def _extract(self) -> Tuple[int, Dict]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.service.record(413)
+            self.close_connection = True
+            return 413, {"error": "request body too large"}
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            pdf = request["pdf"]
+            targets = parse_targets(request.get("targets"))
+            tables = bool(request.get("tables", True))
+            text = bool(request.get("text", True))
+            if not isinstance(pdf, str):
+                raise TypeError("'pdf' must be a string")
+        except (ValueError, KeyError, TypeError) as e:
+            self.service.record(400)
+            return 400, {"error": f"bad request: {e}"}
+        if not os.path.isfile(pdf):
+            self.service.record(404)
+            return 404, {"error": f"no such file: {pdf}"}
+
+        start = time.time()
+        try:
+            results, texts, inst = self.service.extract(pdf, targets, tables, text)
+        except Exception as e:
+            self.service.record(500)
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+        self.service.record(200, inst)
+        return 200, {
+            "pdf": pdf,
+            "elapsed_s": round(time.time() - start, 3),
+            "sections": [
+                section_json(r, t)
+                for r, t in zip(results, texts or [None] * len(results))
+            ],
+        }
+
+    def _send_json(
+        self, status: int, body: Dict, headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self._send(status, data, "application/json; charset=utf-8", headers)
+
+    def _send(
+        self,
+        status: int,
+        data: bytes,
+        content_type: str,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(
+    service: ExtractService, host: str = "127.0.0.1", port: int = 8765
+) -> ThreadingHTTPServer:
+    handler = type("Handler", (ExtractHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="常驻的提取服务: 保持目标树, 依赖库和表格进程池的预热状态"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", default="./config.yaml")
+    parser.add_argument("--table-workers", type=int, default=2, help="表格进程数")
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=MAX_REQUESTS,
+        help="同时处理的请求数上限",
+    )
+    parser.add_argument("--engine", default="pymupdf", help="表格引擎")
+    parser.add_argument("--cache-dir", default=".cache/pdf2docx")
+    parser.add_argument(
+        "--extract-cache-dir", default=".cache/extract", help="提取结果缓存目录"
+    )
+    parser.add_argument("--fuzzy", type=float, help="近似匹配的相似度下限")
+    args = parser.parse_args()
+
+    service = ExtractService(
+        args.config,
+        table_workers=args.table_workers,
+        max_requests=args.max_requests,
+        engine=args.engine,
+        cache_dir=args.cache_dir,
+        fuzzy_threshold=args.fuzzy,
+        extract_cache_dir=args.extract_cache_dir,
+    )
+    server = make_server(service, args.host, args.port)
+    print(f"Listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
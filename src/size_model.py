@@ -0,0 +1,126 @@
+import argparse
+from typing import Dict, FrozenSet, Iterable, Tuple, Union
+
+import numpy as np
+
+from outline_builder import (
+    MAX_BODY_OCCUR_PERCENT,
+    MAX_PERCENT,
+    MIN_TITLE_SIZE,
+    MIN_TOTAL_LENGTH,
+)
+from page_cache import PageCache
+
+
+class SizeModel:
+    """
+    整个文档的字号直方图, 以及由此得出的"可能是标题"的字号集合.
+
+    原来的做法是对每个文本块查一次本页的 `sizes_count[str(size)] / total_length`,
+    只能看到一页的情况. 这里一次性统计全文:
+        - sizes:   出现过的字号 (升序)
+        - lengths: 每个字号对应的文本总长度
+        - pages:   每个字号出现的页数
+        - dominant_pages: 该字号在本页占比超过 MAX_PERCENT 的页数
+
+    一个字号可以作为标题字号, 当且仅当:
+        - 不小于 MIN_TITLE_SIZE
+        - 全文的文本总长度不少于 MIN_TOTAL_LENGTH (防止"稀有"字号)
+        - 在本页占多数 (即是正文) 的页数不超过总页数的 MAX_BODY_OCCUR_PERCENT
+
+    之后逐块筛选时只需要查询 `allowed_sizes` 集合.
+    """
+
+    def __init__(
+        self,
+        page_sizes: np.ndarray,
+        page_lengths: np.ndarray,
+        page_totals: np.ndarray,
+        page_count: int,
+    ) -> None:
+        """
+        参数为按 (页, 字号) 展开的三个等长数组: 字号, 该字号在本页的文本长度,
+        本页的文本总长度.
+        """
+        self.page_count = page_count
+        self.sizes, inverse = np.unique(page_sizes, return_inverse=True)
+        self.lengths = np.bincount(
+            inverse, weights=page_lengths, minlength=len(self.sizes)
+        )
+        self.pages = np.bincount(inverse, minlength=len(self.sizes))
+        dominant = page_lengths / np.maximum(page_totals, 1) > MAX_PERCENT
+        self.dominant_pages = np.bincount(
+            inverse, weights=dominant, minlength=len(self.sizes)
+        )
+
+        mask = (
+            (self.sizes >= MIN_TITLE_SIZE)
+            & (self.lengths >= MIN_TOTAL_LENGTH)
+            & (self.dominant_pages <= MAX_BODY_OCCUR_PERCENT * page_count)
+        )
+        # tolist() 得到的是 Python float, 与页面数据中的字号可以直接比较
+        self.allowed_sizes: FrozenSet[float] = frozenset(self.sizes[mask].tolist())
+
+    @classmethod
+    def from_pages(cls, pages: Union[PageCache, Iterable[Dict]]) -> "SizeModel":
+        """
+        由页面数据建立模型.
+
+        pages 为 PageCache 时直接读取字号列, 不需要解码任何页面;
+        否则遍历各页的 sizes_count (只看字典, 不看文本块).
+        """
+        if isinstance(pages, PageCache):
+            starts = np.array(pages.column("page_size_start"), dtype=np.int64)
+            totals = np.array(pages.column("page_total"), dtype=np.float64)
+            return cls(
+                np.array(pages.column("size_value"), dtype=np.float64),
+                np.array(pages.column("size_length"), dtype=np.float64),
+                np.repeat(totals, np.diff(starts)),
+                len(pages),
+            )
+
+        sizes, lengths, totals = [], [], []
+        page_count = 0
+        for page in pages:
+            page_count += 1
+            sizes_count = page["sizes_count"]
+            sizes.extend(sizes_count.keys())
+            lengths.extend(sizes_count.values())
+            totals.extend([page["total_length"]] * len(sizes_count))
+        return cls(
+            np.array(sizes, dtype=np.float64),
+            np.array(lengths, dtype=np.float64),
+            np.array(totals, dtype=np.float64),
+            page_count,
+        )
+
+    def histogram(self) -> Dict[float, Tuple[int, int, int]]:
+        """{字号: (文本总长度, 出现页数, 占多数的页数)}, 用于调试."""
+        return {
+            size: (int(length), int(pages), int(dominant))
+            for size, length, pages, dominant in zip(
+                self.sizes.tolist(),
+                self.lengths.tolist(),
+                self.pages.tolist(),
+                self.dominant_pages.tolist(),
+            )
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="打印文档的字号直方图和标题字号")
+    parser.add_argument("--pages", default="src/dfcf.pgc", help="tmain.py 的输出文件")
+    args = parser.parse_args()
+
+    from page_cache import load_pages
+
+    model = SizeModel.from_pages(load_pages(args.pages))
+    print(f"{'size':>8} {'length':>8} {'pages':>6} {'body':>6}")
+    for size, (length, pages, dominant) in model.histogram().items():
+        mark = "*" if size in model.allowed_sizes else ""
+        print(f"{size:>8} {length:>8} {pages:>6} {dominant:>6} {mark}")
+    print(f"Heading sizes: {sorted(model.allowed_sizes)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,633 @@
+import argparse
+import json
+import math
+import os
+import random
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import pymupdf
+
+# 页面布局 (A4, 单位为点)
+PAGE_WIDTH, PAGE_HEIGHT = 595.0, 842.0
+BODY_LEFT, BODY_RIGHT = 72.0, 523.0
+BODY_TOP, BODY_BOTTOM = 80.0, 770.0
+HEADER_BASELINE = 50.0
+FOOTER_BASELINE = 805.0
+FONT_NAME = "china-s"
+
+# 字号: 1~4 级标题各不相同, 均不小于 outline_builder.MIN_TITLE_SIZE; 正文和表格更小
+HEADING_SIZES = {1: 16.0, 2: 14.0, 3: 12.0, 4: 11.0}
+BODY_SIZE = 9.0
+TABLE_SIZE = 7.5
+HEADER_SIZE = 9.0
+LINE_PITCH = 15.0  # 正文行距
+TABLE_ROW_HEIGHT = 16.0
+TOC_TITLE_SIZE = 18.0
+TOC_ENTRY_SIZE = 10.5
+TOC_PITCH = 20.0
+BOOKMARK_TOP_Y = 36.0  # 跳转到页首的书签的 y 坐标 (pymupdf 的默认值)
+Y_TOLERANCE = 3.0  # --check 时标题的 y0 与标准答案允许的差 (点)
+
+MAX_LEVEL = 4
+# 每页内容大约对应的子标题数, 以及每个标题下子标题数的上限 (中文序号不超过两位)
+CHILDREN_PER_PAGE = {2: 1.2, 3: 1.5, 4: 2.0}
+MAX_CHILDREN = {2: 30, 3: 20, 4: 50}
+CHILD_PROB = {2: 1.0, 3: 0.6, 4: 0.4}  # 标题下出现子标题的概率
+MIN_CHILD_BUDGET = 0.25  # 子标题至少分到的篇幅 (页)
+TABLE_PROB = 0.3  # 叶子标题下每个内容块是表格的概率
+
+SECTION_TITLES = [
+    "重要提示、目录和释义",
+    "公司简介和主要财务指标",
+    "管理层讨论与分析",
+    "公司治理",
+    "环境和社会责任",
+    "重要事项",
+    "股份变动及股东情况",
+    "优先股相关情况",
+    "债券相关情况",
+    "财务报告",
+]
+# 与 config.yaml 中的目标对应的子标题, 其余从通用标题中选取
+SECTION_SUBTITLES = {
+    "管理层讨论与分析": ["报告期内公司从事的主要业务", "主要控股参股公司分析"],
+    "重要事项": [
+        "承诺事项履行情况",
+        "聘任、解聘会计师事务所情况",
+        "重大诉讼、仲裁事项",
+        "重大合同及其履行情况",
+        "其他重大事项的说明",
+    ],
+}
+GENERIC_TITLES = [
+    "公司信息",
+    "联系人和联系方式",
+    "信息披露及备置地点",
+    "主要会计数据和财务指标",
+    "核心竞争力分析",
+    "主营业务分析",
+    "资产及负债状况分析",
+    "投资状况分析",
+    "公司未来发展的展望",
+    "董事、监事和高级管理人员情况",
+    "内部控制制度的建设及实施情况",
+    "重要会计政策及会计估计",
+    "关联交易情况",
+    "股东和实际控制人情况",
+    "收入与成本",
+    "费用",
+    "研发投入",
+    "现金流",
+]
+TABLE_HEADERS = [
+    "项目",
+    "本期金额",
+    "上期金额",
+    "本期比上年同期增减",
+    "备注",
+    "期末余额",
+]
+BODY_CHARS = (
+    "报告期内公司坚持以客户为中心持续推进业务转型不断提升经营管理水平实现营业收入"
+    "与净利润稳步增长资产质量保持稳定风险管理体系进一步完善各项业务有序开展"
+)
+
+ZH_DIGITS = "零一二三四五六七八九"
+ZH_UNITS = ["", "十", "百", "千"]
+
+# 标准答案中的标题: (级别, 标题, 页码, y0, y1)
+TruthNode = Tuple[int, str, int, float, float]
+
+
+def zh_number(n: int) -> str:
+    """1~9999 的中文数字, 如 12 -> "十二", 105 -> "一百零五"."""
+    if n < 10:
+        return ZH_DIGITS[n]
+    if n < 20:
+        return "十" + (ZH_DIGITS[n - 10] if n > 10 else "")
+    digits = str(n)
+    parts = []
+    zero = False
+    for i, ch in enumerate(digits):
+        d = int(ch)
+        if d == 0:
+            zero = True
+            continue
+        if zero:
+            parts.append("零")
+            zero = False
+        parts.append(ZH_DIGITS[d] + ZH_UNITS[len(digits) - 1 - i])
+    return "".join(parts)
+
+
+def heading_text(level: int, index: int, title: str) -> str:
+    """按级别加上序号: 第X节 / 一、/（一）/ 1、"""
+    if level == 1:
+        return f"第{zh_number(index)}节 {title}"
+    if level == 2:
+        return f"{zh_number(index)}、{title}"
+    if level == 3:
+        return f"（{zh_number(index)}）{title}"
+    return f"{index}、{title}"
+
+
+class _PageLimit(Exception):
+    """正文页数已满."""
+
+
+class _Writer:
+    """
+    按顺序排版正文, 记录每个标题的位置.
+
+    doc 为 None 时只计算位置 (用于预先估计目录的条目数), 不写入 PDF.
+    每页的文本先收集在一个 TextWriter 中, 线条收集在一个 Shape 中, 换页时一次写入;
+    逐次调用 `Page.insert_text` 在上万页时太慢.
+    """
+
+    def __init__(
+        self,
+        doc: Optional["pymupdf.Document"],
+        body_pages: int,
+        first_page_no: int,
+        header: str,
+    ) -> None:
+        self.doc = doc
+        self.body_pages = body_pages
+        self.first_page_no = first_page_no  # 第一页正文的页码 (从 1 开始)
+        self.header = header
+        self.font = pymupdf.Font(FONT_NAME)
+        self.page: Optional["pymupdf.Page"] = None
+        self.writer: Optional["pymupdf.TextWriter"] = None
+        self.shape: Optional["pymupdf.Shape"] = None
+        self.has_lines = False
+        self.index = -1  # 当前正文页的索引
+        self.y = BODY_BOTTOM
+        self.nodes: List[TruthNode] = []
+        self.tables: List[Dict] = []
+
+    @property
+    def page_no(self) -> int:
+        return self.first_page_no + self.index
+
+    def pos(self) -> float:
+        """当前位置, 以页为单位."""
+        return self.index + (self.y - BODY_TOP) / (BODY_BOTTOM - BODY_TOP)
+
+    def new_page(self) -> None:
+        if self.index + 1 >= self.body_pages:
+            raise _PageLimit()
+        self.finish_page()
+        self.index += 1
+        self.y = BODY_TOP
+        if self.doc is not None:
+            self.page = self.doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            self.writer = pymupdf.TextWriter(self.page.rect)
+            self.shape = self.page.new_shape()
+            self.has_lines = False
+            write_header_footer(self.writer, self.header, self.page_no, self.font)
+
+    def finish_page(self) -> None:
+        """将当前页收集的文本和线条写入页面."""
+        if self.page is None:
+            return
+        self.writer.write_text(self.page)
+        if self.has_lines:
+            self.shape.commit()
+        self.page = self.writer = self.shape = None
+
+    def _text(self, x: float, baseline: float, text: str, size: float) -> None:
+        if self.writer is not None:
+            self.writer.append((x, baseline), text, font=self.font, fontsize=size)
+
+    def _ensure(self, height: float) -> None:
+        if self.index < 0 or self.y + height > BODY_BOTTOM:
+            self.new_page()
+
+    def heading(self, level: int, text: str) -> None:
+        size = HEADING_SIZES[level]
+        if level == 1 and self.index >= 0 and self.y > BODY_TOP:
+            self.new_page()  # 每一节从新的一页开始
+        self._ensure(size * 2 + LINE_PITCH * 2)  # 标题不能单独留在页尾
+        baseline = self.y + size * (0.6 + self.font.ascender)
+        y0 = baseline - size * self.font.ascender
+        y1 = baseline - size * self.font.descender
+        if level == 1:
+            x = (PAGE_WIDTH - self.font.text_length(text, fontsize=size)) / 2
+        else:
+            x = BODY_LEFT
+        self._text(x, baseline, text, size)
+        self.nodes.append((level, text, self.page_no, y0, y1))
+        self.y = y1 + size * 0.6
+
+    def paragraph(self, rng: random.Random, n_lines: int) -> None:
+        for i in range(n_lines):
+            if self.index < 0 or self.y + LINE_PITCH > BODY_BOTTOM:
+                self.new_page()
+            start = rng.randrange(len(BODY_CHARS) - 10)
+            length = 40 if i < n_lines - 1 else rng.randint(8, 40)
+            text = (BODY_CHARS * 2)[start : start + length]
+            self._text(
+                BODY_LEFT, self.y + BODY_SIZE * self.font.ascender, text, BODY_SIZE
+            )
+            self.y += LINE_PITCH
+        self.y += LINE_PITCH / 2
+
+    def table(self, rng: random.Random) -> None:
+        n_rows, n_cols = rng.randint(5, 15), rng.randint(3, 6)
+        height = TABLE_ROW_HEIGHT * n_rows
+        self._ensure(LINE_PITCH + height)
+        # 表头说明
+        self._text(
+            BODY_LEFT,
+            self.y + BODY_SIZE * self.font.ascender,
+            "单位：元 币种：人民币",
+            BODY_SIZE,
+        )
+        self.y += LINE_PITCH
+
+        col_width = (BODY_RIGHT - BODY_LEFT) / n_cols
+        rows = []
+        for r in range(n_rows):
+            row = []
+            for c in range(n_cols):
+                if r == 0:
+                    row.append(TABLE_HEADERS[c])
+                elif c == 0:
+                    row.append(rng.choice(GENERIC_TITLES)[:8])
+                else:
+                    row.append(f"{rng.uniform(-1e8, 1e9):,.2f}")
+            rows.append(row)
+
+        top = self.y
+        if self.shape is not None:
+            for r in range(n_rows + 1):
+                y = top + r * TABLE_ROW_HEIGHT
+                self.shape.draw_line((BODY_LEFT, y), (BODY_RIGHT, y))
+            for c in range(n_cols + 1):
+                x = BODY_LEFT + c * col_width
+                self.shape.draw_line((x, top), (x, top + height))
+            # 每个表格单独一条路径, 否则 find_tables 会把同一页的表格连成一个
+            self.shape.finish(width=0.5, color=(0, 0, 0))
+            self.has_lines = True
+            for r, row in enumerate(rows):
+                baseline = top + r * TABLE_ROW_HEIGHT + 11
+                for c, cell in enumerate(row):
+                    self._text(
+                        BODY_LEFT + c * col_width + 3, baseline, cell, TABLE_SIZE
+                    )
+        self.tables.append(
+            {
+                "page_no": self.page_no,
+                "bbox": [BODY_LEFT, top, BODY_RIGHT, top + height],
+                "rows": rows,
+            }
+        )
+        self.y = top + height + LINE_PITCH / 2
+
+
+def write_header_footer(
+    writer: "pymupdf.TextWriter", header: str, page_no: int, font: "pymupdf.Font"
+) -> None:
+    """页眉 (公司名称和报告名称, 右对齐) 和页脚 (页码, 居中)."""
+    width = font.text_length(header, fontsize=HEADER_SIZE)
+    writer.append(
+        (BODY_RIGHT - width, HEADER_BASELINE), header, font=font, fontsize=HEADER_SIZE
+    )
+    number = str(page_no)
+    width = font.text_length(number, fontsize=HEADER_SIZE)
+    writer.append(
+        ((PAGE_WIDTH - width) / 2, FOOTER_BASELINE),
+        number,
+        font=font,
+        fontsize=HEADER_SIZE,
+    )
+
+
+def _fill(
+    w: _Writer,
+    rng: random.Random,
+    level: int,
+    end: float,
+    tables: bool,
+    subtitles: List[str],
+) -> None:
+    """
+    在第 level 级标题下写入内容, 直到位置 end.
+
+    篇幅足够时按篇幅分配若干个子标题, 否则写入段落和表格.
+    """
+    w.paragraph(rng, rng.randint(1, 3))  # 标题下的引言
+    start = w.pos()
+    budget = end - start
+    child = level + 1
+    if (
+        child <= MAX_LEVEL
+        and budget >= MIN_CHILD_BUDGET * 2
+        and rng.random() < CHILD_PROB[child]
+    ):
+        k = round(budget * CHILDREN_PER_PAGE[child] * rng.uniform(0.7, 1.3))
+        k = max(1, min(MAX_CHILDREN[child], k, int(budget / MIN_CHILD_BUDGET)))
+        for i in range(k):
+            title = subtitles[i] if i < len(subtitles) else rng.choice(GENERIC_TITLES)
+            w.heading(child, heading_text(child, i + 1, title))
+            _fill(w, rng, child, start + budget * (i + 1) / k, tables, [])
+        return
+    while w.pos() < end:
+        if tables and rng.random() < TABLE_PROB:
+            w.table(rng)
+        else:
+            w.paragraph(rng, rng.randint(2, 8))
+
+
+def _layout(w: _Writer, rng: random.Random, tables: bool, sections: int) -> None:
+    """写入全部正文: 各节平分正文页数, 最后用段落填满剩余的页."""
+    try:
+        for i in range(sections):
+            title = SECTION_TITLES[i % len(SECTION_TITLES)]
+            w.heading(1, heading_text(1, i + 1, title))
+            end = w.body_pages * (i + 1) / sections
+            _fill(w, rng, 1, end, tables, SECTION_SUBTITLES.get(title, []))
+        while True:
+            w.paragraph(rng, 8)
+    except _PageLimit:
+        pass
+
+
+def _toc_page_count(entries: int) -> int:
+    first = int((BODY_BOTTOM - BODY_TOP - TOC_TITLE_SIZE * 2) // TOC_PITCH)
+    rest = int((BODY_BOTTOM - BODY_TOP) // TOC_PITCH)
+    if entries <= first:
+        return 1
+    return 1 + math.ceil((entries - first) / rest)
+
+
+def _write_toc(
+    doc: "pymupdf.Document",
+    toc_pnos: List[int],
+    entries: List[TruthNode],
+    header: str,
+    font: "pymupdf.Font",
+) -> None:
+    """在预留的页面上写入印刷目录: 标题 + 点线引导符 + 页码."""
+    dot_width = font.text_length(".", fontsize=TOC_ENTRY_SIZE)
+    pages = iter(toc_pnos)
+    page = writer = None
+    y = BODY_BOTTOM
+    for level, text, page_no, _, _ in entries:
+        if page is None or y + TOC_PITCH > BODY_BOTTOM:
+            if page is not None:
+                writer.write_text(page)
+            pno = next(pages)
+            page = doc[pno]
+            writer = pymupdf.TextWriter(page.rect)
+            write_header_footer(writer, header, pno + 1, font)
+            y = BODY_TOP
+            if pno == toc_pnos[0]:
+                title_width = font.text_length("目录", fontsize=TOC_TITLE_SIZE)
+                writer.append(
+                    ((PAGE_WIDTH - title_width) / 2, y + TOC_TITLE_SIZE),
+                    "目录",
+                    font=font,
+                    fontsize=TOC_TITLE_SIZE,
+                )
+                y += TOC_TITLE_SIZE * 2
+        baseline = y + TOC_ENTRY_SIZE
+        x = BODY_LEFT + (level - 1) * TOC_ENTRY_SIZE * 2
+        number = str(page_no)
+        number_width = font.text_length(number, fontsize=TOC_ENTRY_SIZE)
+        text_width = font.text_length(text, fontsize=TOC_ENTRY_SIZE)
+        gap = BODY_RIGHT - number_width - x - text_width - dot_width * 2
+        leader = " " + "." * max(3, int(gap / dot_width))
+        writer.append((x, baseline), text + leader, font=font, fontsize=TOC_ENTRY_SIZE)
+        writer.append(
+            (BODY_RIGHT - number_width, baseline),
+            number,
+            font=font,
+            fontsize=TOC_ENTRY_SIZE,
+        )
+        y += TOC_PITCH
+    if page is not None:
+        writer.write_text(page)
+
+
+def nest_outline(nodes: List[TruthNode]) -> List[Dict]:
+    """将按顺序排列的标题转换为嵌套的树."""
+    root: Dict = {"children": []}
+    stack = [root]
+    for level, text, page_no, y0, y1 in nodes:
+        item = {
+            "level": level,
+            "text": text,
+            "page_no": page_no,
+            "y0": round(y0, 2),
+            "y1": round(y1, 2),
+            "children": [],
+        }
+        del stack[level:]
+        stack[-1]["children"].append(item)
+        stack.append(item)
+    return root["children"]
+
+
+def generate(
+    filename: str,
+    pages: int = 40,
+    seed: int = 0,
+    toc: bool = True,
+    toc_depth: int = 2,
+    bookmarks: bool = False,
+    tables: bool = True,
+    bookmarks_at_top: bool = False,
+    company: str = "某某股份有限公司",
+    year: int = 2024,
+) -> Dict:
+    """
+    生成一份合成的年度报告, 并返回标准答案:
+        {"pdf", "pages", "seed", "toc_pages", "outline": 嵌套的标题树, "tables": [...]}
+
+    页面依次为封面, 目录 (toc 为 True 时, 包含 toc_depth 级以内的标题), 正文.
+    书签跳转到标题的位置; bookmarks_at_top 为 True 时跳转到标题所在页的页首
+    (有些报告的书签就是这样).
+    相同的参数总是生成相同的文件.
+    """
+    if pages < 3:
+        raise ValueError("A report needs at least 3 pages")
+    header = f"{company}{year}年年度报告"
+
+    def layout(doc, body_pages, first_page_no) -> _Writer:
+        w = _Writer(doc, body_pages, first_page_no, header)
+        sections = min(len(SECTION_TITLES), body_pages)
+        _layout(w, random.Random(seed), tables, sections)
+        w.finish_page()
+        return w
+
+    # 目录的页数取决于条目数, 条目数又取决于正文的页数, 先只排版不写入, 直到页数稳定
+    toc_pages = 0
+    if toc:
+        toc_pages = 1
+        while True:
+            w = layout(None, pages - 1 - toc_pages, 2 + toc_pages)
+            entries = sum(1 for node in w.nodes if node[0] <= toc_depth)
+            needed = _toc_page_count(entries)
+            if needed <= toc_pages:
+                break
+            toc_pages = needed
+
+    doc = pymupdf.open()
+    font = pymupdf.Font(FONT_NAME)
+    cover = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    writer = pymupdf.TextWriter(cover.rect)
+    for text, size, y in [(company, 22.0, 300.0), (f"{year}年年度报告", 26.0, 360.0)]:
+        width = font.text_length(text, fontsize=size)
+        writer.append(((PAGE_WIDTH - width) / 2, y), text, font=font, fontsize=size)
+    writer.write_text(cover)
+    toc_pnos = [
+        doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT).number
+        for _ in range(toc_pages)
+    ]
+
+    w = layout(doc, pages - 1 - toc_pages, 2 + toc_pages)
+    if toc:
+        entries = [node for node in w.nodes if node[0] <= toc_depth]
+        _write_toc(doc, toc_pnos, entries, header, font)
+    if bookmarks:
+        # 与真实的年报一样, 书签跳转到标题所在的位置
+        top = BOOKMARK_TOP_Y if bookmarks_at_top else None
+        doc.set_toc(
+            [
+                [
+                    level,
+                    text,
+                    page_no,
+                    {
+                        "kind": pymupdf.LINK_GOTO,
+                        "page": page_no - 1,
+                        "to": pymupdf.Point(BODY_LEFT, y0 if top is None else top),
+                    },
+                ]
+                for level, text, page_no, y0, _ in w.nodes
+            ]
+        )
+
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+    doc.save(filename, garbage=3, deflate=True)
+    doc.close()
+    return {
+        "pdf": os.path.basename(filename),
+        "pages": pages,
+        "seed": seed,
+        "toc_pages": [pno + 1 for pno in toc_pnos],
+        "outline": nest_outline(w.nodes),
+        "tables": w.tables,
+    }
+
+
+def flatten_outline(
+    outline: List[Dict], max_level: int = MAX_LEVEL
+) -> List[Tuple[int, str, int, float]]:
+    """
+    标准答案的 (级别, 标题, 页码, y0) 列表, 按先序遍历排列; 标题去掉空白.
+
+    只保留 max_level 级以内的标题 (目录树只有 `OutlineTree.MAX_LEVEL` 级).
+    """
+    result = []
+    for item in outline:
+        if item["level"] > max_level:
+            continue
+        result.append(
+            (item["level"], "".join(item["text"].split()), item["page_no"], item["y0"])
+        )
+        result.extend(flatten_outline(item["children"], max_level))
+    return result
+
+
+def tree_entries(outlines) -> List[Tuple[int, str, int, float]]:
+    """OutlineTree 的 (级别, 标题, 页码, y0) 列表, 与 `flatten_outline` 格式相同."""
+    result = []
+
+    def _walk(node) -> None:
+        for child in node.children:
+            result.append(
+                (child.level, "".join(child.text.split()), child.page_no, child.y0)
+            )
+            _walk(child)
+
+    _walk(outlines.root)
+    return result
+
+
+def compare_entries(
+    expected: List[Tuple[int, str, int, float]],
+    actual: List[Tuple[int, str, int, float]],
+) -> Tuple[int, int, bool]:
+    """
+    对照标准答案和目录树, 返回 (找到的标题数, 多出的标题数, 是否完全一致).
+
+    标题按 (级别, 标题, 页码) 计数 (同名的标题各算一次). 完全一致要求两个列表
+    按顺序逐项相同, 且 y0 相差不超过 Y_TOLERANCE: 标准答案的 y0 由字体参数算出,
+    与 pymupdf 提取的坐标相差约 1 个点.
+    """
+    want = Counter(entry[:3] for entry in expected)
+    got = Counter(entry[:3] for entry in actual)
+    found = sum((want & got).values())
+    identical = len(expected) == len(actual) and all(
+        e[:3] == a[:3] and abs(e[3] - a[3]) <= Y_TOLERANCE
+        for e, a in zip(expected, actual)
+    )
+    return found, len(actual) - found, identical
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="生成合成的年度报告 PDF 及标准答案")
+    parser.add_argument("--out", default="synth/report.pdf", help="输出的 PDF 文件")
+    parser.add_argument("--pages", type=int, default=40, help="总页数 (10 ~ 10000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-toc", action="store_true", help="不生成目录页")
+    parser.add_argument("--toc-depth", type=int, default=2, help="目录包含的标题级别")
+    parser.add_argument("--bookmarks", action="store_true", help="写入书签")
+    parser.add_argument(
+        "--bookmarks-at-top",
+        action="store_true",
+        help="写入书签, 且书签只跳转到标题所在页的页首",
+    )
+    parser.add_argument("--no-tables", action="store_true", help="不生成表格")
+    parser.add_argument(
+        "--check", action="store_true", help="用 toc_outline 建立目录树并与标准答案对照"
+    )
+    args = parser.parse_args()
+
+    truth = generate(
+        args.out,
+        pages=args.pages,
+        seed=args.seed,
+        toc=not args.no_toc,
+        toc_depth=args.toc_depth,
+        bookmarks=args.bookmarks or args.bookmarks_at_top,
+        tables=not args.no_tables,
+        bookmarks_at_top=args.bookmarks_at_top,
+    )
+    truth_file = os.path.splitext(args.out)[0] + ".json"
+    with open(truth_file, "w", encoding="utf-8") as f:
+        json.dump(truth, f, ensure_ascii=False, indent=2)
+    print(
+        f"Wrote {args.out} ({args.pages} pages, "
+        f"{len(flatten_outline(truth['outline']))} headings, "
+        f"{len(truth['tables'])} tables) and {truth_file}."
+    )
+
+    if args.check:
+        from outline_tree import OutlineTree
+        from toc_outline import outline_for_pdf
+
+        expected = flatten_outline(truth["outline"], OutlineTree.MAX_LEVEL)
+        actual = tree_entries(outline_for_pdf(args.out))
+        found, extra, identical = compare_entries(expected, actual)
+        print(
+            f"Outline: {found}/{len(expected)} expected headings found, "
+            f"{extra} extra, identical: {identical}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import json
+import os
+from importlib.metadata import PackageNotFoundError, version
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pymupdf
+
+from content_range import ContentRange
+from extract_cache import file_sha256
+from header_footer import detect_bands
+from instrument import NULL, Instrument
+
+
+def merge_page_spans(
+    ranges: Iterable[ContentRange], page_count: int
+) -> List[Tuple[int, int]]:
+    """
+    将若干范围合并为最少的页码区间 [start, end] (从 1 开始, 闭区间).
+
+    相邻或重叠的范围 (如兄弟章节共享的边界页, 嵌套的目标) 会被合并.
+    """
+    spans = sorted((cr.start_page, min(cr.end_page, page_count)) for cr in ranges)
+    merged: List[Tuple[int, int]] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class DocxPageStore:
+    """
+    pdf2docx 解析结果的磁盘缓存, 以 (PDF 内容哈希, pdf2docx 版本, 页码) 为键, 每页一个 JSON 文件:
+        <cache_dir>/<pdf_hash[:2]>/<pdf_hash>-<pdf2docx 版本>/<页码索引>.json
+    """
+
+    def __init__(self, cache_dir: str, pdf_path: str) -> None:
+        self.cache_dir = cache_dir
+        self.pdf_path = pdf_path
+        self._dir: Optional[str] = None
+
+    @property
+    def dir(self) -> str:
+        """
+        条目所在的目录. 第一次读写时才计算 PDF 的哈希: 使用 pymupdf 引擎时
+        通常不会用到 pdf2docx, 不必为每个 TableExtractor 读一遍整个文件.
+        """
+        if self._dir is None:
+            try:
+                lib_version = version("pdf2docx")
+            except PackageNotFoundError:
+                lib_version = "none"
+            pdf_hash = file_sha256(self.pdf_path)
+            self._dir = os.path.join(
+                self.cache_dir, pdf_hash[:2], f"{pdf_hash}-{lib_version}"
+            )
+        return self._dir
+
+    def load(self, pn: int) -> Optional[List[Dict]]:
+        try:
+            with open(os.path.join(self.dir, f"{pn}.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, pn: int, blocks: List[Dict]) -> None:
+        os.makedirs(self.dir, exist_ok=True)
+        path = os.path.join(self.dir, f"{pn}.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(blocks, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+
+class TableExtractor:
+    """
+    按 ContentRange 提取表格.
+
+    只分析范围覆盖的区域: 首页从 start_y 开始, 末页到 end_y 为止, 中间的页取整页.
+    strip_bands 为 True 时, 各页还会去掉文档的页眉页脚 (见 `header_footer.detect_bands`).
+
+    engine 为 "pymupdf" 时使用 `find_tables(clip=...)`, 出错时退回到 pdf2docx;
+    engine 为 "pdf2docx" 时只使用 pdf2docx. pdf2docx 总是解析整页, 因此每页的解析结果
+    (表格和文本块) 都会缓存在内存和磁盘 (cache_dir) 中, 再按 y 坐标切分给各个范围,
+    每页最多只解析一次. cache_dir 为 None 时不使用磁盘缓存.
+    inst 记录提取表格 ("tables") 和 pdf2docx 解析 ("pdf2docx") 的耗时.
+
+    提取结果的每一项为:
+        {"page_no": 页码 (从 1 开始), "bbox": [x0, y0, x1, y1], "rows": [[单元格, ...], ...]}
+    """
+
+    ENGINES = ("pymupdf", "pdf2docx")
+
+    def __init__(
+        self,
+        pdf_path: str,
+        engine: str = "pymupdf",
+        cache_dir: Optional[str] = ".cache/pdf2docx",
+        strip_bands: bool = True,
+        inst: Instrument = NULL,
+    ) -> None:
+        if engine not in TableExtractor.ENGINES:
+            raise ValueError(f"Unknown table engine: {engine}")
+        self.pdf_path = pdf_path
+        self.engine = engine
+        self.doc = pymupdf.open(pdf_path)
+        self._converter = None  # pdf2docx.Converter, 需要时才创建
+        self._docx_pages: Dict[int, List[Dict]] = {}  # 页码索引 -> 解析出的块
+        self._store = DocxPageStore(cache_dir, pdf_path) if cache_dir else None
+        self.bands = detect_bands(self.doc) if strip_bands else None
+        self.inst = inst
+
+    def __enter__(self) -> "TableExtractor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._converter is not None:
+            self._converter.close()
+            self._converter = None
+        self.doc.close()
+
+    def range_clips(self, cr: ContentRange) -> Iterator[Tuple[int, "pymupdf.Rect"]]:
+        """产出范围覆盖的每一页的 (页码索引, 裁剪区域)."""
+        last_page = min(cr.end_page, len(self.doc))
+        for page_no in range(cr.start_page, last_page + 1):
+            rect = self.doc[page_no - 1].rect
+            if self.bands:
+                rect = self.bands.clip(rect) or rect
+            y0 = max(cr.start_y, rect.y0) if page_no == cr.start_page else rect.y0
+            y1 = min(cr.end_y, rect.y1) if page_no == cr.end_page else rect.y1
+            if y1 > y0:
+                yield page_no - 1, pymupdf.Rect(rect.x0, y0, rect.x1, y1)
+
+    def extract(self, cr: ContentRange) -> List[Dict]:
+        """提取范围内的所有表格, 按页码和 y 坐标排序."""
+        tables = []
+        with self.inst.span("tables"):
+            for pn, clip in self.range_clips(cr):
+                if self.engine == "pdf2docx":
+                    tables.extend(self._pdf2docx_tables(pn, clip))
+                    continue
+                try:
+                    tables.extend(self._find_tables(pn, clip))
+                except Exception:
+                    self.inst.count("tables.pdf2docx_fallback")
+                    tables.extend(self._pdf2docx_tables(pn, clip))
+        self.inst.count("tables.found", len(tables))
+        return tables
+
+    def extract_many(self, ranges: List[ContentRange]) -> List[List[Dict]]:
+        """
+        提取多个范围的表格.
+
+        使用 pdf2docx 时先将范围合并为最少的页码区间, 一次性解析其中尚未缓存的页面.
+        """
+        if self.engine == "pdf2docx":
+            for start, end in merge_page_spans(ranges, len(self.doc)):
+                self._ensure_parsed(range(start - 1, end))
+        return [self.extract(cr) for cr in ranges]
+
+    def _find_tables(self, pn: int, clip: "pymupdf.Rect") -> List[Dict]:
+        page = self.doc[pn]
+        found = page.find_tables(clip=clip)
+        return [
+            {"page_no": pn + 1, "bbox": list(t.bbox), "rows": t.extract()}
+            for t in sorted(found.tables, key=lambda t: t.bbox[1])
+        ]
+
+    def _pdf2docx_tables(self, pn: int, clip: "pymupdf.Rect") -> List[Dict]:
+        """从 pdf2docx 的整页解析结果中, 保留中心落在裁剪区域内的表格."""
+        self._ensure_parsed([pn])
+        tables = []
+        for blk in self._docx_pages[pn]:
+            if blk["type"] != "table":
+                continue
+            x0, y0, x1, y1 = blk["bbox"]
+            if clip.y0 <= (y0 + y1) / 2 <= clip.y1:
+                tables.append(
+                    {"page_no": pn + 1, "bbox": blk["bbox"], "rows": blk["rows"]}
+                )
+        tables.sort(key=lambda t: t["bbox"][1])
+        return tables
+
+    def _ensure_parsed(self, pns: Iterable[int]) -> None:
+        """保证这些页已被解析: 依次查找内存缓存, 磁盘缓存, 最后一次性用 pdf2docx 解析剩余的页."""
+        missing = []
+        for pn in pns:
+            if pn in self._docx_pages:
+                continue
+            blocks = self._store.load(pn) if self._store else None
+            if blocks is None:
+                missing.append(pn)
+            else:
+                self._docx_pages[pn] = blocks
+        if not missing:
+            return
+
+        import pdf2docx
+
+        with self.inst.span("pdf2docx"):
+            if self._converter is None:
+                self._converter = pdf2docx.Converter(self.pdf_path)
+            self._converter.parse(pages=missing, **self._converter.default_settings)
+        for pn in missing:
+            blocks = _plain_blocks(self._converter.pages[pn])
+            self._docx_pages[pn] = blocks
+            if self._store:
+                self._store.save(pn, blocks)
+
+
+def _plain_blocks(page) -> List[Dict]:
+    """将 pdf2docx 解析出的页面转换为可序列化的块列表."""
+    from pdf2docx.table.TableBlock import TableBlock
+    from pdf2docx.text.TextBlock import TextBlock
+
+    blocks = []
+    for sec in page.sections:
+        for col in sec:
+            for blk in col.blocks:
+                bbox = list(blk.bbox)
+                if isinstance(blk, TableBlock):
+                    blocks.append({"type": "table", "bbox": bbox, "rows": blk.text})
+                elif isinstance(blk, TextBlock):
+                    blocks.append({"type": "text", "bbox": bbox, "text": blk.raw_text})
+    return blocks
+
+
+def print_tab_table(rows: List[List[Optional[str]]]) -> None:
+    """以制表符分隔打印表格."""
+    for row in rows:
+        for cell in row:
+            print(cell.strip() if cell else "", end="\t")
+        print()
+    print()
@@ -1,7 +1,126 @@
+import math
+from collections import Counter
 import yaml
-from typing import Optional
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 from title_node import TitleNode
 from content_range import ContentRange
+from outline_tree import OutlineTree
+
+
+def normalize_title(title: str) -> str:
+    """标题的规范形式, 去掉所有空白."""
+    return "".join(title.split())
+
+
+def title_bigrams(key: str) -> Counter:
+    """规范化标题的字符二元组及其出现次数; 只有一个字时为该字本身."""
+    if len(key) < 2:
+        return Counter([key])
+    return Counter(key[i : i + 2] for i in range(len(key) - 1))
+
+
+def edit_distance(a: str, b: str) -> int:
+    """两个字符串的编辑距离 (插入, 删除, 替换各算一次)."""
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def similarity(a: str, b: str) -> float:
+    """1 - 编辑距离 / 较长的长度, 相同时为 1."""
+    longest = max(len(a), len(b))
+    return 1.0 - edit_distance(a, b) / longest if longest else 1.0
+
+
+class BigramIndex:
+    """
+    一组规范化标题 (目标的名称和别名) 的字符二元组倒排索引, 用于近似匹配.
+
+    查询时先通过倒排表累计每个候选与查询共有的二元组个数, 再用两个不会漏掉
+    合格候选的条件过滤:
+        - 长度差不超过允许的编辑次数 k
+        - 共有的二元组不少于 max(长度) - 1 - 2k (每次编辑最多破坏两个二元组)
+    短标题的下限可能不大于 0 (如 "股东会" 与 "股本会" 在 0.66 时没有共有的二元组),
+    这时倒排表找不到它们, 改为从按长度分组的表中取出长度相符的全部标题.
+
+    两个条件同时给出相似度的上限, 候选按上限从高到低计算编辑距离,
+    上限不超过已找到的最高相似度时停止, 结果与逐个比较所有标题相同.
+    """
+
+    def __init__(self, keys: Iterable[str]) -> None:
+        self.keys: List[str] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}  # 二元组 -> [(编号, 次数)]
+        self.by_length: Dict[int, List[int]] = {}  # 长度 -> [编号]
+        for key in keys:
+            self.add(key)
+
+    def add(self, key: str) -> None:
+        kid = len(self.keys)
+        self.keys.append(key)
+        for gram, count in title_bigrams(key).items():
+            self.postings.setdefault(gram, []).append((kid, count))
+        self.by_length.setdefault(len(key), []).append(kid)
+
+    @staticmethod
+    def _bound(length: int, other: int, common: int, threshold: float) -> float:
+        """长度为 length 和 other, 共有 common 个二元组时相似度的上限; 不合格时为 -1."""
+        longest = max(length, other)
+        max_edits = math.floor((1 - threshold) * longest + 1e-9)
+        if abs(length - other) > max_edits or common < longest - 1 - 2 * max_edits:
+            return -1.0
+        edits = max(abs(length - other), -(-(longest - 1 - common) // 2), 0)
+        return 1.0 - edits / longest
+
+    def lookup(self, key: str, threshold: float) -> Optional[Tuple[str, float]]:
+        """与 key 最相似且相似度不低于 threshold 的标题及其相似度, 没有时返回 None."""
+        shared: Counter = Counter()  # 编号 -> 共有的二元组个数
+        for gram, count in title_bigrams(key).items():
+            for kid, other_count in self.postings.get(gram, ()):
+                shared[kid] += min(count, other_count)
+
+        candidates = []
+        for kid, common in shared.items():
+            bound = BigramIndex._bound(len(key), len(self.keys[kid]), common, threshold)
+            if bound >= threshold:
+                candidates.append((-bound, -common, kid))
+        for length, kids in self.by_length.items():
+            bound = BigramIndex._bound(len(key), length, 0, threshold)
+            if bound >= threshold:
+                candidates.extend((-bound, 0, kid) for kid in kids if kid not in shared)
+        candidates.sort()
+
+        best = None
+        for neg_bound, _, kid in candidates:
+            if best is not None and -neg_bound <= best[1]:
+                break
+            score = similarity(key, self.keys[kid])
+            if score >= threshold and (best is None or score > best[1]):
+                best = (self.keys[kid], score)
+        return best
+
+
+class _TrieNode:
+    """目标树编译后的字典树节点, 子节点以规范化的名称和别名为键."""
+
+    def __init__(self, path: Tuple[str, ...] = ()) -> None:
+        self.path = path  # 从根开始的目标名称路径
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.is_leaf = False  # 对应的目标没有子节点, 匹配到这里即成功
+        self.index: Optional[BigramIndex] = None  # 子节点键的索引, 开启近似匹配时建立
+
+
+class TargetMatch(NamedTuple):
+    """一次匹配的结果: 目录树节点, 目标路径, 内容范围."""
+
+    node: TitleNode
+    target: Tuple[str, ...]
+    content_range: ContentRange
 
 
 class TargetTree:
@@ -10,92 +129,174 @@ class TargetTree:
 
     寻找目标的过程就是在目录树中寻找与目标相同的路径的过程.
 
-    该类的主要方法是匹配子树的函数 `match_subtree`.
+    加载时目标树被编译为一棵字典树 (名称和别名都指向同一个子节点),
+    `match_outline` 对目录树做一次深度优先遍历, 同时在字典树上前进, 即可找到所有匹配.
+
+    fuzzy_threshold 不为 None 时开启近似匹配: 标题与同一层的名称和别名都不完全相同时,
+    通过该层的二元组索引 (`BigramIndex`) 找出相似度不低于该值的最相似的一个.
+    相似度为 1 - 编辑距离 / 较长的长度, 如 0.8 表示每 5 个字允许 1 处不同.
     """
 
     MAX_PAGES = 10000
 
-    def __init__(self, filename: str = "./config.yaml") -> None:
+    def __init__(
+        self, filename: str = "./config.yaml", fuzzy_threshold: Optional[float] = None
+    ) -> None:
         with open(filename, "r", encoding="utf-8") as file:
             self.tree = yaml.safe_load(file)
+        self.trie = _TrieNode()
+        self._compile(self.tree, self.trie)
+        self.fuzzy_threshold = fuzzy_threshold
+        if fuzzy_threshold is not None:
+            self._build_indexes(self.trie)
 
-    def match_subtree(self, node: "TitleNode") -> Optional[ContentRange]:
+    @staticmethod
+    def _build_indexes(trie: _TrieNode) -> None:
+        if trie.children:
+            trie.index = BigramIndex(trie.children)
+        for child in set(trie.children.values()):
+            TargetTree._build_indexes(child)
+
+    def _child(self, trie: _TrieNode, title: str) -> Optional[_TrieNode]:
+        """标题在字典树 trie 这一层对应的子节点: 先精确匹配, 再近似匹配."""
+        key = normalize_title(title)
+        child = trie.children.get(key)
+        if child is None and trie.index is not None:
+            found = trie.index.lookup(key, self.fuzzy_threshold)
+            if found:
+                child = trie.children[found[0]]
+        return child
+
+    @staticmethod
+    def _compile(targets: List[dict], trie: _TrieNode) -> None:
         """
-        判断目录树中的节点 node 是否与目标树中的某个节点匹配.
-        匹配指的是从目标树的 root 开始, 到叶子节点为止, 每个节点依次匹配.
+        把同一层的目标编入字典树 trie 的子节点.
+
+        同一层中名称相同的目标共用一个字典树节点 (子目标合并). 一个目标的名称或别名
+        与另一个名称不同的目标的名称或别名相同时, 两者无法区分, 抛出 ValueError.
+        名称相同, 但一个有子目标而另一个没有时同样抛出 ValueError.
         """
+        for tar in targets:
+            path = trie.path + (tar["name"],)
+            keys = [tar["name"], *tar.get("aliases", [])]
+            children = tar.get("children", [])
+            child = None
+            for key in keys:
+                other = trie.children.get(normalize_title(key))
+                if other is None:
+                    continue
+                if normalize_title(other.path[-1]) != normalize_title(tar["name"]):
+                    raise ValueError(
+                        f"target {'/'.join(path)!r}: {key!r} is already the name "
+                        f"or an alias of target {'/'.join(other.path)!r}"
+                    )
+                child = other
+            if child is None:
+                child = _TrieNode(path)
+            elif child.is_leaf == bool(children):
+                raise ValueError(
+                    f"target {'/'.join(path)!r} is defined twice, "
+                    "once with children and once without"
+                )
+            for key in keys:
+                trie.children.setdefault(normalize_title(key), child)
+            if children:
+                TargetTree._compile(children, child)
+            else:
+                child.is_leaf = True
 
-        def match_one_node(tar: dict, index: int) -> Optional[int]:
-            # 按照路径和 TitleNode 进行查找
-            if index >= len(path):
-                # 目录树到底了, 目标树还没到底, 说明我们需要更细致的标题
-                return None
+    def match_outline(self, outlines: OutlineTree) -> List[TargetMatch]:
+        """
+        一次遍历目录树, 返回所有匹配, 顺序与目录树的先序遍历一致.
 
-            # 检测当前节点是否匹配
-            title = path[index]
-            if title != tar["name"]:
-                for alias in tar.get("aliases", []):
-                    if title == alias:
-                        break
-                else:
-                    return None
+        每个被匹配的节点只出现一次, 其子孙节点不再重复报告同一个范围.
+        """
+        matches: List[TargetMatch] = []
 
-            # 当前节点匹配, 继续匹配子节点
-            children = tar.get("children", [])
-            if not children:
-                # 目标树到底了, 说明匹配成功
-                return index
-            for child in children:
-                if node_index := match_one_node(child, index + 1):
-                    return node_index
-            return None
+        def _walk(node: TitleNode, trie: _TrieNode) -> None:
+            for child in node.children:
+                nxt = self._child(trie, child.get_main_text())
+                if nxt is None:
+                    continue
+                if nxt.is_leaf:
+                    matches.append(
+                        TargetMatch(child, nxt.path, TargetTree.content_range(child))
+                    )
+                    continue
+                _walk(child, nxt)
+
+        _walk(outlines.root, self.trie)
+        return matches
+
+    def match_node(self, node: "TitleNode") -> Optional[TargetMatch]:
+        """判断节点本身 (而不是其祖先) 是否恰好匹配某个目标."""
+        matched = self._match_path(node)
+        if matched and matched[0] == node:
+            return TargetMatch(matched[0], matched[1], TargetTree.content_range(node))
+        return None
 
+    def match_subtree(self, node: "TitleNode") -> Optional[ContentRange]:
+        """
+        判断目录树中的节点 node 是否与目标树中的某个节点匹配.
+        匹配指的是从目标树的 root 开始, 到叶子节点为止, 每个节点依次匹配.
+        node 的某个祖先匹配时, 返回该祖先的范围.
+        """
+        matched = self._match_path(node)
+        return TargetTree.content_range(matched[0]) if matched else None
+
+    def _match_path(
+        self, node: "TitleNode"
+    ) -> Optional[Tuple["TitleNode", Tuple[str, ...]]]:
         # 通过 parent 反向构建路径
-        path = []
         node_list = []
         temp = node
         while temp.parent:
-            path.append(temp.get_main_text())
             node_list.append(temp)
             temp = temp.parent
-        path.reverse()
         node_list.reverse()
 
-        for root in self.tree:
-            if node_index := match_one_node(root, 0):
-                # 返回 ContentRange
-                matched_node: "TitleNode" = node_list[node_index]
-                parent = matched_node.parent
-                assert parent and parent.children
-                if matched_node.pos == len(parent.children) - 1:
-                    # 是最后一个节点
-                    p_parent = parent.parent
-                    assert p_parent
-                    if parent.pos == len(p_parent.children) - 1:
-                        # 父节点也是最后一个节点
-                        return ContentRange(
-                            start_page=matched_node.page_no,
-                            start_y=matched_node.y1,
-                            end_page=TargetTree.MAX_PAGES,
-                            end_y=float("inf"),
-                        )
-                    else:
-                        # 范围: 该节点到父节点的下一个节点
-                        next_node = p_parent.children[parent.pos + 1]
-                        return ContentRange(
-                            start_page=matched_node.page_no,
-                            start_y=matched_node.y1,
-                            end_page=next_node.page_no,
-                            end_y=next_node.y0,
-                        )
-                else:
-                    # 有后继节点
-                    # 范围: 该节点到后继节点
-                    next_node = parent.children[matched_node.pos + 1]
-                    return ContentRange(
-                        start_page=matched_node.page_no,
-                        start_y=matched_node.y1,
-                        end_page=next_node.page_no,
-                        end_y=next_node.y0,
-                    )
+        trie = self.trie
+        for cur in node_list:
+            trie = self._child(trie, cur.get_main_text())
+            if trie is None:
+                return None
+            if trie.is_leaf:
+                return cur, trie.path
+        # 目录树到底了, 目标树还没到底, 说明我们需要更细致的标题
         return None
+
+    @staticmethod
+    def content_range(matched_node: "TitleNode") -> ContentRange:
+        """计算节点的内容范围: 从该节点到其后继节点 (或父节点的后继节点)."""
+        parent = matched_node.parent
+        assert parent and parent.children
+        if matched_node.pos == len(parent.children) - 1:
+            # 是最后一个节点
+            p_parent = parent.parent
+            if not p_parent or parent.pos == len(p_parent.children) - 1:
+                # 父节点也是最后一个节点
+                return ContentRange(
+                    start_page=matched_node.page_no,
+                    start_y=matched_node.y1,
+                    end_page=TargetTree.MAX_PAGES,
+                    end_y=float("inf"),
+                )
+            else:
+                # 范围: 该节点到父节点的下一个节点
+                next_node = p_parent.children[parent.pos + 1]
+                return ContentRange(
+                    start_page=matched_node.page_no,
+                    start_y=matched_node.y1,
+                    end_page=next_node.page_no,
+                    end_y=next_node.y0,
+                )
+        else:
+            # 有后继节点
+            # 范围: 该节点到后继节点
+            next_node = parent.children[matched_node.pos + 1]
+            return ContentRange(
+                start_page=matched_node.page_no,
+                start_y=matched_node.y1,
+                end_page=next_node.page_no,
+                end_y=next_node.y0,
+            )
@@ -1,4 +1,6 @@
 import re
+from functools import lru_cache
+from typing import Iterable, List, Tuple
 
 
 class TitleType:
@@ -15,6 +17,8 @@ class TitleType:
     不同级别的标题, 类型理应不同; 同级别的标题, 类型理应相同.
     """
 
+    __slots__ = ("prefix_length", "_id")
+
     # 预定义一些组成标题的部分
     ZH_NUM = r"零一二三四五六七八九十"
     DOT = r"、."
@@ -40,13 +44,74 @@ class TitleType:
     # 标题前缀的最大长度, 前缀是正文以外的部分
     MAX_PRE_LEN = 5
 
+    # 预编译的规则
+    # 截断前缀: 顿号/点号, 右括号, 空白中最先出现的一个
+    _CUT = re.compile(rf"[{DOT}]|{RE_R_PAREN}|{RE_SPACE}")
+    # 类型特征: 一个正则, 每个可选的前瞻分组对应一种特征
+    _FEATURES = re.compile(
+        rf"(?:(?=(?P<root>{RE_ROOT[1:]})))?"
+        rf"(?:(?=.*?(?P<zh>{RE_ZH_NUM})))?"
+        rf"(?:(?=(?P<full>{RE_FULL_PAREN[1:]})))?"
+        rf"(?:(?=.*?(?P<paren>{RE_R_PAREN})))?"
+        rf"(?:(?=.*?(?P<dot>{RE_DOT})))?",
+        re.S,
+    )
+
+    # 按前缀缓存的分类结果数量上限
+    CACHE_SIZE = 4096
+
     def __init__(self, title: str, is_root: bool = False) -> None:
         if is_root:
             self._id = -1
             self.prefix_length = -1
         else:
-            title_pre = self._find_title_prefix(title)
-            self._id = self._calc_title_id(title_pre)
+            self.prefix_length, self._id = TitleType._classify(TitleType._head(title))
+
+    @staticmethod
+    def _head(title: str) -> str:
+        """
+        标题开头的 MAX_PRE_LEN 个字符 (去掉前导空白), 前缀只可能出现在这里,
+        因此分类结果只取决于它, 可以用作缓存的键.
+        """
+        head = title.lstrip()[: TitleType.MAX_PRE_LEN]
+        if not head:
+            raise ValueError("Title is empty")
+        return head
+
+    @staticmethod
+    @lru_cache(maxsize=CACHE_SIZE)
+    def _classify(head: str) -> Tuple[int, int]:
+        """根据标题开头计算 (前缀长度, 类型 ID), 结果按 head 缓存."""
+        length = len(head)
+        if match_cut := TitleType._CUT.search(head):
+            length = min(length, match_cut.start() + 1)
+
+        m = TitleType._FEATURES.match(head[:length])
+        res = 0
+        if m["root"]:
+            res |= TitleType.TITLE_ROOT
+        if m["zh"]:
+            res |= TitleType.TITLE_ZH_NUM
+        # 括号的处理, 先判断全括号, 再判断右括号
+        if m["full"]:
+            res |= TitleType.TITLE_HAS_PAREN | TitleType.TITLE_FULL_PAREN
+        elif m["paren"]:
+            res |= TitleType.TITLE_HAS_PAREN
+        if m["dot"]:
+            res |= TitleType.TITLE_DOT
+        return length, res
+
+    @staticmethod
+    def classify_batch(titles: Iterable[str]) -> List["TitleType"]:
+        """一次分类一批标题, 相同的开头只计算一次."""
+        results = []
+        for title in titles:
+            ttype = TitleType.__new__(TitleType)
+            ttype.prefix_length, ttype._id = TitleType._classify(TitleType._head(title))
+            results.append(ttype)
+        return results
+
+    # 以下两个方法是逐条规则的原始实现, 与 `_classify` 的结果相同, 保留用于对照和基准测试
 
     def _find_title_prefix(self, title: str) -> str:
         """
@@ -108,6 +173,11 @@ class TitleType:
         """判断标题类型是否为空, 即没有任何标题特征"""
         return self._id == 0
 
+    @property
+    def type_id(self) -> int:
+        """类型 ID (各特征的按位或), 可以用于序列化; 根节点为 -1"""
+        return self._id
+
     @staticmethod
     def is_root(title: str) -> bool:
         """判断标题是否为根标题"""
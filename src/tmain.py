@@ -1,7 +1,21 @@
-import pymupdf
-import json
+import argparse
+import hashlib
+import inspect
+import os
 import time
-from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pymupdf
+
+from checkpoint import PageCheckpoint, remove_checkpoint
+from extract_cache import ExtractCache
+import header_footer
+from header_footer import PageBands, detect_bands
+from page_cache import PageCache, save_pages
+
+# 提取器版本, 修改提取逻辑 (而不仅仅是 crop_page) 时手动加一, 使缓存失效
+EXTRACTOR_VERSION = 1
 
 
 def fix_font_encoding(page_dict: dict) -> None:
@@ -25,71 +39,347 @@ def fix_font_encoding(page_dict: dict) -> None:
                         pass  # 保留原值
 
 
-def process():
-    for pn in tqdm(range(len(doc)), desc="Processing pages"):
-        page = doc[pn]
-        page_dict = page.get_text("dict")
-
-        # page_dict["blocks"] = [
-        #     block for block in page_dict["blocks"] if block.get("type") != 1
-        # ]  # 去除图片块
-
-        cropped_blocks = []  # 只保留文本块的必要信息 (bbox, lines)
-        sizes_count = {}  # 统计字体大小对应内容的长度
-        for block in page_dict["blocks"]:
-            if block["type"] != 0:  # 不是文本块
-                continue
-            cropped_lines = []
-            for line in block["lines"]:
-                for span in line["spans"]:
-                    text = span["text"].strip()
-                    if not text:
-                        continue
-                    size = round(span["size"], 2)
-                    bbox = span["bbox"]
-                    sizes_count[size] = sizes_count.get(size, 0) + len(text)
-                    cropped_lines.append(
-                        {
-                            "x0": round(bbox[0], 2),
-                            "x1": round(bbox[2], 2),
-                            "size": size,
-                            "text": text,
-                        }
-                    )  # 只保留横坐标, 字号和文本
-            if cropped_lines:
-                cropped_blocks.append(
+def crop_page(page: "pymupdf.Page", pn: int, bands: Optional[PageBands] = None) -> Dict:
+    """
+    提取一页的文本, 只保留后续建立目录树所需的信息.
+
+    pn 是从 0 开始的页码, 返回的 page_no 从 1 开始.
+    bands 为文档的页眉页脚范围 (见 `header_footer.detect_bands`), 给出时只提取正文区域.
+    """
+    page_dict = page.get_text("dict", clip=bands.clip(page.rect) if bands else None)
+
+    # page_dict["blocks"] = [
+    #     block for block in page_dict["blocks"] if block.get("type") != 1
+    # ]  # 去除图片块
+
+    cropped_blocks = []  # 只保留文本块的必要信息 (bbox, lines)
+    sizes_count = {}  # 统计字体大小对应内容的长度
+    for block in page_dict["blocks"]:
+        if block["type"] != 0:  # 不是文本块
+            continue
+        cropped_lines = []
+        for line in block["lines"]:
+            for span in line["spans"]:
+                text = span["text"].strip()
+                if not text:
+                    continue
+                size = round(span["size"], 2)
+                bbox = span["bbox"]
+                sizes_count[size] = sizes_count.get(size, 0) + len(text)
+                cropped_lines.append(
                     {
-                        "bbox": block["bbox"],
-                        "lines": cropped_lines,
+                        "x0": round(bbox[0], 2),
+                        "x1": round(bbox[2], 2),
+                        "size": size,
+                        "text": text,
                     }
-                )
-
-        all_pages.append(
-            {
-                "page_no": pn + 1,
-                "width": round(page.rect.width, 2),
-                "blocks": cropped_blocks,
-                "sizes_count": sizes_count,
-                "total_length": sum(sizes_count.values()),
-            }
-        )
+                )  # 只保留横坐标, 字号和文本
+        if cropped_lines:
+            cropped_blocks.append(
+                {
+                    "bbox": block["bbox"],
+                    "lines": cropped_lines,
+                }
+            )
+
+    return {
+        "page_no": pn + 1,
+        "width": round(page.rect.width, 2),
+        "blocks": cropped_blocks,
+        # 键转为字符串, 与 JSON / PageCache 读出的格式一致
+        "sizes_count": {str(size): count for size, count in sizes_count.items()},
+        "total_length": sum(sizes_count.values()),
+    }
+
+
+# 只统计字号时不需要图片块, 去掉 TEXT_PRESERVE_IMAGES 可以省去解码图片
+SIZE_FLAGS = pymupdf.TEXTFLAGS_DICT & ~pymupdf.TEXT_PRESERVE_IMAGES
+
+
+def page_sizes(page: "pymupdf.Page", bands: Optional[PageBands] = None) -> Dict:
+    """
+    只统计一页的字号, 结果与 `crop_page` 的 sizes_count 和 total_length 相同.
+
+    不保留文本块, 也不提取图片, 用于在逐页处理之前先得到整个文档的标题字号
+    (`size_model.SizeModel.from_pages` 只读取这两个字段).
+    """
+    page_dict = page.get_text(
+        "dict", clip=bands.clip(page.rect) if bands else None, flags=SIZE_FLAGS
+    )
+    sizes_count = {}
+    for block in page_dict["blocks"]:
+        if block["type"] != 0:  # 不是文本块
+            continue
+        for line in block["lines"]:
+            for span in line["spans"]:
+                text = span["text"].strip()
+                if text:
+                    size = round(span["size"], 2)
+                    sizes_count[size] = sizes_count.get(size, 0) + len(text)
+    return {
+        "sizes_count": {str(size): count for size, count in sizes_count.items()},
+        "total_length": sum(sizes_count.values()),
+    }
+
+
+def process(
+    doc: "pymupdf.Document",
+    bands: Optional[PageBands] = None,
+    progress: bool = True,
+) -> List[Dict]:
+    """串行处理整篇文档, progress 为 False 时不显示进度条."""
+    from tqdm import tqdm
+
+    all_pages = []
+    for pn in tqdm(range(len(doc)), desc="Processing pages", disable=not progress):
+        all_pages.append(crop_page(doc[pn], pn, bands))
+    return all_pages
+
+
+def iter_pages(
+    pdf_path: str, strip_bands: bool = True, bands: Optional[PageBands] = None
+) -> Iterator[Dict]:
+    """
+    逐页提取, 每次只产出一页, 供流式处理使用.
+
+    给出 bands 时直接使用 (如 `layout_profile` 中记录的页眉页脚), 不再检测.
+    """
+    with pymupdf.open(pdf_path) as doc:
+        if bands is None and strip_bands:
+            bands = detect_bands(doc)
+        for pn in range(len(doc)):
+            yield crop_page(doc[pn], pn, bands)
 
 
-pdf_path = "input_pdf/002500_山西证券_2024.pdf"
-pdf_path = "input_pdf/300059_东方财富_2024.pdf"
+def split_shards(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """
+    将页码范围 [0, page_count) 切分为连续的分片 [start, end).
+
+    分片数为进程数的若干倍, 以免某个进程分到的页面特别"重"而拖慢整体.
+    """
+    shard_count = min(page_count, workers * 4)
+    if shard_count <= 0:
+        return []
+    step, rest = divmod(page_count, shard_count)
+    shards = []
+    start = 0
+    for i in range(shard_count):
+        end = start + step + (1 if i < rest else 0)
+        shards.append((start, end))
+        start = end
+    return shards
+
+
+def _process_shard(
+    pdf_path: str, start: int, end: int, bands: Optional[PageBands] = None
+) -> List[Dict]:
+    """在子进程中处理一个分片, 每个进程打开自己的文档句柄."""
+    with pymupdf.open(pdf_path) as doc:
+        return [crop_page(doc[pn], pn, bands) for pn in range(start, end)]
+
+
+def process_parallel(
+    pdf_path: str, workers: int, strip_bands: bool = True, progress: bool = True
+) -> List[Dict]:
+    """
+    多进程处理整篇文档.
+
+    页眉页脚只在主进程中检测一次, 结果的顺序和格式与 `process` 完全相同.
+    """
+    from tqdm import tqdm
+
+    with pymupdf.open(pdf_path) as doc:
+        page_count = len(doc)
+        bands = detect_bands(doc) if strip_bands else None
+    shards = split_shards(page_count, workers)
+    all_pages = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_process_shard, pdf_path, s, e, bands) for s, e in shards
+        ]
+        # 按分片顺序合并, 保证页码有序
+        for future in tqdm(
+            futures,
+            desc=f"Processing shards ({workers} workers)",
+            disable=not progress,
+        ):
+            all_pages.extend(future.result())
+    return all_pages
 
-doc = pymupdf.open(pdf_path)
 
-page_numbers = list(range(4))
+def _process_pages(
+    pdf_path: str, pns: List[int], bands: Optional[PageBands] = None
+) -> List[Dict]:
+    """在子进程中处理若干 (不一定连续的) 页."""
+    with pymupdf.open(pdf_path) as doc:
+        return [crop_page(doc[pn], pn, bands) for pn in pns]
+
+
+def extract_checkpointed(
+    pdf_path: str, directory: str, workers: int = 1, strip_bands: bool = True
+) -> List[Dict]:
+    """
+    带检查点的提取: 每完成一页就追加到检查点目录 (见 `checkpoint.PageCheckpoint`),
+    中断后重新运行时跳过已完成的页, 从第一个缺少的页开始.
+
+    返回的结果与 `extract` 相同, 检查点由调用方在保存结果后删除.
+    """
+    from tqdm import tqdm
+
+    with pymupdf.open(pdf_path) as doc:
+        bands = detect_bands(doc) if strip_bands else None
+        with PageCheckpoint(
+            directory, pdf_path, extractor_settings(strip_bands), len(doc)
+        ) as ckpt:
+            missing = ckpt.missing()
+            if missing and len(missing) < len(doc):
+                print(f"Resuming at page {missing[0] + 1}, {len(missing)} pages left.")
+            if workers <= 1:
+                for pn in tqdm(missing, desc="Processing pages"):
+                    ckpt.append(crop_page(doc[pn], pn, bands))
+            elif missing:
+                chunks = [missing[s:e] for s, e in split_shards(len(missing), workers)]
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [
+                        executor.submit(_process_pages, pdf_path, chunk, bands)
+                        for chunk in chunks
+                    ]
+                    # 分片完成的顺序不定, 检查点按页码记录, 合并时再排序
+                    for future in tqdm(
+                        as_completed(futures),
+                        total=len(futures),
+                        desc=f"Processing shards ({workers} workers)",
+                    ):
+                        for page in future.result():
+                            ckpt.append(page)
+            return ckpt.merge()
+
+
+def extract(
+    pdf_path: str, workers: int = 1, strip_bands: bool = True, progress: bool = True
+) -> List[Dict]:
+    """
+    提取文档的所有页面, workers <= 1 时使用串行方式.
+
+    strip_bands 为 True 时先检测页眉页脚, 只提取正文区域.
+    """
+    if workers <= 1:
+        with pymupdf.open(pdf_path) as doc:
+            bands = detect_bands(doc) if strip_bands else None
+            return process(doc, bands, progress)
+    return process_parallel(pdf_path, workers, strip_bands, progress)
+
+
+def _source_digest(obj) -> str:
+    src = inspect.getsource(obj).encode("utf-8")
+    return hashlib.sha256(src).hexdigest()[:16]
+
+
+def extractor_settings(strip_bands: bool = True) -> Dict:
+    """
+    影响提取结果的所有设置, 作为缓存键的一部分.
+
+    crop_page 和页眉页脚检测 (header_footer 模块) 的源码也计入其中, 修改裁剪规则后旧的缓存条目自动失效.
+    """
+    return {
+        "version": EXTRACTOR_VERSION,
+        "pymupdf": pymupdf.VersionBind,
+        "crop_page": _source_digest(crop_page),
+        "bands": _source_digest(header_footer) if strip_bands else None,
+    }
+
+
+def extract_cached(
+    pdf_path: str,
+    workers: int = 1,
+    cache: Optional[ExtractCache] = None,
+    strip_bands: bool = True,
+    progress: bool = True,
+) -> PageCache:
+    """
+    带缓存的提取, 返回 (懒加载的) PageCache: 缓存未命中时先提取并写入缓存.
+
+    无论是否命中, 返回的类型和内容都相同. PageCache 持有 mmap, 用完后应当
+    调用 close (或用 with).
+    """
+    cache = cache or ExtractCache()
+    key = cache.key(pdf_path, extractor_settings(strip_bands))
+    pages = cache.get(key)
+    if pages is None:
+        pages = cache.put(key, extract(pdf_path, workers, strip_bands, progress))
+    return pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="提取 PDF 每一页的文本块信息")
+    parser.add_argument("--pdf", default="input_pdf/300059_东方财富_2024.pdf")
+    parser.add_argument(
+        "--out",
+        default="src/dfcf.pgc",
+        help="输出文件, .pgc 为二进制缓存格式, 其他扩展名按 JSON 保存",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="进程数, 1 表示串行, 0 表示使用全部 CPU 核心",
+    )
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="同时运行串行版本, 检查结果是否一致并计算加速比",
+    )
+    parser.add_argument(
+        "--cache-dir", default=".cache/extract", help="提取结果缓存目录"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="不读写提取结果缓存")
+    parser.add_argument(
+        "--keep-header-footer",
+        action="store_true",
+        help="不检测页眉页脚, 提取整页",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="检查点目录: 逐页记录进度, 中断后重新运行时从第一个缺少的页继续",
+    )
+    args = parser.parse_args()
+    strip_bands = not args.keep_header_footer
+
+    workers = args.workers or os.cpu_count() or 1
+
+    start_time = time.time()
+    if args.checkpoint:
+        all_pages = extract_checkpointed(
+            args.pdf, args.checkpoint, workers, strip_bands
+        )
+    elif args.no_cache or args.compare:
+        all_pages = extract(args.pdf, workers, strip_bands)
+    else:
+        all_pages = extract_cached(
+            args.pdf, workers, ExtractCache(args.cache_dir), strip_bands
+        )
+    try:
+        elapsed = time.time() - start_time
+        print(
+            f"Processed {len(all_pages)} pages in {elapsed:.2f}s ({workers} workers)."
+        )
 
-all_pages = []
+        if args.compare and workers > 1:
+            start_time = time.time()
+            serial_pages = extract(args.pdf, 1, strip_bands)
+            serial_elapsed = time.time() - start_time
+            speedup = serial_elapsed / elapsed if elapsed > 0 else float("inf")
+            print(f"Serial: {serial_elapsed:.2f}s.")
+            print(f"Identical output: {serial_pages == all_pages}")
+            print(f"Speedup: {speedup:.2f}x, {speedup / workers:.2f}x per core.")
 
-start_time = time.time()
-process()
-end_time = time.time()
-print(f"Processed {len(doc)} pages in {end_time - start_time:.2f}s.")
+        save_pages(args.out, all_pages)
+    finally:
+        if isinstance(all_pages, PageCache):
+            all_pages.close()
+    if args.checkpoint:
+        remove_checkpoint(args.checkpoint)
 
-with open("src/dfcf.json", "w", encoding="utf-8") as f:
-    json.dump(all_pages, f, ensure_ascii=False, indent=2)
 
-# print(page_dict)
+if __name__ == "__main__":
+    main()
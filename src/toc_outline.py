@@ -0,0 +1,193 @@
+import re
+from typing import List, Optional
+
+import pymupdf
+
+from extract_cache import ExtractCache
+from instrument import NULL, Instrument
+from outline_tree import OutlineTree
+from title_node import TitleNode
+from title_type import TitleType
+from toc_page import outline_from_toc_page
+
+MIN_BOOKMARKS = 5  # 书签数量下限, 太少的书签不足以代替目录树
+MIN_ROOT_BOOKMARKS = 2  # 一级书签数量下限
+SEARCH_BAND_HEIGHT = 60  # 在跳转位置下方多大范围内寻找标题文本
+
+
+def _normalize_levels(toc: List[list]) -> List[list]:
+    """
+    有些报告的书签只有一个一级节点 (如 "XX公司2024年年度报告"), 各节都在它下面.
+    这种情况下去掉该节点, 其余书签提升一级, 与启发式目录树的层级保持一致.
+    """
+    roots = [entry for entry in toc if entry[0] == 1]
+    if len(roots) == 1 and toc[0][0] == 1 and len(toc) > 1:
+        return [[entry[0] - 1, *entry[1:]] for entry in toc[1:]]
+    return toc
+
+
+def bookmarks_usable(toc: List[list], page_count: int) -> bool:
+    """
+    检查书签能否代替启发式目录树:
+        - 数量足够, 且一级书签不少于 MIN_ROOT_BOOKMARKS 个
+        - 页码都在文档范围内, 且按书签顺序不减
+        - 层级每次最多加深一级
+    """
+    if len(toc) < MIN_BOOKMARKS:
+        return False
+    if sum(1 for entry in toc if entry[0] == 1) < MIN_ROOT_BOOKMARKS:
+        return False
+    last_page, last_level = 1, 0
+    for level, title, page, *_ in toc:
+        if not 1 <= page <= page_count or page < last_page:
+            return False
+        if level > last_level + 1 or not title.strip():
+            return False
+        last_page, last_level = page, level
+    return True
+
+
+def _locate_title(
+    page: "pymupdf.Page", title: str, y: float, min_y: float = float("-inf")
+) -> Optional["pymupdf.Rect"]:
+    """
+    寻找标题文本, 返回离跳转位置最近的那一处.
+
+    先在跳转位置下方寻找; 很多书签只跳转到页首 (如 y=36), 标题在页面中部,
+    这时在整页中寻找 (与 `toc_page._confirm_y` 相同). 书签按正文顺序排列,
+    同一页中有多处相同的文本时, 优先取位于 min_y (上一个书签的标题底部) 之下的.
+    """
+    clip = pymupdf.Rect(0, max(0.0, y - 5), page.rect.width, y + SEARCH_BAND_HEIGHT)
+    rects = page.search_for(title, clip=clip) or page.search_for(title)
+    if not rects:
+        return None
+    rects = [r for r in rects if r.y0 >= min_y] or rects
+    return min(rects, key=lambda r: abs(r.y0 - y))
+
+
+def outline_from_bookmarks(doc: "pymupdf.Document") -> Optional[OutlineTree]:
+    """
+    直接根据书签建立目录树, 书签不可用时返回 None.
+
+    标题的页码和 y 坐标取自书签的跳转目标; 若能在跳转的页面中找到标题文本
+    (见 `_locate_title`), 则用其 bbox 修正 y0 和 y1, 否则 y1 取跳转位置本身.
+    """
+    toc = _normalize_levels(doc.get_toc(simple=False))
+    if not bookmarks_usable(toc, len(doc)):
+        return None
+
+    outlines = OutlineTree("Report")
+    stack: List[TitleNode] = [outlines.root]  # stack[i] 是当前第 i 级的节点
+    for level, raw_title, page_no, dest in toc:
+        if level > OutlineTree.MAX_LEVEL:
+            continue  # 超过最大层级, 忽略
+        raw_title = " ".join(raw_title.split())
+        title = raw_title
+        # 与启发式目录树一致, "第X节" 后面加空格, 以便正确截取标题前缀
+        if (m := re.match(TitleType.RE_ROOT, title)) and not title[
+            m.end() :
+        ].startswith(" "):
+            title = title[: m.end()] + " " + title[m.end() :]
+        to = dest.get("to") if dest.get("kind") == pymupdf.LINK_GOTO else None
+        y0 = to.y if to is not None else 0.0
+        y1 = y0
+        if to is not None:
+            page = doc[page_no - 1]
+            last = outlines._last_node
+            min_y = last.y1 if last.page_no == page_no else float("-inf")
+            rect = _locate_title(page, raw_title, y0, min_y)
+            if rect is None and title != raw_title:
+                rect = _locate_title(page, title, y0, min_y)
+            if rect is not None:
+                y0, y1 = rect.y0, rect.y1
+
+        del stack[level:]
+        parent = stack[-1]
+        node = TitleNode(
+            title_type=TitleType(title),
+            size=0.0,  # 书签中没有字号信息
+            y0=y0,
+            y1=y1,
+            page_no=page_no,
+            text=title,
+            level=level,
+            parent=parent,
+            pos=len(parent.children),
+        )
+        parent.children.append(node)
+        stack.append(node)
+        outlines._last_node = node
+    return outlines
+
+
+def fixed_outline(
+    doc: "pymupdf.Document",
+    use_bookmarks: bool = True,
+    use_toc_page: bool = True,
+    inst: Instrument = NULL,
+    cache: Optional[ExtractCache] = None,
+) -> Optional[OutlineTree]:
+    """
+    不需要逐页分析的目录树: 依次尝试书签和目录页, 都不可用时返回 None.
+
+    这两种方式一次得到完整的目录树, 使用了哪一种记录在 inst 的 "outline.<方式>" 计数中.
+    cache 是目录页寻找下级标题时使用的提取缓存 (见 `toc_page.outline_from_toc_page`).
+    """
+    outlines = None
+    if use_bookmarks:
+        with inst.span("bookmarks"):
+            outlines = outline_from_bookmarks(doc)
+        source = "bookmarks"
+    if outlines is None and use_toc_page:
+        with inst.span("toc_page"):
+            outlines = outline_from_toc_page(doc, cache)
+        source = "toc_page"
+    if outlines is not None:
+        inst.count("outline." + source)
+    return outlines
+
+
+def outline_for_pdf(
+    pdf_path: str,
+    use_bookmarks: bool = True,
+    use_toc_page: bool = True,
+    cache: Optional[ExtractCache] = None,
+    inst: Instrument = NULL,
+    profiles: Optional["ProfileStore"] = None,
+) -> OutlineTree:
+    """
+    建立 PDF 的目录树, 依次尝试:
+        1. PDF 自带的书签
+        2. 印刷的目录页 (只分析目录指向的页面; 目录没有列到最大层级时,
+           经过提取缓存在各条目的范围中寻找下级标题)
+        3. 逐页启发式分析, 给出 profiles 时优先使用发行人的版式档案
+           (见 `layout_profile.outline_with_profile`)
+    使用了哪一种方式记录在 inst 的 "outline.<方式>" 计数中.
+    """
+    if use_bookmarks or use_toc_page:
+        with pymupdf.open(pdf_path) as doc:
+            outlines = fixed_outline(doc, use_bookmarks, use_toc_page, inst, cache)
+        if outlines is not None:
+            return outlines
+
+    if profiles is not None:
+        from layout_profile import outline_with_profile
+
+        outlines = outline_with_profile(pdf_path, profiles, cache, inst)
+        inst.count("outline.heuristic")
+        return outlines
+
+    from outline_builder import stream_outline
+    from size_model import SizeModel
+    from tmain import extract_cached
+
+    with inst.span("extract"):
+        pages = extract_cached(pdf_path, cache=cache)
+    with pages:
+        with inst.span("size_model"):
+            allowed_sizes = SizeModel.from_pages(pages).allowed_sizes
+        outlines = OutlineTree("Report")
+        for _ in stream_outline(pages, outlines, allowed_sizes, inst):
+            pass
+    inst.count("outline.heuristic")
+    return outlines
@@ -0,0 +1,300 @@
+import re
+from typing import AbstractSet, Dict, List, Optional, Sequence, Tuple
+
+import pymupdf
+
+from extract_cache import ExtractCache
+from header_footer import PageBands, detect_bands
+from outline_builder import iter_title_candidates
+from outline_tree import OutlineTree
+from page_cache import PageCache
+from title_node import TitleNode
+from title_type import TitleType
+from tmain import crop_page, extract_cached
+
+MAX_TOC_START = 15  # 只在前若干页中寻找目录页
+MIN_TOC_ENTRIES = 5  # 条目太少的目录不可信
+MAX_PAGE_OFFSET = 30  # 印刷页码与 PDF 页码的最大差距
+OFFSET_PROBES = 5  # 用多少个条目来推断页码偏移
+
+TOC_TITLES = ["目录", "目錄"]
+# 标题 + 引导符 (点线或空白) + 页码, 没有引导符的 (如正文中以数字结尾的行) 不算
+RE_TOC_ENTRY = re.compile(r"^(?P<title>.*?\S)[\s.·…．_—-]+(?P<page>\d{1,4})$")
+MIN_ENTRY_RATIO = 0.5  # 续页中能解析为条目的行所占比例下限
+
+# 目录条目: (级别, 标题, 印刷页码)
+TocEntry = Tuple[int, str, int]
+
+
+def _compact(text: str) -> str:
+    """去掉所有空白, 用于比较标题."""
+    return "".join(text.split())
+
+
+def _page_rows(page: "pymupdf.Page", bands: Optional[PageBands] = None) -> List[str]:
+    """
+    将一页中的行按 y 坐标合并为"视觉行", 给出 bands 时不含页眉页脚.
+
+    目录页中, 标题和页码常常是同一行上的两个文本块, 需要合并后才能解析.
+    """
+    clip = bands.clip(page.rect) if bands else None
+    lines = []
+    for block in page.get_text("dict", clip=clip)["blocks"]:
+        if block["type"] != 0:
+            continue
+        for line in block["lines"]:
+            text = "".join(span["text"] for span in line["spans"]).strip()
+            if text:
+                x0, y0, _, y1 = line["bbox"]
+                lines.append((y0, y1, x0, text))
+    lines.sort()
+
+    rows: List[List[tuple]] = []
+    for line in lines:
+        center = (line[0] + line[1]) / 2
+        if rows and rows[-1][0][0] <= center <= rows[-1][0][1]:
+            rows[-1].append(line)
+        else:
+            rows.append([line])
+    return [
+        " ".join(item[3] for item in sorted(row, key=lambda x: x[2])) for row in rows
+    ]
+
+
+def _parse_rows(rows: List[str], type_order: List[int]) -> List[TocEntry]:
+    """
+    解析目录行. 级别由标题类型决定:
+        - "第X节" 和无前缀的条目为 1 级
+        - 其他类型按首次出现的顺序依次为 2 级, 3 级, ...
+    type_order 记录已出现的类型, 跨页共享.
+    """
+    entries = []
+    for row in rows:
+        m = RE_TOC_ENTRY.match(row)
+        if not m:
+            continue
+        title = m.group("title").strip()
+        if _compact(title) in TOC_TITLES:
+            continue
+        ttype = TitleType(title)
+        if TitleType.is_root(title) or ttype.empty():
+            level = 1
+        else:
+            if ttype._id not in type_order:
+                type_order.append(ttype._id)
+            level = 2 + type_order.index(ttype._id)
+        if level <= OutlineTree.MAX_LEVEL:
+            entries.append((level, title, int(m.group("page"))))
+    return entries
+
+
+def find_toc_entries(
+    doc: "pymupdf.Document", bands: Optional[PageBands] = None
+) -> Tuple[List[TocEntry], int]:
+    """
+    寻找并解析印刷的目录页. 返回 (目录条目, 目录最后一页的页码索引);
+    没有找到目录时返回 ([], -1).
+
+    续页只看正文区域 (去掉 bands 中的页眉页脚), 大部分行能解析为条目即可,
+    不要求至少 MIN_TOC_ENTRIES 条: 目录的最后一页可能只有一两个条目.
+    """
+    for pn in range(min(MAX_TOC_START, len(doc))):
+        rows = _page_rows(doc[pn])
+        if not any(_compact(row) in TOC_TITLES for row in rows):
+            continue
+        # 目录可能跨越多页, 一直读到解析不出条目的页为止
+        type_order: List[int] = []
+        entries = _parse_rows(rows, type_order)
+        last = pn
+        while last + 1 < len(doc):
+            more_rows = _page_rows(doc[last + 1], bands)
+            more = _parse_rows(more_rows, type_order)
+            if (
+                not more
+                or len(more) < MIN_ENTRY_RATIO * len(more_rows)
+                or (entries and more[0][2] < entries[-1][2])  # 页码应当不减
+            ):
+                break
+            entries.extend(more)
+            last += 1
+        if len(entries) >= MIN_TOC_ENTRIES:
+            return entries, last
+    return [], -1
+
+
+def find_page_offset(
+    doc: "pymupdf.Document", entries: List[TocEntry], toc_end: int
+) -> Optional[int]:
+    """
+    推断印刷页码与 PDF 页码 (从 1 开始) 的差: 用前几个条目在候选偏移下
+    去对应页面中查找标题, 取命中最多的偏移.
+    """
+    page_texts: Dict[int, str] = {}
+
+    def page_text(pn: int) -> str:
+        if pn not in page_texts:
+            page_texts[pn] = _compact(doc[pn].get_text("text"))
+        return page_texts[pn]
+
+    votes: Dict[int, int] = {}
+    for _, title, printed in entries[:OFFSET_PROBES]:
+        key = _compact(title)
+        # 从小到大尝试偏移, 同一标题在正文中多次出现时取最近的一处
+        for offset in sorted(range(-MAX_PAGE_OFFSET, MAX_PAGE_OFFSET + 1), key=abs):
+            pn = printed + offset - 1
+            if toc_end < pn < len(doc) and key in page_text(pn):
+                votes[offset] = votes.get(offset, 0) + 1
+                break
+    if not votes:
+        return None
+    return max(votes, key=lambda offset: votes[offset])
+
+
+def _confirm_y(
+    page: "pymupdf.Page", page_dict: Dict, title: str
+) -> Tuple[float, float, float]:
+    """
+    在条目指向的页上确认标题的位置, 返回 (字号, y0, y1).
+
+    先在候选标题中寻找, 找不到再在整页中搜索文本; 都找不到时认为标题在页首.
+    """
+    key = _compact(title)
+    for size, bbox, _, text, _, _ in iter_title_candidates(page_dict):
+        if _compact(text) == key:
+            return size, bbox[1], bbox[3]
+    rects = page.search_for(title) or page.search_for(key)
+    if rects:
+        return 0.0, rects[0].y0, rects[0].y1
+    return 0.0, 0.0, 0.0
+
+
+def _graft(nodes: List[TitleNode], parent: TitleNode) -> None:
+    """将另一棵目录树中的节点 (连同子树) 接在 parent 之下, 超过最大层级的部分丢弃."""
+    if parent.level >= OutlineTree.MAX_LEVEL:
+        return
+    for node in nodes:
+        children = node.children
+        node.parent = parent
+        node.level = parent.level + 1
+        node.pos = len(parent.children)
+        node.children = []
+        parent.children.append(node)
+        _graft(children, node)
+
+
+def _span_headings(
+    pages: Sequence[Dict],
+    allowed_sizes,
+    start: Tuple[int, float],
+    end: Tuple[int, float],
+    toc_titles: AbstractSet[str],
+) -> List[TitleNode]:
+    """
+    在 [start, end) 范围 ((页码索引, y0), 不含起点处的标题本身) 中, 用与逐页分析
+    相同的规则筛选标题并建立子树, 返回子树的第一级节点. 目录中的标题不计入.
+    """
+    sub = OutlineTree("Span")
+    for pn in range(start[0], min(end[0] + 1, len(pages))):
+        for size, bbox, page_no, text, ttype, centered in iter_title_candidates(
+            pages[pn], allowed_sizes
+        ):
+            if not start < (pn, bbox[1]) < end or _compact(text) in toc_titles:
+                continue
+            sub.add_node(size, bbox[1], bbox[3], page_no, text, ttype, centered)
+    return sub.root.children
+
+
+def outline_from_toc_page(
+    doc: "pymupdf.Document", cache: Optional[ExtractCache] = None
+) -> Optional[OutlineTree]:
+    """
+    根据印刷的目录页建立目录树, 没有可用的目录页时返回 None.
+
+    目录中的条目构成目录树的上层. 目录已经列到 `OutlineTree.MAX_LEVEL` 级时,
+    只有目录指向的页面会被读取.
+
+    目录通常只列出前一两级标题, 这时对不到最大层级的条目, 在其范围 (到下一个条目
+    为止) 中用与逐页分析相同的规则 (整个文档的标题字号, 见 `size_model.SizeModel`)
+    筛选下级标题, 接在该条目之下. 下级标题可能在范围中的任何一页, 因此这些页面和
+    字号都取自提取缓存 (`tmain.extract_cached`, cache 为 None 时使用默认的缓存):
+    缓存命中时不需要提取任何页面, 未命中时提取的结果也供之后的运行使用.
+    """
+    bands = detect_bands(doc)
+    entries, toc_end = find_toc_entries(doc, bands)
+    if not entries:
+        return None
+    offset = find_page_offset(doc, entries, toc_end)
+    if offset is None:
+        return None
+
+    # (级别, 标题, 页码索引), 只保留指向正文的条目
+    pointed = [
+        (level, title, printed + offset - 1)
+        for level, title, printed in entries
+        if toc_end < printed + offset - 1 < len(doc)
+    ]
+    if any(level < OutlineTree.MAX_LEVEL for level, _, _ in pointed):
+        with extract_cached(doc.name, cache=cache, progress=False) as pages:
+            return _build_outline(doc, pointed, pages)
+    page_dicts = {pn: crop_page(doc[pn], pn, bands) for _, _, pn in pointed}
+    return _build_outline(doc, pointed, page_dicts)
+
+
+def _build_outline(
+    doc: "pymupdf.Document",
+    pointed: List[Tuple[int, str, int]],
+    pages,
+) -> OutlineTree:
+    """
+    由指向正文的条目建立目录树. pages 按页码索引给出页面数据: 为 PageCache 时
+    (整个文档) 同时在不到最大层级的条目之下接上下级标题, 否则只含条目指向的页面.
+    """
+    allowed_sizes = None
+    if isinstance(pages, PageCache):
+        from size_model import SizeModel
+
+        allowed_sizes = SizeModel.from_pages(pages).allowed_sizes
+
+    page_dicts: Dict[int, Dict] = {}
+
+    def page_dict(pn: int) -> Dict:
+        if pn not in page_dicts:
+            page_dicts[pn] = pages[pn]
+        return page_dicts[pn]
+
+    # (级别, 标题, 页码索引, 字号, y0, y1), 按目录顺序 (即正文顺序)
+    placed = [
+        (level, title, pn, *_confirm_y(doc[pn], page_dict(pn), title))
+        for level, title, pn in pointed
+    ]
+
+    toc_titles = {_compact(title) for _, title, *_ in placed}
+    # 每个条目的范围到下一个条目的标题为止, 最后一个条目到文档末尾
+    ends = [(pn, y0) for _, _, pn, _, y0, _ in placed[1:]] + [(len(doc), 0.0)]
+
+    outlines = OutlineTree("Report")
+    stack: List[TitleNode] = [outlines.root]  # stack[i] 是当前第 i 级的节点
+    for (level, title, pn, size, y0, y1), end in zip(placed, ends):
+        level = min(level, len(stack))  # 避免层级跳跃
+        del stack[level:]
+        parent = stack[-1]
+        node = TitleNode(
+            title_type=TitleType(title),
+            size=size,
+            y0=y0,
+            y1=y1,
+            page_no=pn + 1,
+            text=title,
+            level=level,
+            parent=parent,
+            pos=len(parent.children),
+        )
+        parent.children.append(node)
+        stack.append(node)
+        if allowed_sizes is not None and level < OutlineTree.MAX_LEVEL:
+            _graft(
+                _span_headings(pages, allowed_sizes, (pn, y0), end, toc_titles),
+                node,
+            )
+    outlines._last_node = stack[-1]
+    return outlines
@@ -1,5 +1,6 @@
 import fitz  # pymupdf
 import json
+import numpy as np
 from typing import List, Tuple
 
 pdf_path = "test.pdf"
@@ -37,6 +38,31 @@ def table_to_markdown(table) -> str:
     return "\n".join(md_lines)
 
 
+def inside_table_mask(
+    block_bboxes: List[Tuple[float, float, float, float]],
+    table_bboxes: List[Tuple[float, float, float, float]],
+    threshold: float = 0.6,
+) -> np.ndarray:
+    """For every text block, whether more than `threshold` of its area lies inside some table.
+
+    All (block, table) pairs are intersected at once as (N, M) arrays instead of
+    a Python loop per pair; the arithmetic is the same, so the result is identical.
+    """
+    if not block_bboxes or not table_bboxes:
+        return np.zeros(len(block_bboxes), dtype=bool)
+    b = np.asarray(block_bboxes, dtype=np.float64)  # (N, 4)
+    t = np.asarray(table_bboxes, dtype=np.float64)  # (M, 4)
+    ix0 = np.maximum(b[:, None, 0], t[None, :, 0])
+    iy0 = np.maximum(b[:, None, 1], t[None, :, 1])
+    ix1 = np.minimum(b[:, None, 2], t[None, :, 2])
+    iy1 = np.minimum(b[:, None, 3], t[None, :, 3])
+    overlap = (ix1 > ix0) & (iy1 > iy0)
+    inter_area = (ix1 - ix0) * (iy1 - iy0)
+    block_area = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    ratio = inter_area / (block_area[:, None] + 1e-9)
+    return (overlap & (ratio > threshold)).any(axis=1)
+
+
 def extract_page_markdown(page: fitz.Page) -> str:
     """Extract tables and text from a page and return a markdown string preserving order.
 
@@ -105,28 +131,23 @@ def extract_page_markdown(page: fitz.Page) -> str:
             try:
                 if hasattr(t, "rows") and isinstance(t.rows, (list, tuple)) and t.rows:
                     # rows is list of row objects; each row has cells with bbox
-                    all_x0 = []
-                    all_y0 = []
-                    all_x1 = []
-                    all_y1 = []
-                    for row in t.rows:
-                        for cell in getattr(row, "cells", []) or []:
-                            cb = getattr(cell, "bbox", None)
-                            if cb:
-                                # cb may be tuple
-                                if isinstance(cb, (list, tuple)):
-                                    x0, y0, x1, y1 = cb
-                                elif isinstance(cb, fitz.Rect):
-                                    x0, y0, x1, y1 = cb.x0, cb.y0, cb.x1, cb.y1
-                                else:
-                                    continue
-                                all_x0.append(x0)
-                                all_y0.append(y0)
-                                all_x1.append(x1)
-                                all_y1.append(y1)
-                    if all_x0:
+                    # (a tuple or a Rect); take the union of all of them at once
+                    cell_boxes = [
+                        tuple(cb)
+                        for row in t.rows
+                        for cb in (
+                            getattr(cell, "bbox", None)
+                            for cell in getattr(row, "cells", []) or []
+                        )
+                        if cb and isinstance(cb, (list, tuple, fitz.Rect))
+                    ]
+                    if cell_boxes:
+                        cb = np.asarray(cell_boxes, dtype=np.float64)
                         bbox = fitz.Rect(
-                            min(all_x0), min(all_y0), max(all_x1), max(all_y1)
+                            cb[:, 0].min(),
+                            cb[:, 1].min(),
+                            cb[:, 2].max(),
+                            cb[:, 3].max(),
                         )
             except Exception:
                 bbox = None
@@ -145,30 +166,15 @@ def extract_page_markdown(page: fitz.Page) -> str:
 
     # Extract text blocks
     txt = page.get_text("dict")
-    for block in txt.get("blocks", []):
-        if block.get("type") != 0:
-            # not a text block (image or other)
+    # not text blocks (images or other) are dropped
+    blocks = [b for b in txt.get("blocks", []) if b.get("type") == 0]
+    # if more than 60% of a block's area is inside a table, skip it (we'll use table text)
+    inside = inside_table_mask([b.get("bbox") for b in blocks], table_bboxes)
+    for block, inside_table in zip(blocks, inside):
+        if inside_table:
             continue
         bbox = block.get("bbox")  # [x0, y0, x1, y1]
         x0, y0, x1, y1 = bbox
-        # check intersection with any table bbox; if mostly inside table, skip (we'll use table text)
-        inside_table = False
-        for tb in table_bboxes:
-            tx0, ty0, tx1, ty1 = tb
-            # compute intersection area
-            ix0 = max(x0, tx0)
-            iy0 = max(y0, ty0)
-            ix1 = min(x1, tx1)
-            iy1 = min(y1, ty1)
-            if ix1 > ix0 and iy1 > iy0:
-                inter_area = (ix1 - ix0) * (iy1 - iy0)
-                block_area = (x1 - x0) * (y1 - y0)
-                # if more than 60% of block area is inside a table, skip it
-                if inter_area / (block_area + 1e-9) > 0.6:
-                    inside_table = True
-                    break
-        if inside_table:
-            continue
 
         # collect text spans
         lines = []